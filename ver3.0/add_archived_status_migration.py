@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Migration script for the generic ARCHIVED status.
+This adds the ARCHIVED value the poller's "archive" routing policy action
+stores on EmailProcessingLog (ARCHIVED_CC is kept for existing rows).
+"""
+
+from sqlalchemy import text
+from core.database import engine
+
+
+def add_archived_status():
+    """Add the ARCHIVED processing status."""
+
+    migrations = [
+        # Add ARCHIVED to the processingstatus enum
+        """
+        ALTER TYPE processingstatus ADD VALUE IF NOT EXISTS 'ARCHIVED';
+        """,
+    ]
+
+    print("🔄 Adding ARCHIVED to the processingstatus enum...")
+
+    # Postgres < 12 cannot add an enum value inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for i, migration in enumerate(migrations, 1):
+            try:
+                print(f"   Running migration {i}/{len(migrations)}...")
+                connection.execute(text(migration))
+                print(f"   ✅ Migration {i} completed successfully")
+            except Exception as e:
+                print(f"   ⚠️  Migration {i} warning: {e}")
+
+    print("✅ All archived status migrations completed!")
+
+
+if __name__ == "__main__":
+    print("📧 Email Agent - Archived Status Migration")
+    print("=" * 50)
+
+    try:
+        add_archived_status()
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("   Please check your database connection and try again.")
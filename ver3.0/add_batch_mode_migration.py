@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script for offline batch summarization.
+This adds the batch_id claim column (and its index) to
+EmailProcessingLog.
+"""
+
+from sqlalchemy import text
+from core.database import engine
+
+
+def add_batch_mode_fields():
+    """Add the batch job claim field."""
+
+    migrations = [
+        # Add batch_id field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS batch_id VARCHAR(64);
+        """,
+        # Index claimed rows
+        """
+        CREATE INDEX IF NOT EXISTS ix_email_processing_log_batch_id
+        ON email_processing_log (batch_id);
+        """,
+    ]
+
+    print("🔄 Adding batch mode fields to email_processing_log table...")
+
+    with engine.connect() as connection:
+        for i, migration in enumerate(migrations, 1):
+            try:
+                print(f"   Running migration {i}/{len(migrations)}...")
+                connection.execute(text(migration))
+                connection.commit()
+                print(f"   ✅ Migration {i} completed successfully")
+            except Exception as e:
+                print(f"   ⚠️  Migration {i} warning: {e}")
+                connection.rollback()
+
+    print("✅ All batch mode migrations completed!")
+
+
+if __name__ == "__main__":
+    print("📧 Email Agent - Batch Summarization Migration")
+    print("=" * 50)
+
+    try:
+        add_batch_mode_fields()
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("   Please check your database connection and try again.")
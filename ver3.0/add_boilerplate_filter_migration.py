@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script for the summarizer's boilerplate filter.
+This adds the boilerplate_line_stats table and the per-email
+boilerplate_tokens_removed column.
+"""
+
+from sqlalchemy import text
+from core.database import engine, Base
+from core.models import BoilerplateLineStat
+
+
+def add_boilerplate_filter_fields():
+    """Create the line frequency table and the tokens-removed column."""
+
+    print("🔄 Creating boilerplate_line_stats table...")
+    Base.metadata.create_all(bind=engine, tables=[BoilerplateLineStat.__table__])
+    print("   ✅ Table ready")
+
+    migrations = [
+        # Add boilerplate_tokens_removed field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS boilerplate_tokens_removed INTEGER;
+        """,
+    ]
+
+    print("🔄 Adding boilerplate fields to email_processing_log table...")
+
+    with engine.connect() as connection:
+        for i, migration in enumerate(migrations, 1):
+            try:
+                print(f"   Running migration {i}/{len(migrations)}...")
+                connection.execute(text(migration))
+                connection.commit()
+                print(f"   ✅ Migration {i} completed successfully")
+            except Exception as e:
+                print(f"   ⚠️  Migration {i} warning: {e}")
+                connection.rollback()
+
+    print("✅ All boilerplate filter migrations completed!")
+
+
+if __name__ == "__main__":
+    print("📧 Email Agent - Boilerplate Filter Migration")
+    print("=" * 50)
+
+    try:
+        add_boilerplate_filter_fields()
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("   Please check your database connection and try again.")
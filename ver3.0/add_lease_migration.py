@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Migration script for worker leases.
+This adds the lease owner, expiry and attempt count that the stuck-job
+reaper uses on EmailProcessingLog.
+"""
+
+from sqlalchemy import text
+from core.database import engine
+
+
+def add_lease_fields():
+    """Add the lease fields."""
+
+    migrations = [
+        # Add owner field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS owner VARCHAR(128);
+        """,
+        # Add lease_expires_at field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+        """,
+        # Add lease_attempts field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS lease_attempts INTEGER DEFAULT 0;
+        """,
+        # Index for the reaper's expiry scan
+        """
+        CREATE INDEX IF NOT EXISTS ix_email_processing_log_lease_expires_at
+        ON email_processing_log (lease_expires_at);
+        """,
+    ]
+
+    print("🔄 Adding lease fields to email_processing_log table...")
+
+    with engine.connect() as connection:
+        for i, migration in enumerate(migrations, 1):
+            try:
+                print(f"   Running migration {i}/{len(migrations)}...")
+                connection.execute(text(migration))
+                connection.commit()
+                print(f"   ✅ Migration {i} completed successfully")
+            except Exception as e:
+                print(f"   ⚠️  Migration {i} warning: {e}")
+                connection.rollback()
+
+    print("✅ All lease migrations completed!")
+
+
+if __name__ == "__main__":
+    print("📧 Email Agent - Lease Migration")
+    print("=" * 50)
+
+    try:
+        add_lease_fields()
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("   Please check your database connection and try again.")
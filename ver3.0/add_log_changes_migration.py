@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration script for /api/logs/changes delta sync.
+This adds the (status_updated_at, id) index the changes feed scans on
+EmailProcessingLog.
+"""
+
+from sqlalchemy import text
+from core.database import engine
+
+
+def add_log_changes_index():
+    """Add the delta-sync index."""
+
+    migrations = [
+        # Changes feed ordered by (status_updated_at, id)
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS
+        ix_email_processing_log_status_updated
+        ON email_processing_log (status_updated_at, id);
+        """,
+    ]
+
+    print("🔄 Adding delta-sync index to email_processing_log table...")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for i, migration in enumerate(migrations, 1):
+            try:
+                print(f"   Running migration {i}/{len(migrations)}...")
+                connection.execute(text(migration))
+                print(f"   ✅ Migration {i} completed successfully")
+            except Exception as e:
+                print(f"   ⚠️  Migration {i} warning: {e}")
+
+    print("✅ All delta-sync migrations completed!")
+
+
+if __name__ == "__main__":
+    print("📧 Email Agent - Log Changes Migration")
+    print("=" * 50)
+
+    try:
+        add_log_changes_index()
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("   Please check your database connection and try again.")
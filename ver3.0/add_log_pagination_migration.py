@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Migration script for /api/logs keyset pagination.
+This adds the composite (filter, received_at, id) indexes the paginated and
+filtered log listing scans on EmailProcessingLog.
+"""
+
+from sqlalchemy import text
+from core.database import engine
+
+
+def add_log_pagination_indexes():
+    """Add the log pagination indexes."""
+
+    migrations = [
+        # Unfiltered listing
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS
+        ix_email_processing_log_received_at_id
+        ON email_processing_log (received_at, id);
+        """,
+        # Filter by status
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS
+        ix_email_processing_log_status_received
+        ON email_processing_log (status, received_at, id);
+        """,
+        # Filter by project
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS
+        ix_email_processing_log_project_received
+        ON email_processing_log (project_id, received_at, id);
+        """,
+        # Filter by sender
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS
+        ix_email_processing_log_sender_received
+        ON email_processing_log (sender_address, received_at, id);
+        """,
+    ]
+
+    print("🔄 Adding log pagination indexes to email_processing_log table...")
+
+    # CREATE INDEX CONCURRENTLY (no write lock on a large table) cannot run
+    # inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for i, migration in enumerate(migrations, 1):
+            try:
+                print(f"   Running migration {i}/{len(migrations)}...")
+                connection.execute(text(migration))
+                print(f"   ✅ Migration {i} completed successfully")
+            except Exception as e:
+                print(f"   ⚠️  Migration {i} warning: {e}")
+
+    print("✅ All log pagination migrations completed!")
+
+
+if __name__ == "__main__":
+    print("📧 Email Agent - Log Pagination Migration")
+    print("=" * 50)
+
+    try:
+        add_log_pagination_indexes()
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("   Please check your database connection and try again.")
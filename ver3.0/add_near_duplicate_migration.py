@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Migration script for near-duplicate summary reuse.
+This adds the MinHash signature and summary provenance columns to
+EmailProcessingLog.
+"""
+
+from sqlalchemy import text
+from core.database import engine
+
+
+def add_near_duplicate_fields():
+    """Add signature and summary provenance fields."""
+
+    migrations = [
+        # Add summary_source field ("llm", "cache", "derived")
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS summary_source VARCHAR(32);
+        """,
+        # Add derived_from_id field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS derived_from_id INTEGER;
+        """,
+        # Add minhash_signature field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS minhash_signature BYTEA;
+        """,
+    ]
+
+    print("🔄 Adding near-duplicate fields to email_processing_log table...")
+
+    with engine.connect() as connection:
+        for i, migration in enumerate(migrations, 1):
+            try:
+                print(f"   Running migration {i}/{len(migrations)}...")
+                connection.execute(text(migration))
+                connection.commit()
+                print(f"   ✅ Migration {i} completed successfully")
+            except Exception as e:
+                print(f"   ⚠️  Migration {i} warning: {e}")
+                connection.rollback()
+
+    print("✅ All near-duplicate migrations completed!")
+
+
+if __name__ == "__main__":
+    print("📧 Email Agent - Near-Duplicate Detection Migration")
+    print("=" * 50)
+
+    try:
+        add_near_duplicate_fields()
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("   Please check your database connection and try again.")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migration script for job hand-off tracking.
+This adds the queued_at timestamp that marks a confirmed job publish on
+EmailProcessingLog. Existing rows are treated as queued.
+"""
+
+from sqlalchemy import text
+from core.database import engine
+
+
+def add_queued_at_field():
+    """Add the queued_at field."""
+
+    migrations = [
+        # Add queued_at field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS queued_at TIMESTAMP WITH TIME ZONE;
+        """,
+        # Rows from before the migration are not lost jobs
+        """
+        UPDATE email_processing_log
+        SET queued_at = COALESCE(status_updated_at, created_at)
+        WHERE queued_at IS NULL;
+        """,
+    ]
+
+    print("🔄 Adding queued_at field to email_processing_log table...")
+
+    with engine.connect() as connection:
+        for i, migration in enumerate(migrations, 1):
+            try:
+                print(f"   Running migration {i}/{len(migrations)}...")
+                connection.execute(text(migration))
+                connection.commit()
+                print(f"   ✅ Migration {i} completed successfully")
+            except Exception as e:
+                print(f"   ⚠️  Migration {i} warning: {e}")
+                connection.rollback()
+
+    print("✅ All queued-at migrations completed!")
+
+
+if __name__ == "__main__":
+    print("📧 Email Agent - Queued-At Migration")
+    print("=" * 50)
+
+    try:
+        add_queued_at_field()
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("   Please check your database connection and try again.")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script for the poller routing policy.
+This records the matched policy rule and its actions on
+EmailProcessingLog.
+"""
+
+from sqlalchemy import text
+from core.database import engine
+
+
+def add_routing_policy_fields():
+    """Add the routing policy fields."""
+
+    migrations = [
+        # Add policy_rule field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS policy_rule VARCHAR(64);
+        """,
+        # Add policy_actions field
+        """
+        ALTER TABLE email_processing_log
+        ADD COLUMN IF NOT EXISTS policy_actions JSONB;
+        """,
+    ]
+
+    print("🔄 Adding routing policy fields to email_processing_log table...")
+
+    with engine.connect() as connection:
+        for i, migration in enumerate(migrations, 1):
+            try:
+                print(f"   Running migration {i}/{len(migrations)}...")
+                connection.execute(text(migration))
+                connection.commit()
+                print(f"   ✅ Migration {i} completed successfully")
+            except Exception as e:
+                print(f"   ⚠️  Migration {i} warning: {e}")
+                connection.rollback()
+
+    print("✅ All routing policy migrations completed!")
+
+
+if __name__ == "__main__":
+    print("📧 Email Agent - Routing Policy Migration")
+    print("=" * 50)
+
+    try:
+        add_routing_policy_fields()
+        print("\n🎉 Migration completed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        print("   Please check your database connection and try again.")
@@ -0,0 +1,151 @@
+# api/connection_manager.py
+
+import asyncio
+import json
+import logging
+
+from fastapi import WebSocket
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Event types where only the newest event per key matters to a client that
+# has fallen behind, keyed by the payload field that identifies the subject
+COALESCED_EVENTS = {
+    "EMAIL_SUMMARY_PARTIAL": "id",
+    "INGESTION_THROTTLE": None,
+}
+
+# Sent ahead of the next event after a client's queue dropped one; the UI
+# then re-reads /api/logs/changes instead of keeping stale rows
+RESYNC_EVENT = json.dumps({"type": "RESYNC"})
+
+
+def coalesce_key(message: str) -> tuple | None:
+    """Key under which a newer event replaces a still-queued older one."""
+    try:
+        event = json.loads(message)
+        event_type = event.get("type")
+    except (ValueError, AttributeError):
+        return None
+    if event_type not in COALESCED_EVENTS:
+        return None
+    field = COALESCED_EVENTS[event_type]
+    subject = (event.get("payload") or {}).get(field) if field else None
+    return event_type, subject
+
+
+class ClientConnection:
+    """
+    Outbound side of one WebSocket: a bounded queue drained by its own
+    writer task, so a slow client only ever delays itself.
+
+    Coalesced events replace their queued predecessor in place. Other
+    events go into the queue; when it is full the oldest queued event is
+    dropped and the client is told to resync.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue: int):
+        self.websocket = websocket
+        # Items are (coalesce key, None) or (None, message)
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.latest: dict[tuple, str] = {}
+        self.writer: asyncio.Task | None = None
+        self.resync = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.resyncs = 0
+
+    def offer(self, message: str, key: tuple | None = None):
+        """Queue a message without waiting (drop or coalesce when behind)."""
+        if key is not None:
+            if key in self.latest:
+                self.latest[key] = message
+                self.coalesced += 1
+                return
+            self.latest[key] = message
+            item = (key, None)
+        else:
+            item = (None, message)
+
+        if self.queue.full():
+            dropped_key, _ = self.queue.get_nowait()
+            if dropped_key is not None:
+                del self.latest[dropped_key]
+            self.dropped += 1
+            self.resync = True
+        self.queue.put_nowait(item)
+
+    async def write(self, send_timeout: float):
+        """Send queued messages until the socket fails or stalls."""
+        while True:
+            key, message = await self.queue.get()
+            if key is not None:
+                message = self.latest.pop(key)
+            if self.resync:
+                self.resync = False
+                await asyncio.wait_for(
+                    self.websocket.send_text(RESYNC_EVENT), send_timeout
+                )
+                self.resyncs += 1
+            await asyncio.wait_for(self.websocket.send_text(message), send_timeout)
+            self.sent += 1
+
+
+class ConnectionManager:
+    """
+    Fans UI events out to every connected WebSocket without awaiting any of
+    them: broadcast() only enqueues. Sockets that error or stall for longer
+    than WS_SEND_TIMEOUT_SECONDS on one send are evicted.
+    """
+
+    def __init__(self):
+        self.max_queue = settings.WS_CLIENT_QUEUE_SIZE
+        self.send_timeout = settings.WS_SEND_TIMEOUT_SECONDS
+        self.clients: dict[WebSocket, ClientConnection] = {}
+        self.evicted = 0
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        client = ClientConnection(websocket, self.max_queue)
+        client.writer = asyncio.create_task(self._run_writer(client))
+        self.clients[websocket] = client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client and client.writer:
+            client.writer.cancel()
+
+    async def _run_writer(self, client: ClientConnection):
+        try:
+            await client.write(self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Dead or stalled socket: stop fanning out to it
+            logger.info("Evicting WebSocket client: %r", e)
+            if self.clients.pop(client.websocket, None) is not None:
+                self.evicted += 1
+            try:
+                await client.websocket.close()
+            except Exception:
+                pass
+
+    def broadcast(self, message: str):
+        key = coalesce_key(message)
+        for client in list(self.clients.values()):
+            client.offer(message, key)
+
+    def stats(self) -> dict:
+        clients = list(self.clients.values())
+        return {
+            "clients": len(clients),
+            "queued": sum(client.queue.qsize() for client in clients),
+            "sent": sum(client.sent for client in clients),
+            "dropped": sum(client.dropped for client in clients),
+            "coalesced": sum(client.coalesced for client in clients),
+            "resyncs": sum(client.resyncs for client in clients),
+            "evicted": self.evicted,
+        }
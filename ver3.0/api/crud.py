@@ -1,22 +1,136 @@
-from sqlalchemy.orm import Session
+import base64
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
 from core import models
+from core.config import settings
+
+Log = models.EmailProcessingLog
+
+# Columns of a log list item (schemas.EmailLogBase)
+LIST_COLUMNS = (
+    Log.id,
+    Log.subject,
+    Log.sender_address,
+    Log.status,
+    Log.received_at,
+    Log.project_id,
+)
+
+
+class InvalidCursor(ValueError):
+    """The cursor token is malformed or was not issued by this module."""
+
+
+def encode_cursor(position: datetime, log_id: int) -> str:
+    """Opaque token for a (timestamp, id) position in a keyset order."""
+    raw = json.dumps([position.isoformat(), log_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
 
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position, log_id = json.loads(raw)
+        return datetime.fromisoformat(position), int(log_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
 
-def get_log_by_id(db: Session, log_id: int) -> models.EmailProcessingLog | None:
-    return (
-        db.query(models.EmailProcessingLog)
-        .filter(models.EmailProcessingLog.id == log_id)
-        .first()
+
+async def get_log_by_id(
+    db: AsyncSession, log_id: int
+) -> models.EmailProcessingLog | None:
+    result = await db.execute(
+        select(Log).options(undefer_group(models.CONTENT_GROUP)).where(Log.id == log_id)
     )
+    return result.scalars().first()
+
+
+async def get_logs_page(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: str | None = None,
+    status: models.ProcessingStatus | None = None,
+    project_id: str | None = None,
+    sender_address: str | None = None,
+    received_after: datetime | None = None,
+    received_before: datetime | None = None,
+    offset: int = 0,
+) -> tuple[list[dict], str | None]:
+    """
+    One page of logs, newest first, and the cursor of the next page (None on
+    the last page). Pages are keyset-paginated on (received_at, id), so each
+    is a range scan of a composite index however deep it is. ``offset``
+    (the deprecated ``skip`` paging) only applies without a cursor.
+
+    Only the list columns are selected, as plain dicts: no ORM objects are
+    built and the deferred content columns are never read.
+    """
+    query = select(*LIST_COLUMNS)
+    if status is not None:
+        query = query.where(Log.status == status)
+    if project_id is not None:
+        query = query.where(Log.project_id == project_id)
+    if sender_address is not None:
+        query = query.where(Log.sender_address == sender_address)
+    if received_after is not None:
+        query = query.where(Log.received_at >= received_after)
+    if received_before is not None:
+        query = query.where(Log.received_at < received_before)
+    if cursor is not None:
+        query = query.where(
+            tuple_(Log.received_at, Log.id) < tuple_(*decode_cursor(cursor))
+        )
+    elif offset:
+        query = query.offset(offset)
 
+    query = query.order_by(Log.received_at.desc(), Log.id.desc()).limit(limit + 1)
+    logs = [dict(row) for row in (await db.execute(query)).mappings()]
+    if len(logs) > limit:
+        last = logs[limit - 1]
+        return logs[:limit], encode_cursor(last["received_at"], last["id"])
+    return logs, None
+
+
+async def get_log_changes(
+    db: AsyncSession, since: str | None = None, limit: int = 500
+) -> tuple[list[dict], str, bool]:
+    """
+    Logs created or changed after the ``since`` cursor, oldest change first,
+    with the cursor to pass next time and whether more changes are waiting.
+    Without ``since`` only the current cursor is returned.
+
+    Changes are read up to CHANGES_SAFETY_LAG_SECONDS behind the database
+    clock: status_updated_at is stamped when the row is written
+    (clock_timestamp()), so a transaction still committing can carry a
+    slightly older timestamp than changes already returned.
+    """
+    horizon = await db.scalar(select(func.now())) - timedelta(
+        seconds=settings.CHANGES_SAFETY_LAG_SECONDS
+    )
+    head = (horizon, 0)
+    if since is None:
+        return [], encode_cursor(*head), False
 
-def get_all_logs(
-    db: Session, skip: int = 0, limit: int = 100
-) -> list[models.EmailProcessingLog]:
-    return (
-        db.query(models.EmailProcessingLog)
-        .order_by(models.EmailProcessingLog.received_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    position = decode_cursor(since)
+    query = (
+        select(*LIST_COLUMNS, Log.status_updated_at)
+        .where(
+            tuple_(Log.status_updated_at, Log.id) > tuple_(*position),
+            Log.status_updated_at <= horizon,
+        )
+        .order_by(Log.status_updated_at, Log.id)
+        .limit(limit + 1)
     )
+    changes = [dict(row) for row in (await db.execute(query)).mappings()]
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        position = max(position, (changes[-1]["status_updated_at"], changes[-1]["id"]))
+    if not has_more:
+        # Nothing else up to the horizon; never step back behind ``since``
+        position = max(position, head)
+    return changes, encode_cursor(*position), has_more
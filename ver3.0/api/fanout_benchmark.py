@@ -0,0 +1,195 @@
+# api/fanout_benchmark.py
+#
+# Benchmark of the UI WebSocket fan-out with simulated clients: most read
+# promptly, some are slow, some stall on a send and some are dead. Compares
+# ConnectionManager (per-client queues and writer tasks) with the previous
+# sequential broadcast loop, which awaits every send in turn:
+#
+#   python -m api.fanout_benchmark --clients 1000 --events 50
+#   python -m api.fanout_benchmark --mode queued --events 500 --rate 200
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from .connection_manager import ConnectionManager
+
+
+class SimulatedWebSocket:
+    """The parts of a Starlette WebSocket the fan-out uses."""
+
+    def __init__(self, kind: str, delay: float, published: dict[int, float]):
+        self.kind = kind
+        self.delay = delay
+        self.published = published
+        self.latencies: list[float] = []
+        self.resyncs = 0
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+    async def send_text(self, message: str):
+        if self.kind == "dead":
+            raise ConnectionResetError("simulated dead socket")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        seq = json.loads(message).get("seq")
+        if seq is None:
+            self.resyncs += 1
+            return
+        self.latencies.append(time.perf_counter() - self.published[seq])
+
+
+def build_events(count: int) -> list[tuple[int, str]]:
+    """
+    Alternate new-log events with partial summaries of a few emails. Every
+    event carries a unique ``seq`` that keys its publish time.
+    """
+    events = []
+    for seq in range(count):
+        if seq % 2:
+            event = {
+                "type": "EMAIL_SUMMARY_PARTIAL",
+                "seq": seq,
+                "payload": {"id": seq % 5, "partial_summary": "x" * 200},
+            }
+        else:
+            event = {"type": "NEW_EMAIL_LOG", "seq": seq, "payload": {"id": seq}}
+        events.append((seq, json.dumps(event)))
+    return events
+
+
+def build_clients(args, published: dict[int, float]) -> list[SimulatedWebSocket]:
+    counts = {
+        "dead": int(args.clients * args.dead_fraction),
+        "stalled": int(args.clients * args.stalled_fraction),
+        "slow": int(args.clients * args.slow_fraction),
+    }
+    delays = {"dead": 0.0, "stalled": args.stall_seconds, "slow": args.slow_delay}
+    kinds = [kind for kind, count in counts.items() for _ in range(count)]
+    kinds += ["fast"] * (args.clients - len(kinds))
+    random.Random(args.seed).shuffle(kinds)
+    return [
+        SimulatedWebSocket(kind, delays.get(kind, 0.0), published) for kind in kinds
+    ]
+
+
+def percentiles(samples: list[float]) -> str:
+    if not samples:
+        return "n/a"
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return (
+        f"p50 {statistics.median(samples) * 1000:.2f} ms, "
+        f"p99 {p99 * 1000:.2f} ms, max {samples[-1] * 1000:.2f} ms"
+    )
+
+
+async def run_queued(args, events: list[tuple[int, str]]) -> dict:
+    published: dict[int, float] = {}
+    sockets = build_clients(args, published)
+    manager = ConnectionManager()
+    manager.max_queue = args.queue_size
+    manager.send_timeout = args.send_timeout
+    for websocket in sockets:
+        await manager.connect(websocket)
+
+    broadcast_times = []
+    for seq, message in events:
+        published[seq] = time.perf_counter()
+        manager.broadcast(message)
+        broadcast_times.append(time.perf_counter() - published[seq])
+        await asyncio.sleep(1 / args.rate)
+
+    # Let the healthy clients drain their queues
+    deadline = time.perf_counter() + args.drain_seconds
+    while manager.stats()["queued"] and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+    stats = manager.stats()
+    for websocket in list(manager.clients):
+        manager.disconnect(websocket)
+    return {"sockets": sockets, "broadcast": broadcast_times, "stats": stats}
+
+
+async def run_sequential(args, events: list[tuple[int, str]]) -> dict:
+    """The previous ConnectionManager.broadcast: one await per socket."""
+    published: dict[int, float] = {}
+    sockets = build_clients(args, published)
+
+    broadcast_times = []
+    aborted = 0
+    for seq, message in events:
+        published[seq] = time.perf_counter()
+        try:
+            for websocket in sockets:
+                await websocket.send_text(message)
+        except Exception:
+            # A dead socket aborted the rest of this broadcast
+            aborted += 1
+        broadcast_times.append(time.perf_counter() - published[seq])
+        await asyncio.sleep(1 / args.rate)
+    return {"sockets": sockets, "broadcast": broadcast_times, "aborted": aborted}
+
+
+def report(name: str, result: dict, events: list[tuple[int, str]]):
+    fast = [websocket for websocket in result["sockets"] if websocket.kind == "fast"]
+    latencies = [latency for websocket in fast for latency in websocket.latencies]
+    received = sum(len(websocket.latencies) for websocket in fast)
+    print(f"\n== {name} ==")
+    print(f"broadcast call:       {percentiles(result['broadcast'])}")
+    print(f"fast-client delivery: {percentiles(latencies)}")
+    print(
+        f"fast clients received {received}/{len(fast) * len(events)} events "
+        "(coalesced partials count once)"
+    )
+    resyncs = sum(websocket.resyncs for websocket in result["sockets"])
+    print(f"resync events received: {resyncs}")
+    if "aborted" in result:
+        print(f"broadcasts aborted by a dead socket: {result['aborted']}")
+    if "stats" in result:
+        print(f"manager stats: {result['stats']}")
+
+
+async def _main(args):
+    events = build_events(args.events)
+    print(
+        f"{args.clients} clients ({args.slow_fraction:.0%} slow, "
+        f"{args.stalled_fraction:.0%} stalled, {args.dead_fraction:.0%} dead), "
+        f"{args.events} events at {args.rate}/s"
+    )
+    if args.mode in ("queued", "both"):
+        report("per-client queues", await run_queued(args, events), events)
+    if args.mode in ("sequential", "both"):
+        report("sequential broadcast", await run_sequential(args, events), events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the WebSocket fan-out")
+    parser.add_argument(
+        "--mode", choices=("queued", "sequential", "both"), default="both"
+    )
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=50, help="events per second")
+    parser.add_argument("--slow-fraction", type=float, default=0.02)
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    parser.add_argument("--stalled-fraction", type=float, default=0.01)
+    parser.add_argument("--stall-seconds", type=float, default=2.0)
+    parser.add_argument("--dead-fraction", type=float, default=0.01)
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--send-timeout", type=float, default=1.0)
+    parser.add_argument("--drain-seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
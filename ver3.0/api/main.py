@@ -1,38 +1,34 @@
 import asyncio
 import json
+from datetime import datetime
 import aio_pika
-from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import (
+    FastAPI,
+    Depends,
+    HTTPException,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import crud, schemas
-from core.database import SessionLocal, get_db
+from .connection_manager import ConnectionManager
+from core.database import get_async_db, get_async_engine, pool_metrics
 from core.config import settings
+from core.models import ProcessingStatus
+from core.async_rabbitmq_client import AsyncRabbitMQClient
+from core.dead_letter import dead_letter_counts, replay_dead_letters, stage_queues
 
 # Import the email polling function
-from email_polling_service.poll_emails import run_polling_cycle
+from email_polling_service.poll_emails import backpressure, run_polling_cycle
 
 # Import OpenAI client for attachment analysis
 from email_summarizer_service.openai_client import AzureOpenAIClient
 
-
 # --- WebSocket Connection Manager ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
-
-
 manager = ConnectionManager()
 
 
@@ -52,7 +48,8 @@ async def listen_to_rabbitmq():
         async with queue.iterator() as queue_iter:
             async for message in queue_iter:
                 async with message.process():
-                    await manager.broadcast(message.body.decode())
+                    # Only enqueues per client; slow sockets cannot stall this
+                    manager.broadcast(message.body.decode())
 
 
 # --- FastAPI App ---
@@ -65,6 +62,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -73,19 +71,89 @@ async def startup_event():
     asyncio.create_task(listen_to_rabbitmq())
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_async_engine().dispose()
+
+
 # --- REST Endpoints for Internal UI ---
 
 
 # --- Endpoint to Get All Logs ---
 @app.get("/api/logs", response_model=list[schemas.EmailLogBase])
-def read_logs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_all_logs(db, skip=skip, limit=limit)
+async def read_logs(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    skip: int = Query(
+        0, ge=0, deprecated=True, description="Offset paging; use cursor instead"
+    ),
+    status: ProcessingStatus | None = None,
+    project_id: str | None = None,
+    sender_address: str | None = None,
+    received_after: datetime | None = None,
+    received_before: datetime | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Logs newest first. When more remain, the X-Next-Cursor header holds the
+    cursor to pass back for the next page (with the same filters).
+
+    ``skip`` is the deprecated offset paging, still honoured without a
+    cursor so existing clients keep working; deep offsets scan every
+    skipped row.
+    """
+    if skip and cursor is not None:
+        raise HTTPException(
+            status_code=400, detail="Pass either cursor or skip, not both"
+        )
+    if skip:
+        response.headers["Deprecation"] = "true"
+    try:
+        logs, next_cursor = await crud.get_logs_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            offset=skip,
+            status=status,
+            project_id=project_id,
+            sender_address=sender_address,
+            received_after=received_after,
+            received_before=received_before,
+        )
+    except crud.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return logs
+
+
+# --- Delta Sync of the Log List ---
+# Declared before /api/logs/{log_id} so "changes" is not read as an ID
+@app.get("/api/logs/changes", response_model=schemas.LogChanges)
+async def read_log_changes(
+    since: str | None = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Logs created or updated since the ``since`` cursor. Call it without
+    ``since`` before loading /api/logs to get the starting cursor, then with
+    the returned cursor (again at once while ``has_more``).
+    """
+    try:
+        items, cursor, has_more = await crud.get_log_changes(
+            db, since=since, limit=limit
+        )
+    except crud.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "cursor": cursor, "has_more": has_more}
 
 
 # --- REST Endpoint for Log Details ---
 @app.get("/api/logs/{log_id}", response_model=schemas.EmailLogDetails)
-def read_log_details(log_id: int, db: Session = Depends(get_db)):
-    db_log = crud.get_log_by_id(db, log_id=log_id)
+async def read_log_details(log_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_log = await crud.get_log_by_id(db, log_id=log_id)
     if db_log is None:
         raise HTTPException(status_code=404, detail="Log not found")
     return db_log
@@ -97,20 +165,46 @@ async def fetch_emails_manually():
     """Manually trigger email fetching - useful for staging/testing environments."""
     try:
         await run_polling_cycle()
-        return {"status": "success", "message": "Email fetch completed successfully"}
+        return {
+            "status": "success",
+            "message": "Email fetch completed successfully",
+            "backpressure": backpressure.state(),
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch emails: {str(e)}")
 
 
+# --- Ingestion Backpressure State ---
+@app.get("/api/pipeline/backpressure")
+def read_backpressure_state():
+    """Whether the poller is currently throttled by the downstream backlog."""
+    return backpressure.state()
+
+
+# --- Database Pool Saturation ---
+@app.get("/api/metrics/db-pool")
+def read_db_pool_metrics():
+    """Checked-out connections, saturation and checkout waits of the API pool."""
+    return pool_metrics.snapshot()
+
+
+# --- WebSocket Fan-out State ---
+@app.get("/api/metrics/websockets")
+def read_websocket_metrics():
+    """Connected clients and their queued, dropped, coalesced and resync events."""
+    return manager.stats()
+
+
 # --- Attachment Analysis Endpoint ---
 @app.post("/api/analyze-attachments", response_model=schemas.AttachmentAnalysisResult)
 async def analyze_attachments(
-    request: schemas.AttachmentAnalysisRequest, db: Session = Depends(get_db)
+    request: schemas.AttachmentAnalysisRequest,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Analyze selected email attachments using AI."""
     try:
         # Get email details
-        email_log = crud.get_log_by_id(db, log_id=request.email_id)
+        email_log = await crud.get_log_by_id(db, log_id=request.email_id)
         if not email_log:
             raise HTTPException(status_code=404, detail="Email not found")
 
@@ -122,7 +216,9 @@ async def analyze_attachments(
 
         # Initialize OpenAI client and analyze attachments
         openai_client = AzureOpenAIClient()
-        analysis_result = openai_client.analyze_attachments(
+        # May wait on the shared Azure OpenAI rate limiter; keep the loop free
+        analysis_result = await asyncio.to_thread(
+            openai_client.analyze_attachments,
             attachment_filenames=request.attachment_filenames,
             email_context=email_context,
         )
@@ -143,12 +239,13 @@ async def analyze_attachments(
 # --- Email Confirmation Endpoint ---
 @app.post("/api/confirm-email")
 async def confirm_email_summary(
-    request: schemas.EmailConfirmationRequest, db: Session = Depends(get_db)
+    request: schemas.EmailConfirmationRequest,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Confirm and save email summary with human validation."""
     try:
         # Get email details
-        email_log = crud.get_log_by_id(db, log_id=request.email_id)
+        email_log = await crud.get_log_by_id(db, log_id=request.email_id)
         if not email_log:
             raise HTTPException(status_code=404, detail="Email not found")
 
@@ -179,6 +276,35 @@ async def confirm_email_summary(
         )
 
 
+# --- Dead-Letter Endpoints ---
+@app.get("/api/dead-letters")
+async def read_dead_letters():
+    """Number of dead-lettered jobs per pipeline stage."""
+    try:
+        async with AsyncRabbitMQClient() as client:
+            return await dead_letter_counts(client)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to read dead letters: {str(e)}"
+        )
+
+
+@app.post("/api/dead-letters/{stage}/replay")
+async def replay_stage_dead_letters(stage: str, limit: int | None = None):
+    """Move dead-lettered jobs of a stage back onto its queue."""
+    queues = stage_queues()
+    if stage not in queues:
+        raise HTTPException(status_code=404, detail=f"Unknown stage '{stage}'")
+    try:
+        async with AsyncRabbitMQClient() as client:
+            replayed = await replay_dead_letters(client, queues[stage], limit)
+        return {"status": "success", "stage": stage, "replayed": replayed}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to replay dead letters: {str(e)}"
+        )
+
+
 # --- WebSocket Endpoint ---
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -186,5 +312,8 @@ async def websocket_endpoint(websocket: WebSocket):
     try:
         while True:
             await websocket.receive_text()
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the manager already closed an evicted socket
+        pass
+    finally:
         manager.disconnect(websocket)
@@ -51,9 +51,20 @@ class EmailLogBase(BaseModel):
     project_id: str | None = None
 
 
+class LogChanges(BaseModel):
+    """Logs changed since a cursor, for incremental client sync."""
+
+    items: list[EmailLogBase]
+    cursor: str
+    has_more: bool
+
+
 class EmailLogDetails(EmailLogBase):
     body: str | None
     email_summary: str | None
     parsed_attachments_json: list[ParsedAttachment] | None = []
     project_name: str | None = None
     is_new_enquiry: bool | None = None
+    summary_source: str | None = None
+    derived_from_id: int | None = None
+    policy_rule: str | None = None
@@ -59,17 +59,17 @@ if [ -d "logs" ]; then
     ls -la logs/
     echo ""
     echo "📄 Parser Service Status:"
-    if [ -f "logs/parser.log" ]; then
+    if [ -f "logs/parser-0.log" ]; then
         echo "   Last parser activity:"
-        tail -n 3 "logs/parser.log" | sed 's/^/      /'
+        tail -n 3 "logs/parser-0.log" | sed 's/^/      /'
     else
         echo "   ❌ No parser log found"
     fi
     echo ""
     echo "📄 Summarizer Service Status:"
-    if [ -f "logs/summarizer.log" ]; then
+    if [ -f "logs/summarizer-0.log" ]; then
         echo "   Last summarizer activity:"
-        tail -n 3 "logs/summarizer.log" | sed 's/^/      /'
+        tail -n 3 "logs/summarizer-0.log" | sed 's/^/      /'
     else
         echo "   ❌ No summarizer log found"
     fi
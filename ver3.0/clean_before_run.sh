@@ -13,12 +13,15 @@ echo "==> Recreating tables using create_tables.py..."
 source venv/bin/activate
 python create_tables.py
 
-echo "==> Purging RabbitMQ Queues..."
+echo "==> Deleting RabbitMQ Queues..."
+# Deleted rather than purged so services redeclare them with the current
+# arguments (x-max-priority). To only change the queue arguments, without
+# dropping the table, use: python -m core.priority redeclare
 # Ensure management plugin host, port and vhost are specified for rabbitmqadmin
 # Use HTTP management port for rabbitmqadmin (default 15672)
 MGMT_PORT=${RABBITMQ_MGMT_PORT:-15672}
 rabbitmqadmin -u $RABBITMQ_USER -p $RABBITMQ_PASS \
-  --host=$RABBITMQ_HOST --port=$MGMT_PORT --vhost=/ purge queue name=$RABBITMQ_INPUT_QUEUE_NAME
+  --host=$RABBITMQ_HOST --port=$MGMT_PORT --vhost=/ delete queue name=$RABBITMQ_INPUT_QUEUE_NAME
 rabbitmqadmin -u $RABBITMQ_USER -p $RABBITMQ_PASS \
-  --host=$RABBITMQ_HOST --port=$MGMT_PORT --vhost=/ purge queue name=$RABBITMQ_OUTPUT_QUEUE_NAME
+  --host=$RABBITMQ_HOST --port=$MGMT_PORT --vhost=/ delete queue name=$RABBITMQ_OUTPUT_QUEUE_NAME
 
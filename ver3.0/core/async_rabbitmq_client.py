@@ -1,9 +1,11 @@
+import asyncio
 import json
 import logging
 from datetime import datetime, date
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
 import aio_pika
 from .config import settings
+from .priority import stage_queue_arguments
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,17 @@ def json_datetime_serializer(obj):
     raise TypeError("Type %s not serializable" % type(obj))
 
 
+class PublishConfirmError(Exception):
+    """Raised when messages are still nacked/unconfirmed after all retries."""
+
+    def __init__(self, queue_name: str, message_bodies: list[Dict[str, Any]]):
+        super().__init__(
+            f"{len(message_bodies)} message(s) to '{queue_name}' not confirmed"
+        )
+        self.queue_name = queue_name
+        self.message_bodies = message_bodies
+
+
 class AsyncRabbitMQClient:
     """Async RabbitMQ client using aio_pika for non-blocking operations"""
 
@@ -22,19 +35,65 @@ class AsyncRabbitMQClient:
         self.rabbitmq_url = settings.RABBITMQ_URL
         self.connection = None
         self.channel = None
+        self.event_channel = None
+        self.confirm_window = settings.PUBLISH_CONFIRM_WINDOW
+        self.confirm_timeout = settings.PUBLISH_CONFIRM_TIMEOUT_SECONDS
+        self.max_publish_retries = settings.PUBLISH_MAX_RETRIES
+        # Declared once per connection; the robust channel re-declares
+        # them by itself after a reconnect
+        self.exchanges: Dict[str, aio_pika.abc.AbstractExchange] = {}
+        self.queues: Dict[str, aio_pika.abc.AbstractQueue] = {}
 
     async def connect(self):
         """Establish connection to RabbitMQ"""
         if not self.connection or self.connection.is_closed:
             self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
-            self.channel = await self.connection.channel()
+            # Publisher confirms: every publish resolves on the broker ack
+            self.channel = await self.connection.channel(publisher_confirms=True)
             await self.channel.set_qos(prefetch_count=1)
+            # UI events are fire-and-forget: no confirm round trip per event
+            self.event_channel = await self.connection.channel(publisher_confirms=False)
+            self.exchanges.clear()
+            self.queues.clear()
+
+    async def get_queue(
+        self, queue_name: str, arguments: Dict[str, Any] | None = None
+    ) -> aio_pika.abc.AbstractQueue:
+        """
+        Declare a durable queue once and reuse it. Stage queues get their
+        priority arguments unless ``arguments`` are given.
+        """
+        if arguments is None:
+            arguments = stage_queue_arguments(queue_name)
+        if queue_name not in self.queues:
+            self.queues[queue_name] = await self.channel.declare_queue(
+                queue_name, durable=True, arguments=arguments
+            )
+        return self.queues[queue_name]
+
+    async def get_fanout_exchange(
+        self, exchange_name: str
+    ) -> aio_pika.abc.AbstractExchange:
+        """Declare a durable fanout exchange once and reuse it."""
+        if exchange_name not in self.exchanges:
+            self.exchanges[exchange_name] = await self.event_channel.declare_exchange(
+                exchange_name, aio_pika.ExchangeType.FANOUT, durable=True
+            )
+        return self.exchanges[exchange_name]
+
+    async def queue_depth(self, queue_name: str) -> int:
+        """Ready messages in a queue, read with a passive declare."""
+        if not self.channel:
+            await self.connect()
+        queue = await self.channel.declare_queue(queue_name, passive=True)
+        return queue.declaration_result.message_count
 
     async def close(self):
         """Close connection to RabbitMQ"""
         try:
-            if self.channel and not self.channel.is_closed:
-                await self.channel.close()
+            for channel in (self.event_channel, self.channel):
+                if channel and not channel.is_closed:
+                    await channel.close()
             if self.connection and not self.connection.is_closed:
                 await self.connection.close()
             logger.info("RabbitMQ connection closed.")
@@ -50,34 +109,92 @@ class AsyncRabbitMQClient:
         """Async context manager exit"""
         await self.close()
 
-    async def publish_job_to_queue(self, queue_name: str, message_body: Dict[str, Any]):
+    async def publish_job_to_queue(
+        self,
+        queue_name: str,
+        message_body: Dict[str, Any],
+        headers: Dict[str, Any] | None = None,
+    ):
         """
         Publish a single job message to a specific queue.
         """
-        try:
-            if not self.channel:
-                await self.connect()
+        await self.publish_many(queue_name, [message_body], headers=headers)
 
-            # Declare the queue to ensure it exists
-            await self.channel.declare_queue(queue_name, durable=True)
+    async def publish_many(
+        self,
+        queue_name: str,
+        message_bodies: Iterable[Dict[str, Any]],
+        headers: Dict[str, Any] | None = None,
+    ):
+        """
+        Publish job messages with publisher confirms, pipelined: up to
+        PUBLISH_CONFIRM_WINDOW publishes are outstanding at once and their
+        confirms are awaited together. Nacked or timed-out messages are
+        retried with backoff; PublishConfirmError is raised if any are still
+        unconfirmed after PUBLISH_MAX_RETRIES.
+        """
+        if not self.channel:
+            await self.connect()
 
-            # Prepare the message
-            message = aio_pika.Message(
-                body=json.dumps(
-                    message_body, default=json_datetime_serializer
-                ).encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                content_type="application/json",
-            )
+        # Declare the queue to ensure it exists
+        await self.get_queue(queue_name)
 
-            # Publish to queue
-            await self.channel.default_exchange.publish(message, routing_key=queue_name)
+        pending = list(message_bodies)
+        total = len(pending)
+        for attempt in range(self.max_publish_retries + 1):
+            if attempt:
+                await asyncio.sleep(min(0.1 * 2**attempt, 5.0))
+                logger.warning(
+                    "Retrying %d unconfirmed message(s) to queue '%s' (attempt %d)",
+                    len(pending),
+                    queue_name,
+                    attempt,
+                )
 
-            logger.info("Sent job to queue '%s'", queue_name)
+            failed = []
+            for start in range(0, len(pending), self.confirm_window):
+                window = pending[start : start + self.confirm_window]
+                results = await asyncio.gather(
+                    *(
+                        self.channel.default_exchange.publish(
+                            self._job_message(body, headers),
+                            routing_key=queue_name,
+                            timeout=self.confirm_timeout,
+                        )
+                        for body in window
+                    ),
+                    return_exceptions=True,
+                )
+                for body, result in zip(window, results):
+                    if isinstance(result, BaseException):
+                        logger.debug("Publish not confirmed: %r", result)
+                        failed.append(body)
 
-        except Exception as e:
-            logger.error("Failed to publish job to queue '%s': %s", queue_name, e)
-            raise
+            pending = failed
+            if not pending:
+                logger.info("Sent %d job(s) to queue '%s'", total, queue_name)
+                return
+
+        logger.error(
+            "Failed to publish %d/%d job(s) to queue '%s'",
+            len(pending),
+            total,
+            queue_name,
+        )
+        raise PublishConfirmError(queue_name, pending)
+
+    @staticmethod
+    def _job_message(
+        message_body: Dict[str, Any], headers: Dict[str, Any] | None = None
+    ) -> aio_pika.Message:
+        # The priority travels in the body so retries and replays keep it
+        return aio_pika.Message(
+            body=json.dumps(message_body, default=json_datetime_serializer).encode(),
+            headers=headers,
+            priority=message_body.get("priority"),
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            content_type="application/json",
+        )
 
     async def publish_event_to_fanout(
         self, exchange_name: str, event_body: Dict[str, Any]
@@ -90,9 +207,7 @@ class AsyncRabbitMQClient:
                 await self.connect()
 
             # Declare the fanout exchange
-            exchange = await self.channel.declare_exchange(
-                exchange_name, aio_pika.ExchangeType.FANOUT, durable=True
-            )
+            exchange = await self.get_fanout_exchange(exchange_name)
 
             # Prepare the message
             message = aio_pika.Message(
@@ -104,7 +219,7 @@ class AsyncRabbitMQClient:
             # Publish to fanout exchange
             await exchange.publish(message, routing_key="")
 
-            logger.info("Sent event to exchange '%s'", exchange_name)
+            logger.debug("Sent event to exchange '%s'", exchange_name)
 
         except Exception as e:
             logger.error(
@@ -112,40 +227,134 @@ class AsyncRabbitMQClient:
             )
             raise
 
-    async def consume_from_queue(self, queue_name: str, callback):
+    async def consume_from_queue(self, queue_name: str, callback) -> str:
         """
         Start consuming messages from a queue with a callback function.
+
+        Returns:
+            The consumer tag, for cancel_consumer()
         """
         try:
             if not self.channel:
                 await self.connect()
 
             # Declare the queue
-            queue = await self.channel.declare_queue(queue_name, durable=True)
+            queue = await self.get_queue(queue_name)
 
             # Start consuming
-            await queue.consume(callback)
+            consumer_tag = await queue.consume(callback)
             logger.info("Started consuming from queue '%s'", queue_name)
+            return consumer_tag
 
         except Exception as e:
             logger.error("Failed to consume from queue '%s': %s", queue_name, e)
             raise
 
+    async def cancel_consumer(self, queue_name: str, consumer_tag: str):
+        """Stop delivering new messages to a consumer (graceful drain)."""
+        queue = await self.get_queue(queue_name)
+        await queue.cancel(consumer_tag)
+
+
+# Swapped by the in-memory pipeline mode; see set_client_factory()
+_client_factory = AsyncRabbitMQClient
+
+
+def create_client():
+    """New client of the active transport (RabbitMQ unless overridden)."""
+    return _client_factory()
+
+
+def set_client_factory(factory):
+    """Route every service and the shared publisher through another transport."""
+    global _client_factory
+    _client_factory = factory
+    AsyncRabbitMQPublisher._client = None
+
 
 class AsyncRabbitMQPublisher:
     """
-    Simplified async RabbitMQ publisher for one-off publishing operations.
-    Automatically handles connection lifecycle.
+    Process-wide async RabbitMQ publisher. The first publish opens a robust
+    connection and channel that every later publish reuses, so a UI event
+    costs a single basic.publish instead of a connect/declare/close round
+    trip. aio_pika reconnects the connection transparently; if a publish
+    still fails the client is rebuilt and the publish retried once.
     """
 
-    @staticmethod
-    async def publish_job(queue_name: str, message_body: Dict[str, Any]):
-        """Publish a job message using automatic connection management"""
-        async with AsyncRabbitMQClient() as client:
-            await client.publish_job_to_queue(queue_name, message_body)
+    _client: AsyncRabbitMQClient | None = None
+    _loop: asyncio.AbstractEventLoop | None = None
+    _lock: asyncio.Lock | None = None
 
-    @staticmethod
-    async def publish_event(exchange_name: str, event_body: Dict[str, Any]):
-        """Publish an event using automatic connection management"""
-        async with AsyncRabbitMQClient() as client:
-            await client.publish_event_to_fanout(exchange_name, event_body)
+    @classmethod
+    async def get_client(cls) -> AsyncRabbitMQClient:
+        """Return the shared client, connecting on first use."""
+        loop = asyncio.get_running_loop()
+        # Connections are bound to the event loop that opened them
+        if cls._loop is not loop:
+            cls._client, cls._loop, cls._lock = None, loop, asyncio.Lock()
+
+        async with cls._lock:
+            if cls._client is None:
+                client = create_client()
+                await client.connect()
+                cls._client = client
+                logger.info("Opened shared RabbitMQ publisher connection.")
+            return cls._client
+
+    @classmethod
+    async def publish_with(cls, publish):
+        """
+        Run ``publish(client)`` on the shared client, rebuilding the client
+        and retrying once if it fails.
+        """
+        client = await cls.get_client()
+        try:
+            await publish(client)
+        except PublishConfirmError:
+            # Already retried per message; retrying the batch would duplicate it
+            raise
+        except Exception as e:
+            logger.warning("Shared publisher failed (%s); reconnecting.", e)
+            async with cls._lock:
+                if cls._client is client:
+                    cls._client = None
+            await client.close()
+            await publish(await cls.get_client())
+
+    @classmethod
+    async def publish_job(
+        cls,
+        queue_name: str,
+        message_body: Dict[str, Any],
+        headers: Dict[str, Any] | None = None,
+    ):
+        """Publish a job message on the shared connection"""
+        await cls.publish_with(
+            lambda client: client.publish_job_to_queue(
+                queue_name, message_body, headers
+            )
+        )
+
+    @classmethod
+    async def publish_many(
+        cls, queue_name: str, message_bodies: Iterable[Dict[str, Any]]
+    ):
+        """Publish a batch of jobs with pipelined confirms on the shared connection"""
+        message_bodies = list(message_bodies)
+        await cls.publish_with(
+            lambda client: client.publish_many(queue_name, message_bodies)
+        )
+
+    @classmethod
+    async def publish_event(cls, exchange_name: str, event_body: Dict[str, Any]):
+        """Publish an event on the shared connection"""
+        await cls.publish_with(
+            lambda client: client.publish_event_to_fanout(exchange_name, event_body)
+        )
+
+    @classmethod
+    async def close(cls):
+        """Close the shared connection (service shutdown)."""
+        client, cls._client = cls._client, None
+        if client:
+            await client.close()
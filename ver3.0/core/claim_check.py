@@ -0,0 +1,132 @@
+# core/claim_check.py
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Dict, Any
+
+from .async_rabbitmq_client import json_datetime_serializer
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CHECK_PREFIX = "claim-check"
+
+
+def email_payload(log_entry) -> Dict[str, Any]:
+    """Fields of an email the next pipeline stage needs."""
+    return {
+        "subject": log_entry.subject,
+        "sender_address": log_entry.sender_address,
+        "body": log_entry.body,
+        "role_of_inbox": log_entry.role_of_inbox,
+        "parsed_attachments_json": log_entry.parsed_attachments_json,
+        "policy_actions": log_entry.policy_actions,
+    }
+
+
+class ClaimCheckStore:
+    """
+    Carries email payloads between stages. Small payloads travel inline in
+    the queue message under ``payload``; larger ones are written to Azure
+    Blob Storage (or a local directory when no storage account is
+    configured, single-host only) and the message carries a
+    ``payload_ref`` instead.
+
+    Consumers fall back to reading the database when a message carries
+    neither, so older messages and replays keep working.
+    """
+
+    def __init__(self):
+        self.inline_max_bytes = settings.MESSAGE_INLINE_MAX_BYTES
+        self.local_dir = settings.CLAIM_CHECK_DIR
+        self.connection_string = settings.AZURE_STORAGE_CONNECTION_STRING
+        self.container_name = settings.AZURE_STORAGE_CONTAINER_NAME
+
+    async def attach(
+        self, message_body: Dict[str, Any], payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Add ``payload`` to ``message_body`` inline or by reference."""
+        data = json.dumps(payload, default=json_datetime_serializer).encode()
+        if len(data) <= self.inline_max_bytes:
+            message_body["payload"] = json.loads(data)
+            return message_body
+
+        key = f"{CLAIM_CHECK_PREFIX}/{uuid.uuid4().hex}.json"
+        if self.connection_string:
+            await self._put_blob(key, data)
+            message_body["payload_ref"] = {"backend": "blob", "key": key}
+        else:
+            await asyncio.to_thread(self._put_local, key, data)
+            message_body["payload_ref"] = {"backend": "local", "key": key}
+        logger.info("Stored %d byte payload by reference: %s", len(data), key)
+        return message_body
+
+    async def load(self, message_body: Dict[str, Any]) -> Dict[str, Any] | None:
+        """Return the payload of a message, or None if the DB must be read."""
+        if "payload" in message_body:
+            return message_body["payload"]
+
+        ref = message_body.get("payload_ref")
+        if not ref:
+            return None
+        try:
+            if ref["backend"] == "blob":
+                data = await self._get_blob(ref["key"])
+            else:
+                data = await asyncio.to_thread(self._get_local, ref["key"])
+            return json.loads(data)
+        except Exception as e:
+            logger.warning("Failed to load claim-check payload %s: %s", ref, e)
+            return None
+
+    async def discard(self, message_body: Dict[str, Any]):
+        """Delete a referenced payload once the consuming stage is done."""
+        ref = message_body.get("payload_ref")
+        if not ref:
+            return
+        try:
+            if ref["backend"] == "blob":
+                await self._delete_blob(ref["key"])
+            else:
+                await asyncio.to_thread(os.remove, self._local_path(ref["key"]))
+        except Exception as e:
+            logger.warning("Failed to delete claim-check payload %s: %s", ref, e)
+
+    def _local_path(self, key: str) -> str:
+        return os.path.join(self.local_dir, os.path.basename(key))
+
+    def _put_local(self, key: str, data: bytes):
+        os.makedirs(self.local_dir, exist_ok=True)
+        path = self._local_path(key)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def _get_local(self, key: str) -> bytes:
+        with open(self._local_path(key), "rb") as f:
+            return f.read()
+
+    def _blob_client(self, key: str):
+        from azure.storage.blob.aio import BlobServiceClient
+
+        service = BlobServiceClient.from_connection_string(self.connection_string)
+        return service, service.get_blob_client(container=self.container_name, blob=key)
+
+    async def _put_blob(self, key: str, data: bytes):
+        service, blob = self._blob_client(key)
+        async with service:
+            await blob.upload_blob(data, overwrite=True)
+
+    async def _get_blob(self, key: str) -> bytes:
+        service, blob = self._blob_client(key)
+        async with service:
+            stream = await blob.download_blob()
+            return await stream.readall()
+
+    async def _delete_blob(self, key: str):
+        service, blob = self._blob_client(key)
+        async with service:
+            await blob.delete_blob()
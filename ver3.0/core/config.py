@@ -1,6 +1,7 @@
 # core/config.py
 
 import os
+import tempfile
 import dotenv
 
 # Load environment variables from the .env file in the project root
@@ -13,6 +14,23 @@ class Settings:
     def __init__(self):
         # Database
         self.DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+        # Async engine of the API (asyncpg); derived from DATABASE_URL if unset
+        self.ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+        self.DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 20))
+        self.DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+        self.DB_POOL_TIMEOUT_SECONDS: float = float(
+            os.getenv("DB_POOL_TIMEOUT_SECONDS", 30)
+        )
+        # UI WebSocket fan-out: per-client outbound queue and send timeout
+        self.WS_CLIENT_QUEUE_SIZE: int = int(os.getenv("WS_CLIENT_QUEUE_SIZE", 256))
+        self.WS_SEND_TIMEOUT_SECONDS: float = float(
+            os.getenv("WS_SEND_TIMEOUT_SECONDS", 10)
+        )
+        # /api/logs/changes reads this far behind the DB clock, so changes
+        # written just before a (late) commit are not skipped
+        self.CHANGES_SAFETY_LAG_SECONDS: float = float(
+            os.getenv("CHANGES_SAFETY_LAG_SECONDS", 5)
+        )
 
         # MS Graph API
         self.AZURE_TENANT_ID: str = os.getenv("AZURE_TENANT_ID", "")
@@ -44,6 +62,112 @@ class Settings:
         )
         # --- END: CORRECTED SECTION ---
 
+        # Model routing: trivial emails get a template, simple ones the small model
+        self.AZURE_OPENAI_SMALL_DEPLOYMENT_NAME: str = os.getenv(
+            "AZURE_OPENAI_SMALL_DEPLOYMENT_NAME", ""
+        )
+        self.SUMMARY_ROUTE_TEMPLATE_MAX_TOKENS: int = int(
+            os.getenv("SUMMARY_ROUTE_TEMPLATE_MAX_TOKENS", 40)
+        )
+        self.SUMMARY_ROUTE_LARGE_MIN_SCORE: float = float(
+            os.getenv("SUMMARY_ROUTE_LARGE_MIN_SCORE", 2.0)
+        )
+        self.SUMMARY_COST_PER_1K_TOKENS_SMALL: float = float(
+            os.getenv("SUMMARY_COST_PER_1K_TOKENS_SMALL", 0.00015)
+        )
+        self.SUMMARY_COST_PER_1K_TOKENS_LARGE: float = float(
+            os.getenv("SUMMARY_COST_PER_1K_TOKENS_LARGE", 0.0025)
+        )
+
+        # Stream partial summaries to the UI
+        self.SUMMARY_STREAMING_ENABLED: bool = (
+            os.getenv("SUMMARY_STREAMING_ENABLED", "true").lower() == "true"
+        )
+        self.SUMMARY_STREAM_INTERVAL_MS: int = int(
+            os.getenv("SUMMARY_STREAM_INTERVAL_MS", 100)
+        )
+
+        # Extractive fallback while Azure OpenAI is throttled or down
+        self.EXTRACTIVE_POOL_WORKERS: int = int(os.getenv("EXTRACTIVE_POOL_WORKERS", 2))
+        self.LLM_FAILURE_COOLDOWN_SECONDS: int = int(
+            os.getenv("LLM_FAILURE_COOLDOWN_SECONDS", 60)
+        )
+        self.EXTRACTIVE_UPGRADE_INTERVAL_SECONDS: int = int(
+            os.getenv("EXTRACTIVE_UPGRADE_INTERVAL_SECONDS", 30)
+        )
+        self.EXTRACTIVE_UPGRADE_BATCH_SIZE: int = int(
+            os.getenv("EXTRACTIVE_UPGRADE_BATCH_SIZE", 10)
+        )
+        # Longest a new email waits for quota before falling back (no retries)
+        self.SUMMARY_FALLBACK_MAX_WAIT_SECONDS: float = float(
+            os.getenv("SUMMARY_FALLBACK_MAX_WAIT_SECONDS", 5)
+        )
+
+        # Summarization token budget
+        self.TOKENIZER_ENCODING: str = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+        self.SUMMARY_INPUT_TOKEN_BUDGET: int = int(
+            os.getenv("SUMMARY_INPUT_TOKEN_BUDGET", 6000)
+        )
+        if self.SUMMARY_INPUT_TOKEN_BUDGET <= 0:
+            raise ValueError("SUMMARY_INPUT_TOKEN_BUDGET must be greater than 0")
+        self.SUMMARY_MAX_CHUNKS: int = int(os.getenv("SUMMARY_MAX_CHUNKS", 8))
+        self.SUMMARY_CHUNK_CONCURRENCY: int = int(
+            os.getenv("SUMMARY_CHUNK_CONCURRENCY", 4)
+        )
+
+        # Azure OpenAI quota shared by all processes on this host
+        self.AZURE_OPENAI_TOKENS_PER_MINUTE: int = int(
+            os.getenv("AZURE_OPENAI_TOKENS_PER_MINUTE", 120000)
+        )
+        self.AZURE_OPENAI_REQUESTS_PER_MINUTE: int = int(
+            os.getenv("AZURE_OPENAI_REQUESTS_PER_MINUTE", 720)
+        )
+        self.RATE_LIMIT_STATE_FILE: str = os.getenv(
+            "RATE_LIMIT_STATE_FILE",
+            os.path.join(tempfile.gettempdir(), "email_agent_openai_rate_limit.json"),
+        )
+        self.RATE_LIMIT_MAX_WAIT_SECONDS: int = int(
+            os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", 600)
+        )
+        self.RATE_LIMIT_MAX_RETRIES: int = int(os.getenv("RATE_LIMIT_MAX_RETRIES", 6))
+
+        # Offline batch summarization (backfills / outage recovery)
+        self.AZURE_OPENAI_BATCH_DEPLOYMENT_NAME: str = os.getenv(
+            "AZURE_OPENAI_BATCH_DEPLOYMENT_NAME", self.AZURE_OPENAI_DEPLOYMENT_NAME
+        )
+        self.AZURE_OPENAI_BATCH_API_VERSION: str = os.getenv(
+            "AZURE_OPENAI_BATCH_API_VERSION", "2024-10-21"
+        )
+        self.BATCH_MAX_EMAILS_PER_JOB: int = int(
+            os.getenv("BATCH_MAX_EMAILS_PER_JOB", 1000)
+        )
+        self.BATCH_POLL_INTERVAL_SECONDS: int = int(
+            os.getenv("BATCH_POLL_INTERVAL_SECONDS", 60)
+        )
+        self.BATCH_LOCAL_DIR: str = os.getenv(
+            "BATCH_LOCAL_DIR",
+            os.path.join(tempfile.gettempdir(), "email_agent_batches"),
+        )
+
+        # Summary cache for duplicate/forwarded emails
+        self.SUMMARY_CACHE_TTL_HOURS: int = int(
+            os.getenv("SUMMARY_CACHE_TTL_HOURS", 168)
+        )
+        self.SUMMARY_CACHE_MAX_ENTRIES: int = int(
+            os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 50000)
+        )
+
+        # Near-duplicate (MinHash/LSH) summary reuse
+        self.NEAR_DUPLICATE_THRESHOLD: float = float(
+            os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.8)
+        )
+        self.NEAR_DUPLICATE_MIN_SHINGLES: int = int(
+            os.getenv("NEAR_DUPLICATE_MIN_SHINGLES", 10)
+        )
+        self.NEAR_DUPLICATE_INDEX_LIMIT: int = int(
+            os.getenv("NEAR_DUPLICATE_INDEX_LIMIT", 100000)
+        )
+
         # RabbitMQ
         self.RABBITMQ_HOST: str = os.getenv("RABBITMQ_HOST", "localhost")
         self.RABBITMQ_PORT: int = int(os.getenv("RABBITMQ_PORT", 5672))
@@ -57,12 +181,128 @@ class Settings:
             "RABBITMQ_UI_NOTIFY_EXCHANGE", ""
         )
         self.RABBITMQ_URL = (
-            f"amqp://{self.RABBITMQ_USER}:{self.RABBITMQ_PASS}@{self.RABBITMQ_HOST}/"
+            f"amqp://{self.RABBITMQ_USER}:{self.RABBITMQ_PASS}"
+            f"@{self.RABBITMQ_HOST}:{self.RABBITMQ_PORT}/"
+        )
+
+        # Publisher confirms: outstanding publishes per window, nack retries
+        self.PUBLISH_CONFIRM_WINDOW: int = int(os.getenv("PUBLISH_CONFIRM_WINDOW", 256))
+        self.PUBLISH_CONFIRM_TIMEOUT_SECONDS: float = float(
+            os.getenv("PUBLISH_CONFIRM_TIMEOUT_SECONDS", 30)
+        )
+        self.PUBLISH_MAX_RETRIES: int = int(os.getenv("PUBLISH_MAX_RETRIES", 3))
+        # Rows committed without a confirmed job (a crash before the publish)
+        # are re-published once they are this old
+        self.UNQUEUED_GRACE_SECONDS: int = int(os.getenv("UNQUEUED_GRACE_SECONDS", 300))
+
+        # Priority lanes on the stage queues (x-max-priority, 0 disables).
+        # Opt-in: existing queues must be redeclared first, see
+        # python -m core.priority redeclare
+        self.RABBITMQ_MAX_PRIORITY: int = int(os.getenv("RABBITMQ_MAX_PRIORITY", 0))
+        self.PRIORITY_LARGE_EMAIL_BYTES: int = int(
+            os.getenv("PRIORITY_LARGE_EMAIL_BYTES", 1_000_000)
+        )
+
+        # Consistent-hash sharding of the stage queues by conversation_id
+        # (0 disables); each worker consumes the shard in WORKER_SHARD
+        self.PIPELINE_SHARDS: int = int(os.getenv("PIPELINE_SHARDS", 0))
+        self.SHARD_RING_VNODES: int = int(os.getenv("SHARD_RING_VNODES", 256))
+        self.WORKER_SHARD: int = int(os.getenv("WORKER_SHARD", 0))
+
+        # Per-stage retry queues (exponential TTL backoff) and dead-letter queue
+        self.RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", 5))
+        self.RETRY_BASE_DELAY_SECONDS: int = int(
+            os.getenv("RETRY_BASE_DELAY_SECONDS", 30)
+        )
+
+        # Poller backpressure: downstream queue depth / backlog age watermarks
+        self.BACKPRESSURE_HIGH_WATERMARK: int = int(
+            os.getenv("BACKPRESSURE_HIGH_WATERMARK", 500)
+        )
+        self.BACKPRESSURE_LOW_WATERMARK: int = int(
+            os.getenv("BACKPRESSURE_LOW_WATERMARK", 100)
+        )
+        self.BACKPRESSURE_MAX_BACKLOG_AGE_SECONDS: int = int(
+            os.getenv("BACKPRESSURE_MAX_BACKLOG_AGE_SECONDS", 1800)
+        )
+        # Rows waiting longer than this are dead-lettered or orphaned, not a
+        # backlog, and do not count towards the backlog age
+        self.BACKPRESSURE_BACKLOG_HORIZON_SECONDS: int = int(
+            os.getenv("BACKPRESSURE_BACKLOG_HORIZON_SECONDS", 7200)
+        )
+
+        # Worker supervisor: process bounds per stage and scaling behaviour
+        self.PARSER_MIN_WORKERS: int = int(os.getenv("PARSER_MIN_WORKERS", 1))
+        self.PARSER_MAX_WORKERS: int = int(os.getenv("PARSER_MAX_WORKERS", 4))
+        self.SUMMARIZER_MIN_WORKERS: int = int(os.getenv("SUMMARIZER_MIN_WORKERS", 1))
+        self.SUMMARIZER_MAX_WORKERS: int = int(os.getenv("SUMMARIZER_MAX_WORKERS", 8))
+        self.SUPERVISOR_MESSAGES_PER_WORKER: int = int(
+            os.getenv("SUPERVISOR_MESSAGES_PER_WORKER", 20)
+        )
+        self.SUPERVISOR_INTERVAL_SECONDS: float = float(
+            os.getenv("SUPERVISOR_INTERVAL_SECONDS", 10)
+        )
+        self.SUPERVISOR_SCALE_DOWN_COOLDOWN_SECONDS: float = float(
+            os.getenv("SUPERVISOR_SCALE_DOWN_COOLDOWN_SECONDS", 60)
+        )
+        self.WORKER_DRAIN_TIMEOUT_SECONDS: float = float(
+            os.getenv("WORKER_DRAIN_TIMEOUT_SECONDS", 120)
+        )
+
+        # Worker leases on PARSING/ANALYZING rows and the stuck-job reaper
+        self.LEASE_DURATION_SECONDS: int = int(os.getenv("LEASE_DURATION_SECONDS", 300))
+        self.LEASE_HEARTBEAT_SECONDS: int = int(
+            os.getenv("LEASE_HEARTBEAT_SECONDS", 60)
+        )
+        self.LEASE_MAX_ATTEMPTS: int = int(os.getenv("LEASE_MAX_ATTEMPTS", 3))
+        self.REAPER_INTERVAL_SECONDS: int = int(
+            os.getenv("REAPER_INTERVAL_SECONDS", 60)
+        )
+        self.REAPER_BATCH_SIZE: int = int(os.getenv("REAPER_BATCH_SIZE", 500))
+
+        # Single-process pipeline (python -m local_pipeline.main): per-queue
+        # capacity; a full queue blocks the publishing stage
+        self.IN_MEMORY_QUEUE_MAXSIZE: int = int(
+            os.getenv("IN_MEMORY_QUEUE_MAXSIZE", 1000)
+        )
+
+        # Inter-stage payloads: inline up to this size, claim-check above it
+        self.MESSAGE_INLINE_MAX_BYTES: int = int(
+            os.getenv("MESSAGE_INLINE_MAX_BYTES", 131072)
+        )
+        self.CLAIM_CHECK_DIR: str = os.getenv(
+            "CLAIM_CHECK_DIR",
+            os.path.join(tempfile.gettempdir(), "email_agent_claim_check"),
         )
 
         # Service Specific
         self.MAILBOX_ADDRESS: str = os.getenv("MAILBOX_ADDRESS", "")
 
+        # Poller routing policy (JSON rules); empty disables it
+        self.ROUTING_POLICY_FILE: str = os.getenv(
+            "ROUTING_POLICY_FILE",
+            os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                "email_polling_service",
+                "routing_policy.json",
+            ),
+        )
+
+        # Boilerplate removal (summarizer preprocessing)
+        self.BOILERPLATE_MIN_OCCURRENCES: int = int(
+            os.getenv("BOILERPLATE_MIN_OCCURRENCES", 25)
+        )
+        self.BOILERPLATE_MIN_LINE_CHARS: int = int(
+            os.getenv("BOILERPLATE_MIN_LINE_CHARS", 20)
+        )
+        self.BOILERPLATE_MAX_AGE_DAYS: int = int(
+            os.getenv("BOILERPLATE_MAX_AGE_DAYS", 90)
+        )
+        # Line counts are buffered in memory and upserted once per N emails
+        self.BOILERPLATE_FLUSH_EVERY: int = int(
+            os.getenv("BOILERPLATE_FLUSH_EVERY", 20)
+        )
+
 
 # Create a single, global instance of the settings to be imported by other modules
 settings = Settings()
@@ -1,4 +1,8 @@
+import time
+from functools import lru_cache
+
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from .config import settings
@@ -15,3 +19,89 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def async_database_url() -> str:
+    """asyncpg URL of the database (ASYNC_DATABASE_URL or derived)."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    scheme, _, rest = settings.DATABASE_URL.partition("://")
+    if scheme.split("+")[0] in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    return settings.DATABASE_URL
+
+
+# Created on first use: only the API runs on the async engine (and needs
+# asyncpg and greenlet)
+@lru_cache(maxsize=None)
+def get_async_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    return create_async_engine(
+        async_database_url(),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_pre_ping=True,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_sessionmaker():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    # Loaded rows stay readable after commit without an (async) refresh
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False)
+
+
+class PoolMetrics:
+    """Connection checkout waits and timeouts of the async pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float):
+        self.checkouts += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def snapshot(self) -> dict:
+        pool = get_async_engine().pool
+        capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        checked_out = pool.checkedout()
+        return {
+            "pool_size": pool.size(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checked_out": checked_out,
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "saturation": round(checked_out / capacity, 3) if capacity else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": (
+                round(self.total_wait_seconds / self.checkouts * 1000, 2)
+                if self.checkouts
+                else 0.0
+            ),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+# Dependency to get an async DB session (API)
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        # Check the connection out up front to measure the wait for it
+        started = time.perf_counter()
+        try:
+            await db.connection()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.record(time.perf_counter() - started)
+        yield db
@@ -0,0 +1,211 @@
+# core/dead_letter.py
+#
+# Retry and dead-letter topology for the pipeline stage queues.
+#
+# A failed job is acked and re-published to "<queue>.retry.<n>", a queue with
+# a per-level message TTL (RETRY_BASE_DELAY_SECONDS * 2^(n-1)) that
+# dead-letters back into "<queue>" when the TTL expires. The attempt count
+# travels in the x-attempt header; after RETRY_MAX_ATTEMPTS the job goes to
+# the terminal "<queue>.dlq" until it is replayed. Shard queues retry on
+# their own retry levels but share the dead-letter queue of their stage:
+#
+#   python -m core.dead_letter stats
+#   python -m core.dead_letter replay summarizer --limit 500
+
+import argparse
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any
+
+import aio_pika
+
+from .async_rabbitmq_client import AsyncRabbitMQClient, AsyncRabbitMQPublisher
+from .config import settings
+from .sharding import base_queue_name, route_job
+
+logger = logging.getLogger(__name__)
+
+ATTEMPT_HEADER = "x-attempt"
+REPLAY_BATCH_SIZE = 500
+
+
+def stage_queues() -> Dict[str, str]:
+    """Pipeline stages with a retry/dead-letter topology, by stage name."""
+    return {
+        "parser": settings.RABBITMQ_INPUT_QUEUE_NAME,
+        "summarizer": settings.RABBITMQ_OUTPUT_QUEUE_NAME,
+    }
+
+
+def retry_queue_name(queue_name: str, level: int) -> str:
+    return f"{queue_name}.retry.{level}"
+
+
+def dead_letter_queue_name(queue_name: str) -> str:
+    return f"{queue_name}.dlq"
+
+
+def retry_delay_seconds(level: int) -> int:
+    return settings.RETRY_BASE_DELAY_SECONDS * 2 ** (level - 1)
+
+
+def retry_queue_arguments(queue_name: str, level: int) -> Dict[str, Any]:
+    """Expired messages are dead-lettered back into the stage queue."""
+    return {
+        "x-message-ttl": retry_delay_seconds(level) * 1000,
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": queue_name,
+    }
+
+
+async def declare_retry_topology(client: AsyncRabbitMQClient, queue_name: str):
+    """Declare the retry levels and the dead-letter queue of one stage."""
+    for level in range(1, settings.RETRY_MAX_ATTEMPTS):
+        await client.get_queue(
+            retry_queue_name(queue_name, level),
+            arguments=retry_queue_arguments(queue_name, level),
+        )
+    await client.get_queue(dead_letter_queue_name(base_queue_name(queue_name)))
+
+
+async def retry_or_dead_letter(
+    queue_name: str, message: aio_pika.IncomingMessage, error: Exception
+) -> str:
+    """
+    Schedule a delayed retry of a failed job, or dead-letter it once its
+    attempts are exhausted. The caller acks the original message, so the
+    consumer's prefetch slot is freed immediately.
+
+    Returns:
+        "retry" or "dead_letter"
+    """
+    attempt = int((message.headers or {}).get(ATTEMPT_HEADER, 0)) + 1
+    try:
+        message_body = json.loads(message.body.decode("utf-8"))
+    except ValueError:
+        # Malformed messages will never succeed
+        message_body = {"raw_body": message.body.decode("utf-8", "replace")}
+        attempt = settings.RETRY_MAX_ATTEMPTS
+
+    if attempt < settings.RETRY_MAX_ATTEMPTS:
+        target = retry_queue_name(queue_name, attempt)
+        headers = {ATTEMPT_HEADER: attempt}
+        outcome = "retry"
+    else:
+        target = dead_letter_queue_name(base_queue_name(queue_name))
+        headers = {
+            ATTEMPT_HEADER: attempt,
+            "x-error": str(error)[:1000],
+            "x-failed-at": datetime.now(timezone.utc).isoformat(),
+        }
+        outcome = "dead_letter"
+
+    async def publish(client: AsyncRabbitMQClient):
+        await declare_retry_topology(client, queue_name)
+        await client.publish_job_to_queue(target, message_body, headers)
+
+    await AsyncRabbitMQPublisher.publish_with(publish)
+    if outcome == "retry":
+        logger.warning(
+            "Attempt %d/%d failed for DB log ID %s; retrying in %ds",
+            attempt,
+            settings.RETRY_MAX_ATTEMPTS,
+            message_body.get("db_log_id"),
+            retry_delay_seconds(attempt),
+        )
+    else:
+        logger.error(
+            "Dead-lettered DB log ID %s after %d attempt(s): %s",
+            message_body.get("db_log_id"),
+            attempt,
+            error,
+        )
+    return outcome
+
+
+async def dead_letter_counts(client: AsyncRabbitMQClient) -> Dict[str, int]:
+    """Number of dead-lettered jobs per stage."""
+    counts = {}
+    for stage, queue_name in stage_queues().items():
+        await declare_retry_topology(client, queue_name)
+        counts[stage] = await client.queue_depth(dead_letter_queue_name(queue_name))
+    return counts
+
+
+async def replay_dead_letters(
+    client: AsyncRabbitMQClient, queue_name: str, limit: int | None = None
+) -> int:
+    """
+    Move up to ``limit`` jobs from the stage's DLQ back to the stage queue
+    (or their shard queues) with a fresh attempt count. Jobs are acked on
+    the DLQ only after their re-publish is confirmed.
+    """
+    await declare_retry_topology(client, queue_name)
+    dead_letters = await client.get_queue(dead_letter_queue_name(queue_name))
+
+    replayed = 0
+    while limit is None or replayed < limit:
+        batch_size = REPLAY_BATCH_SIZE
+        if limit is not None:
+            batch_size = min(batch_size, limit - replayed)
+
+        messages = []
+        while len(messages) < batch_size:
+            message = await dead_letters.get(no_ack=False, fail=False)
+            if message is None:
+                break
+            messages.append(message)
+        if not messages:
+            break
+
+        routed = defaultdict(list)
+        for message in messages:
+            message_body = json.loads(message.body.decode("utf-8"))
+            routed[route_job(queue_name, message_body)].append(message_body)
+        try:
+            for target, message_bodies in routed.items():
+                await client.publish_many(target, message_bodies)
+        except Exception:
+            for message in messages:
+                await message.nack(requeue=True)
+            raise
+
+        for message in messages:
+            await message.ack()
+        replayed += len(messages)
+        logger.info("Replayed %d dead-lettered job(s) to '%s'", replayed, queue_name)
+
+    return replayed
+
+
+async def _main(args):
+    async with AsyncRabbitMQClient() as client:
+        if args.command == "stats":
+            for stage, count in (await dead_letter_counts(client)).items():
+                print(f"{stage}: {count} dead-lettered job(s)")
+        else:
+            replayed = await replay_dead_letters(
+                client, stage_queues()[args.stage], args.limit
+            )
+            print(f"Replayed {replayed} job(s) to the {args.stage} queue")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and replay dead letters")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="count dead-lettered jobs per stage")
+    replay = subparsers.add_parser("replay", help="replay a stage's dead letters")
+    replay.add_argument("stage", choices=sorted(stage_queues()))
+    replay.add_argument("--limit", type=int, help="maximum number of jobs to replay")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    main()
@@ -0,0 +1,232 @@
+# core/in_memory_broker.py
+#
+# In-process stand-in for RabbitMQ used by the single-process pipeline mode
+# (python -m local_pipeline.main). Stage queues are bounded asyncio priority
+# queues behind the AsyncRabbitMQClient interface, so the poller, parser and
+# summarizer run unchanged in one event loop without a broker.
+
+import asyncio
+import itertools
+import json
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Iterable
+
+from .async_rabbitmq_client import json_datetime_serializer
+from .config import settings
+from .priority import stage_queue_arguments
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryMessage:
+    """The parts of aio_pika.IncomingMessage the stage consumers use."""
+
+    def __init__(
+        self,
+        queue: "InMemoryQueue",
+        body: bytes,
+        headers: Dict[str, Any] | None = None,
+        priority: int | None = None,
+    ):
+        self.queue = queue
+        self.body = body
+        self.headers = headers or {}
+        self.priority = priority
+        self.redelivered = False
+
+    @asynccontextmanager
+    async def process(self, requeue: bool = False):
+        """Ack on success; on an exception requeue (if asked) and re-raise."""
+        try:
+            yield self
+        except Exception:
+            if requeue:
+                self.redelivered = True
+                self.queue.requeue(self)
+            raise
+
+
+class InMemoryQueue:
+    """
+    A bounded queue with RabbitMQ semantics the pipeline relies on:
+    x-max-priority ordering (FIFO within a priority), and x-message-ttl with
+    a dead-letter routing key, which the retry queues use to hand expired
+    jobs back to their stage queue.
+    """
+
+    def __init__(
+        self, broker: "InMemoryBroker", name: str, arguments: Dict[str, Any] | None
+    ):
+        self.broker = broker
+        self.name = name
+        self.arguments = arguments or {}
+        self.max_priority = self.arguments.get("x-max-priority", 0)
+        self.items: asyncio.PriorityQueue = asyncio.PriorityQueue(broker.maxsize)
+        # Queued or being processed; the pipeline is idle when all reach 0
+        self.unfinished = 0
+        self.delayed: set[asyncio.Task] = set()
+        self.consumers: Dict[str, asyncio.Task] = {}
+
+    async def put(self, message: InMemoryMessage):
+        ttl = self.arguments.get("x-message-ttl")
+        target = self.arguments.get("x-dead-letter-routing-key")
+        if ttl is not None and target:
+            task = asyncio.create_task(self._expire(message, ttl / 1000, target))
+            self.delayed.add(task)
+            task.add_done_callback(self.delayed.discard)
+            return
+
+        priority = min(message.priority or 0, self.max_priority)
+        self.unfinished += 1
+        await self.items.put((-priority, next(self.broker.sequence), message))
+
+    def requeue(self, message: InMemoryMessage):
+        """
+        Put a rejected message back without blocking: the consumer holding
+        it is the one that would free the space, so awaiting a full queue
+        here would deadlock. The pending put counts as delayed.
+        """
+        task = asyncio.create_task(self.put(message))
+        self.delayed.add(task)
+        task.add_done_callback(self.delayed.discard)
+
+    async def _expire(self, message: InMemoryMessage, delay: float, target: str):
+        await asyncio.sleep(delay)
+        message.queue = self.broker.queue(target)
+        await message.queue.put(message)
+
+    def depth(self) -> int:
+        return self.items.qsize() + len(self.delayed)
+
+    async def consume(self, callback):
+        """Deliver one message at a time, like prefetch_count=1."""
+        while True:
+            _, _, message = await self.items.get()
+            # Cancelling the consumer lets the current delivery finish
+            await asyncio.shield(self._deliver(callback, message))
+
+    async def _deliver(self, callback, message: InMemoryMessage):
+        try:
+            await callback(message)
+        except Exception as e:
+            logger.error("Unhandled error consuming from '%s': %s", self.name, e)
+        finally:
+            self.unfinished -= 1
+
+
+class InMemoryBroker:
+    """Queues and fanout event counts shared by every in-memory client."""
+
+    def __init__(self, maxsize: int | None = None):
+        self.maxsize = (
+            maxsize if maxsize is not None else settings.IN_MEMORY_QUEUE_MAXSIZE
+        )
+        self.queues: Dict[str, InMemoryQueue] = {}
+        self.events: Counter = Counter()
+        self.sequence = itertools.count()
+        self.consumer_tags = itertools.count(1)
+
+    def queue(
+        self, queue_name: str, arguments: Dict[str, Any] | None = None
+    ) -> InMemoryQueue:
+        """Declare a queue; like RabbitMQ, the first declaration's arguments win."""
+        if queue_name not in self.queues:
+            if arguments is None:
+                arguments = stage_queue_arguments(queue_name)
+            self.queues[queue_name] = InMemoryQueue(self, queue_name, arguments)
+        return self.queues[queue_name]
+
+    def is_idle(self) -> bool:
+        """No job is waiting, delayed for a retry, or being processed."""
+        return all(
+            not queue.delayed and (not queue.consumers or not queue.unfinished)
+            for queue in self.queues.values()
+        )
+
+    async def wait_idle(self, poll_interval: float = 0.1):
+        while not self.is_idle():
+            await asyncio.sleep(poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depths": {
+                name: queue.depth() for name, queue in self.queues.items()
+            },
+            "events": dict(self.events),
+        }
+
+
+class InMemoryRabbitMQClient:
+    """AsyncRabbitMQClient interface over an InMemoryBroker."""
+
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def get_queue(
+        self, queue_name: str, arguments: Dict[str, Any] | None = None
+    ) -> InMemoryQueue:
+        return self.broker.queue(queue_name, arguments)
+
+    async def queue_depth(self, queue_name: str) -> int:
+        if queue_name not in self.broker.queues:
+            # Same as a passive declare of a missing queue
+            raise LookupError(f"Queue '{queue_name}' does not exist")
+        return self.broker.queues[queue_name].depth()
+
+    async def publish_job_to_queue(
+        self,
+        queue_name: str,
+        message_body: Dict[str, Any],
+        headers: Dict[str, Any] | None = None,
+    ):
+        await self.publish_many(queue_name, [message_body], headers=headers)
+
+    async def publish_many(
+        self,
+        queue_name: str,
+        message_bodies: Iterable[Dict[str, Any]],
+        headers: Dict[str, Any] | None = None,
+    ):
+        """Enqueue jobs; waits while the queue is full."""
+        queue = self.broker.queue(queue_name)
+        for message_body in message_bodies:
+            # Serialised like the real client so consumers decode the same bytes
+            body = json.dumps(message_body, default=json_datetime_serializer).encode()
+            await queue.put(
+                InMemoryMessage(
+                    queue, body, dict(headers or {}), message_body.get("priority")
+                )
+            )
+
+    async def publish_event_to_fanout(
+        self, exchange_name: str, event_body: Dict[str, Any]
+    ):
+        # No UI is attached in-process; count the events for the run summary
+        self.broker.events[event_body.get("type", exchange_name)] += 1
+
+    async def consume_from_queue(self, queue_name: str, callback) -> str:
+        queue = self.broker.queue(queue_name)
+        consumer_tag = f"in-memory-{next(self.broker.consumer_tags)}"
+        queue.consumers[consumer_tag] = asyncio.create_task(queue.consume(callback))
+        logger.info("Started consuming from in-memory queue '%s'", queue_name)
+        return consumer_tag
+
+    async def cancel_consumer(self, queue_name: str, consumer_tag: str):
+        task = self.broker.queue(queue_name).consumers.pop(consumer_tag, None)
+        if task:
+            task.cancel()
@@ -0,0 +1,389 @@
+# core/leases.py
+#
+# Lease-based ownership of emails in PARSING / ANALYZING. The worker that
+# moves a row into one of those states records itself as ``owner`` with a
+# ``lease_expires_at`` deadline and renews it with a heartbeat while the job
+# is in flight; offline batch jobs renew the leases of their claimed rows
+# while they wait. A crashed or OOM-killed worker stops renewing, and the
+# reaper puts its rows back into the pipeline. After LEASE_MAX_ATTEMPTS
+# expired leases the row is marked failed instead.
+#
+# Leases are fenced: a claim only succeeds from the stage's input states,
+# and the UPDATE that ends a job only applies while the worker still owns
+# the row, so a worker whose lease was reaped discards its result instead
+# of publishing a second job. The reaper also re-publishes RECEIVED/PARSED
+# rows whose job was never confirmed published (see queued_at).
+#
+#   python -m core.leases reap
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import threading
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager, closing
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import undefer_group
+
+from .async_rabbitmq_client import AsyncRabbitMQPublisher
+from .config import settings
+from .database import get_db
+from .models import CONTENT_GROUP, EmailProcessingLog, ProcessingStatus
+from .priority import job_priority
+from .sharding import route_job
+
+logger = logging.getLogger(__name__)
+
+# Released lease, merged into the UPDATE that ends a job
+RELEASED_LEASE = {"owner": None, "lease_expires_at": None}
+
+
+class LeaseLost(Exception):
+    """This worker no longer owns the row; its job must be dropped."""
+
+
+def worker_identity() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def lease_deadline() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(
+        seconds=settings.LEASE_DURATION_SECONDS
+    )
+
+
+def acquired_lease() -> Dict[str, Any]:
+    """Lease fields of a row this worker is claiming."""
+    return {"owner": worker_identity(), "lease_expires_at": lease_deadline()}
+
+
+def claim_lease(
+    db,
+    db_log_id: int,
+    from_statuses: Iterable[ProcessingStatus],
+    status: ProcessingStatus,
+) -> bool:
+    """
+    Move a row from one of ``from_statuses`` into ``status`` under this
+    worker's lease. Returns False (nothing changed) when the row is gone,
+    already past the stage, owned by another worker or claimed by a batch
+    job, e.g. for a redelivered or duplicate job.
+    """
+    claimed = (
+        db.query(EmailProcessingLog)
+        .filter(
+            EmailProcessingLog.id == db_log_id,
+            EmailProcessingLog.status.in_(list(from_statuses)),
+            EmailProcessingLog.batch_id.is_(None),
+        )
+        .update({"status": status, **acquired_lease()}, synchronize_session=False)
+    )
+    db.commit()
+    return bool(claimed)
+
+
+def owned_filter(db_log_id: int, status: ProcessingStatus):
+    """The row, while this worker holds its lease in ``status``."""
+    return and_(
+        EmailProcessingLog.id == db_log_id,
+        EmailProcessingLog.status == status,
+        EmailProcessingLog.owner == worker_identity(),
+    )
+
+
+def hold_lease(db, db_log_id: int, status: ProcessingStatus):
+    """
+    Lock the row for the UPDATE that ends a job, or roll back and raise
+    LeaseLost if this worker no longer holds its lease in ``status``.
+    """
+    # Pending changes of the caller must not be flushed before the check
+    with db.no_autoflush:
+        held = (
+            db.query(EmailProcessingLog.id)
+            .filter(owned_filter(db_log_id, status))
+            .with_for_update()
+            .first()
+        )
+    if held is None:
+        db.rollback()
+        raise LeaseLost(f"Lease on DB log ID {db_log_id} was lost")
+
+
+def renew_leases(db, db_log_ids: Iterable[int]) -> int:
+    """Extend this worker's leases on the given rows; returns rows renewed."""
+    renewed = (
+        db.query(EmailProcessingLog)
+        .filter(
+            EmailProcessingLog.id.in_(list(db_log_ids)),
+            EmailProcessingLog.owner == worker_identity(),
+        )
+        .update(
+            {
+                "lease_expires_at": lease_deadline(),
+                # A heartbeat is not a status change; keep onupdate off it
+                "status_updated_at": EmailProcessingLog.status_updated_at,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return renewed
+
+
+def _renew_in_session(db_log_ids: list[int]) -> int:
+    with closing(next(get_db())) as db:
+        return renew_leases(db, db_log_ids)
+
+
+async def _heartbeat(
+    db_log_ids: list[int], job: asyncio.Task, lost: asyncio.Event, stop: threading.Event
+):
+    while True:
+        await asyncio.sleep(settings.LEASE_HEARTBEAT_SECONDS)
+        try:
+            renewed = await asyncio.to_thread(_renew_in_session, db_log_ids)
+        except Exception as e:
+            logger.error("Failed to renew lease on %s: %s", db_log_ids, e)
+            continue
+        if not renewed:
+            logger.warning(
+                "Lease on DB log ID(s) %s is lost; abandoning the job", db_log_ids
+            )
+            lost.set()
+            stop.set()
+            job.cancel()
+            return
+
+
+@asynccontextmanager
+async def lease_heartbeat(*db_log_ids: int | None):
+    """
+    Renew this worker's leases on ``db_log_ids`` while the block runs; enter
+    it only once the rows are claimed. If a renewal finds the lease gone
+    (reaped), the block is cancelled and LeaseLost raised.
+
+    Yields a ``threading.Event`` that is set when the lease is lost. Work
+    the block runs in threads cannot be cancelled; it must check the event
+    (check_lease) before each model call or write, and be started with
+    run_in_thread so the block waits for it to stop.
+    """
+    stop = threading.Event()
+    ids = [db_log_id for db_log_id in db_log_ids if db_log_id is not None]
+    if not ids:
+        yield stop
+        return
+
+    lost = asyncio.Event()
+    task = asyncio.create_task(_heartbeat(ids, asyncio.current_task(), lost, stop))
+    try:
+        yield stop
+    except asyncio.CancelledError:
+        if not lost.is_set():
+            raise
+        asyncio.current_task().uncancel()
+        raise LeaseLost(f"Lease on DB log ID(s) {ids} was lost") from None
+    finally:
+        task.cancel()
+
+
+def check_lease(stop: threading.Event | None, db_log_id: int):
+    """Raise LeaseLost in a worker thread once its job was abandoned."""
+    if stop is not None and stop.is_set():
+        raise LeaseLost(f"Lease on DB log ID {db_log_id} was lost")
+
+
+async def run_in_thread(stop: threading.Event, func, *args):
+    """
+    asyncio.to_thread for leased work. When the awaiting task is cancelled
+    (lease lost, shutdown), ``stop`` is set and the thread is waited for
+    until it returns, so it never outlives the session or job it serves.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        stop.set()
+        await asyncio.wait([future])
+        if not future.cancelled() and future.exception():
+            logger.debug("Abandoned thread ended with: %r", future.exception())
+        raise
+
+
+def mark_queued(db, db_log_ids: Iterable[int]):
+    """Record that the jobs of these rows were confirmed published."""
+    db_log_ids = list(db_log_ids)
+    if not db_log_ids:
+        return
+    db.query(EmailProcessingLog).filter(EmailProcessingLog.id.in_(db_log_ids)).update(
+        {
+            "queued_at": datetime.now(timezone.utc),
+            "status_updated_at": EmailProcessingLog.status_updated_at,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def unqueued_filter(now: datetime):
+    """RECEIVED/PARSED rows whose job was never confirmed published."""
+    return and_(
+        EmailProcessingLog.status.in_(
+            (ProcessingStatus.RECEIVED, ProcessingStatus.PARSED)
+        ),
+        EmailProcessingLog.queued_at.is_(None),
+        EmailProcessingLog.batch_id.is_(None),
+        EmailProcessingLog.status_updated_at
+        < now - timedelta(seconds=settings.UNQUEUED_GRACE_SECONDS),
+    )
+
+
+def expired_filter(now: datetime):
+    """In-flight rows whose lease ran out (or that predate leases and are stale)."""
+    stale_before = now - timedelta(seconds=settings.LEASE_DURATION_SECONDS)
+    return and_(
+        EmailProcessingLog.status.in_(
+            (ProcessingStatus.PARSING, ProcessingStatus.ANALYZING)
+        ),
+        or_(
+            EmailProcessingLog.lease_expires_at < now,
+            and_(
+                EmailProcessingLog.lease_expires_at.is_(None),
+                EmailProcessingLog.status_updated_at < stale_before,
+            ),
+        ),
+    )
+
+
+def requeued_job(row: EmailProcessingLog) -> tuple[str, Dict[str, Any]]:
+    """Reset a row to its stage's input state; returns its job."""
+    if row.status in (ProcessingStatus.RECEIVED, ProcessingStatus.PARSING):
+        row.status = ProcessingStatus.RECEIVED
+        return settings.RABBITMQ_INPUT_QUEUE_NAME, {
+            "db_log_id": row.id,
+            "graph_message_id": row.graph_message_id,
+            "conversation_id": row.conversation_id,
+            "priority": job_priority(row.role_of_inbox, False, None),
+        }
+
+    # The summarizer reads the email back from the row
+    row.status = ProcessingStatus.PARSED
+    row.batch_id = None
+    return settings.RABBITMQ_OUTPUT_QUEUE_NAME, {
+        "db_log_id": row.id,
+        "conversation_id": row.conversation_id,
+        "priority": job_priority(
+            row.role_of_inbox,
+            bool(row.parsed_attachments_json),
+            len(row.body or ""),
+        ),
+    }
+
+
+async def reap_expired_leases() -> Dict[str, int]:
+    """
+    Re-drive up to REAPER_BATCH_SIZE rows with an expired lease or a job
+    that was never queued. The row updates are committed only after the
+    re-published jobs are confirmed, so a failed publish leaves them to the
+    next run.
+
+    Returns:
+        Counts of "requeued", "failed" and "republished" rows
+    """
+    counts = Counter()
+    now = datetime.now(timezone.utc)
+    with closing(next(get_db())) as db:
+        rows = (
+            db.query(EmailProcessingLog)
+            .options(undefer_group(CONTENT_GROUP))
+            .filter(or_(expired_filter(now), unqueued_filter(now)))
+            .order_by(EmailProcessingLog.id)
+            .limit(settings.REAPER_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            return counts
+
+        jobs = defaultdict(list)
+        for row in rows:
+            row.queued_at = now
+            if row.status in (ProcessingStatus.RECEIVED, ProcessingStatus.PARSED):
+                logger.warning(
+                    "Job of DB log ID %s (%s) was never queued; re-publishing",
+                    row.id,
+                    row.status.value,
+                )
+                queue_name, message_body = requeued_job(row)
+                jobs[route_job(queue_name, message_body)].append(message_body)
+                counts["republished"] += 1
+                continue
+
+            row.lease_attempts = (row.lease_attempts or 0) + 1
+            logger.warning(
+                "Lease of %s on DB log ID %s (%s) expired (%d/%d)",
+                row.owner or "unknown worker",
+                row.id,
+                row.status.value,
+                row.lease_attempts,
+                settings.LEASE_MAX_ATTEMPTS,
+            )
+            if row.lease_attempts >= settings.LEASE_MAX_ATTEMPTS:
+                row.error_message = (
+                    f"Lease expired {row.lease_attempts} times in {row.status.value}"
+                )
+                row.status = (
+                    ProcessingStatus.FAILED_PARSING
+                    if row.status == ProcessingStatus.PARSING
+                    else ProcessingStatus.FAILED_ANALYSIS
+                )
+                row.batch_id = None
+                counts["failed"] += 1
+            else:
+                queue_name, message_body = requeued_job(row)
+                jobs[route_job(queue_name, message_body)].append(message_body)
+                counts["requeued"] += 1
+            row.owner = None
+            row.lease_expires_at = None
+
+        try:
+            for queue_name, message_bodies in jobs.items():
+                await AsyncRabbitMQPublisher.publish_many(queue_name, message_bodies)
+        except Exception:
+            db.rollback()
+            raise
+        db.commit()
+
+    logger.info("Reaped expired leases: %s", dict(counts))
+    return counts
+
+
+async def _main(args):
+    try:
+        counts = await reap_expired_leases()
+        print(
+            f"Requeued {counts['requeued']} and failed {counts['failed']} "
+            f"job(s) with an expired lease; re-published {counts['republished']} "
+            "job(s) that were never queued"
+        )
+    finally:
+        await AsyncRabbitMQPublisher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-drive jobs with expired leases")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("reap", help="requeue (or fail) expired leases once")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    main()
@@ -1,11 +1,25 @@
 # core/models.py
 
 import enum
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Text,
+    Enum,
+    LargeBinary,
+    Index,
+)
 from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from .database import Base
 
+# Deferred group of the large per-email columns; queries that need them load
+# them with options(undefer_group(CONTENT_GROUP))
+CONTENT_GROUP = "content"
+
 
 class ProcessingStatus(str, enum.Enum):
     RECEIVED = "RECEIVED"
@@ -16,6 +30,7 @@ class ProcessingStatus(str, enum.Enum):
     FAILED_ANALYSIS = "FAILED_ANALYSIS"
     COMPLETE = "COMPLETE"
     ARCHIVED_CC = "ARCHIVED_CC"
+    ARCHIVED = "ARCHIVED"
 
 
 class RecipientRole(str, enum.Enum):
@@ -26,6 +41,25 @@ class RecipientRole(str, enum.Enum):
 
 class EmailProcessingLog(Base):
     __tablename__ = "email_processing_log"
+    __table_args__ = (
+        # Keyset pagination of /api/logs, unfiltered and per filter
+        Index("ix_email_processing_log_received_at_id", "received_at", "id"),
+        Index("ix_email_processing_log_status_received", "status", "received_at", "id"),
+        Index(
+            "ix_email_processing_log_project_received",
+            "project_id",
+            "received_at",
+            "id",
+        ),
+        Index(
+            "ix_email_processing_log_sender_received",
+            "sender_address",
+            "received_at",
+            "id",
+        ),
+        # Delta sync (/api/logs/changes)
+        Index("ix_email_processing_log_status_updated", "status_updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
 
@@ -35,8 +69,8 @@ class EmailProcessingLog(Base):
 
     sender_address = Column(String(255))
     subject = Column(Text)
-    body = Column(Text)
-    email_summary = Column(Text)
+    body = deferred(Column(Text), group=CONTENT_GROUP)
+    email_summary = deferred(Column(Text), group=CONTENT_GROUP)
     project_id = Column(String(100))  # Project ID field
     received_at = Column(DateTime(timezone=True), nullable=False)
     role_of_inbox = Column(Enum(RecipientRole), default=RecipientRole.UNKNOWN)
@@ -44,12 +78,70 @@ class EmailProcessingLog(Base):
     status = Column(
         Enum(ProcessingStatus), nullable=False, default=ProcessingStatus.RECEIVED
     )
+    # Statement time, not transaction start (now()): the changes feed needs
+    # stamps close to the commit even when a transaction spans LLM calls
     status_updated_at = Column(
-        DateTime(timezone=True), default=func.now(), onupdate=func.now()
+        DateTime(timezone=True),
+        default=func.clock_timestamp(),
+        onupdate=func.clock_timestamp(),
     )
     error_message = Column(Text)
 
     # Simplified - just store basic attachment info
-    parsed_attachments_json = Column(JSONB)
+    parsed_attachments_json = deferred(Column(JSONB), group=CONTENT_GROUP)
+
+    # Estimated prompt tokens saved by stripping learned boilerplate lines
+    boilerplate_tokens_removed = Column(Integer)
+
+    # How the summary was produced: "llm", "cache" or "derived" (near-duplicate)
+    summary_source = Column(String(32))
+    derived_from_id = Column(Integer)
+    minhash_signature = deferred(Column(LargeBinary))
+
+    # Poller routing policy rule that matched, and the actions it applied
+    policy_rule = Column(String(64))
+    policy_actions = Column(JSONB)
+
+    # Set while the email is claimed by an offline batch-summarization job
+    batch_id = Column(String(64), index=True)
+
+    # Worker lease while PARSING/ANALYZING, renewed by a heartbeat; the
+    # reaper re-drives expired leases and counts them in lease_attempts
+    owner = Column(String(128))
+    lease_expires_at = Column(DateTime(timezone=True), index=True)
+    lease_attempts = Column(Integer, default=0)
+    # Set once the job for the current RECEIVED/PARSED status is confirmed
+    # published; still NULL after UNQUEUED_GRACE_SECONDS means it was lost
+    queued_at = Column(DateTime(timezone=True))
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+
+class BoilerplateLineStat(Base):
+    """Rolling frequency of normalized body lines, keyed by their hash."""
+
+    __tablename__ = "boilerplate_line_stats"
+
+    line_hash = Column(String(32), primary_key=True)
+    occurrences = Column(Integer, nullable=False, default=0)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
+
+
+class SummaryCacheEntry(Base):
+    """Summary and project ID previously generated for a normalized email."""
+
+    __tablename__ = "summary_cache"
+
+    cache_key = Column(String(64), primary_key=True)
+    prompt_version = Column(String(16), nullable=False, index=True)
+    deployment_name = Column(String(255))
+    email_summary = Column(Text)
+    project_id = Column(String(100))
+    hit_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed_at = Column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
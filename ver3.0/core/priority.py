@@ -0,0 +1,123 @@
+# core/priority.py
+#
+# Priority lanes on the parser and summarizer queues. They are off unless
+# RABBITMQ_MAX_PRIORITY is set: RabbitMQ refuses to redeclare an existing
+# queue with different arguments (406 PRECONDITION_FAILED), so the stage
+# queues have to be recreated once, while they are empty (services
+# stopped, backlog drained):
+#
+#   python -m core.priority redeclare
+
+import argparse
+import asyncio
+import logging
+from typing import Dict, Any
+
+from .config import settings
+from .models import RecipientRole
+from .sharding import is_shard_queue
+
+logger = logging.getLogger(__name__)
+
+# Extended MAPI property holding the message size (PR_MESSAGE_SIZE)
+MESSAGE_SIZE_PROPERTY_ID = "Integer 0x0E08"
+
+
+def stage_queue_arguments(queue_name: str) -> Dict[str, Any] | None:
+    """
+    Declaration arguments of the pipeline stage queues (priority queues).
+    Shard queues stay FIFO with a single active consumer to keep order.
+    """
+    if is_shard_queue(queue_name):
+        return {"x-single-active-consumer": True}
+    if settings.RABBITMQ_MAX_PRIORITY and queue_name in (
+        settings.RABBITMQ_INPUT_QUEUE_NAME,
+        settings.RABBITMQ_OUTPUT_QUEUE_NAME,
+    ):
+        return {"x-max-priority": settings.RABBITMQ_MAX_PRIORITY}
+    return None
+
+
+def job_priority(
+    role: RecipientRole | str | None, has_attachments: bool, size_bytes: int | None
+) -> int:
+    """
+    Queue priority of an email job: short TO-addressed mail first, large
+    attachment-heavy and CC mail last. Scored on 0-10 and scaled to
+    RABBITMQ_MAX_PRIORITY.
+    """
+    score = 5
+    if role == RecipientRole.TO:
+        score += 3
+    elif role == RecipientRole.CC:
+        score -= 2
+    if has_attachments:
+        score -= 2
+    if size_bytes and size_bytes >= settings.PRIORITY_LARGE_EMAIL_BYTES:
+        score -= 3
+    score = min(max(score, 0), 10)
+    return round(score * settings.RABBITMQ_MAX_PRIORITY / 10)
+
+
+def message_size(message) -> int | None:
+    """Size of a Graph message from its expanded PR_MESSAGE_SIZE property."""
+    for prop in getattr(message, "single_value_extended_properties", None) or []:
+        if prop.id and prop.id.lower() == MESSAGE_SIZE_PROPERTY_ID.lower():
+            try:
+                return int(prop.value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+async def redeclare_stage_queues() -> list[str]:
+    """
+    Delete the empty stage queues and declare them again with the current
+    stage_queue_arguments(). A queue that still holds jobs is left as it
+    is. Returns the redeclared queue names.
+    """
+    # Imported here: the client imports this module
+    from .async_rabbitmq_client import AsyncRabbitMQClient
+
+    redeclared = []
+    for queue_name in (
+        settings.RABBITMQ_INPUT_QUEUE_NAME,
+        settings.RABBITMQ_OUTPUT_QUEUE_NAME,
+    ):
+        # A fresh connection per queue: a refused delete closes the channel
+        async with AsyncRabbitMQClient() as client:
+            try:
+                await client.channel.queue_delete(queue_name, if_empty=True)
+            except Exception as e:
+                logger.error(
+                    "Queue '%s' was not deleted (not empty?): %s", queue_name, e
+                )
+                continue
+            await client.get_queue(queue_name)
+            redeclared.append(queue_name)
+            logger.info(
+                "Redeclared '%s' with %s", queue_name, stage_queue_arguments(queue_name)
+            )
+    return redeclared
+
+
+async def _main(args):
+    redeclared = await redeclare_stage_queues()
+    print(f"Redeclared {len(redeclared)} stage queue(s): {', '.join(redeclared)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the stage queue arguments")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "redeclare", help="recreate the empty stage queues with the current arguments"
+    )
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    main()
@@ -0,0 +1,106 @@
+# core/sharding.py
+#
+# Optional consistent-hash sharding of the stage queues by conversation_id.
+# With PIPELINE_SHARDS = N > 0 every job of a stage is published to one of
+# "<queue>.shard.0" ... "<queue>.shard.<N-1>", picked on a hash ring, so all
+# jobs of one thread land on the same shard. Each shard queue has a single
+# active consumer and no priority lanes, which keeps jobs in publish order
+# within the shard. Throughput scales with the number of shards.
+#
+# Resizing the ring moves about 1/N of the conversations; let the queues
+# drain before changing PIPELINE_SHARDS or a thread can briefly be processed
+# on two shards. Retried jobs lose their place in the order.
+
+import bisect
+import hashlib
+import re
+from functools import lru_cache
+from typing import Dict, Any
+
+from .config import settings
+
+SHARD_QUEUE_PATTERN = re.compile(r"^(?P<base>.+)\.shard\.(?P<shard>\d+)$")
+
+
+def sharding_enabled() -> bool:
+    return settings.PIPELINE_SHARDS > 0
+
+
+def shard_queue_name(queue_name: str, shard: int) -> str:
+    return f"{queue_name}.shard.{shard}"
+
+
+def is_shard_queue(queue_name: str) -> bool:
+    return SHARD_QUEUE_PATTERN.match(queue_name) is not None
+
+
+def base_queue_name(queue_name: str) -> str:
+    """Stage queue a shard queue belongs to (other names are returned as-is)."""
+    match = SHARD_QUEUE_PATTERN.match(queue_name)
+    return match.group("base") if match else queue_name
+
+
+def stage_queue_names(queue_name: str) -> list[str]:
+    """Every queue holding jobs of a stage: the stage queue and its shards."""
+    if not sharding_enabled():
+        return [queue_name]
+    return [queue_name] + [
+        shard_queue_name(queue_name, shard) for shard in range(settings.PIPELINE_SHARDS)
+    ]
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring with ``vnodes`` points per shard."""
+
+    def __init__(self, shard_count: int, vnodes: int = 256):
+        points = sorted(
+            (_hash(f"shard-{shard}#{vnode}"), shard)
+            for shard in range(shard_count)
+            for vnode in range(vnodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        index = bisect.bisect(self.hashes, _hash(key)) % len(self.hashes)
+        return self.shards[index]
+
+
+@lru_cache(maxsize=None)
+def hash_ring(shard_count: int, vnodes: int) -> HashRing:
+    return HashRing(shard_count, vnodes)
+
+
+def shard_key(message_body: Dict[str, Any]) -> str:
+    # Jobs published before sharding carry no conversation_id
+    conversation_id = message_body.get("conversation_id")
+    if conversation_id:
+        return conversation_id
+    return f"db_log_id:{message_body.get('db_log_id')}"
+
+
+def route_job(queue_name: str, message_body: Dict[str, Any]) -> str:
+    """Queue a stage job is published to: its shard queue when sharding is on."""
+    if not sharding_enabled():
+        return queue_name
+    ring = hash_ring(settings.PIPELINE_SHARDS, settings.SHARD_RING_VNODES)
+    return shard_queue_name(
+        base_queue_name(queue_name), ring.shard_for(shard_key(message_body))
+    )
+
+
+def worker_queue_name(queue_name: str, shard: int | None = None) -> str:
+    """Queue a stage worker consumes: the shard it owns when sharding is on."""
+    if not sharding_enabled():
+        return queue_name
+    if shard is None:
+        shard = settings.WORKER_SHARD
+    if not 0 <= shard < settings.PIPELINE_SHARDS:
+        raise ValueError(
+            f"WORKER_SHARD {shard} is outside 0..{settings.PIPELINE_SHARDS - 1}"
+        )
+    return shard_queue_name(queue_name, shard)
@@ -1,11 +1,27 @@
 import json
 import asyncio
 import logging
+import time
 import os
 from contextlib import closing
 from core.database import get_db
 from core.models import EmailProcessingLog, ProcessingStatus
+from core.async_rabbitmq_client import AsyncRabbitMQPublisher, create_client
+from core.dead_letter import retry_or_dead_letter
+from core.priority import job_priority
+from core.sharding import route_job, worker_queue_name
+from core.claim_check import ClaimCheckStore, email_payload
+from core.leases import (
+    RELEASED_LEASE,
+    LeaseLost,
+    claim_lease,
+    hold_lease,
+    lease_heartbeat,
+    mark_queued,
+    owned_filter,
+)
 from core.config import settings
+from email_polling_service.policy import ACTION_SKIP_ATTACHMENTS
 
 from .graph_client import GraphClient
 from .blob_storage_client import BlobStorageClient
@@ -63,31 +79,40 @@ def is_allowed_attachment(
 
 
 class EmailParserServiceAsync:
-    def __init__(self):
-        self.rabbitmq_url = (
-            f"amqp://{settings.RABBITMQ_USER}:{settings.RABBITMQ_PASS}"
-            f"@{settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}/%2F"
-        )
-        self.input_queue = settings.RABBITMQ_INPUT_QUEUE_NAME
+    def __init__(self, shard: int | None = None):
+        self.input_queue = worker_queue_name(settings.RABBITMQ_INPUT_QUEUE_NAME, shard)
         self.output_queue = settings.RABBITMQ_OUTPUT_QUEUE_NAME
-        self.connection = None
-        self.channel = None
+        self.rabbitmq = None
         self.shutdown_event = asyncio.Event()
+        self.in_flight = 0
+        self.claim_check = ClaimCheckStore()
 
     async def start(self):
-        self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
-        self.channel = await self.connection.channel()
-        await self.channel.set_qos(prefetch_count=1)
-
-        self.output_channel = self.channel
-        input_queue = await self.channel.declare_queue(self.input_queue, durable=True)
+        self.rabbitmq = create_client()
+        await self.rabbitmq.connect()
 
         logger.info("ASYNC PARSER listening on queue: '%s'", self.input_queue)
-        await input_queue.consume(self.callback)
+        consumer_tag = await self.rabbitmq.consume_from_queue(
+            self.input_queue, self.callback
+        )
 
         # Wait for shutdown signal instead of running forever
         await self.shutdown_event.wait()
 
+        # Graceful drain: stop taking jobs, let the in-flight one finish
+        await self.rabbitmq.cancel_consumer(self.input_queue, consumer_tag)
+        await self.drain()
+
+    async def drain(self):
+        """Wait (bounded) until no message is being processed."""
+        deadline = time.monotonic() + settings.WORKER_DRAIN_TIMEOUT_SECONDS
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.in_flight:
+            logger.warning(
+                "Drain timed out with %d message(s) in flight", self.in_flight
+            )
+
     def shutdown(self):
         """Signal the service to shutdown gracefully"""
         self.shutdown_event.set()
@@ -95,21 +120,32 @@ class EmailParserServiceAsync:
     async def cleanup(self):
         """Clean up resources"""
         try:
-            if self.channel and not self.channel.is_closed:
-                await self.channel.close()
-            if self.connection and not self.connection.is_closed:
-                await self.connection.close()
+            await AsyncRabbitMQPublisher.close()
+            if self.rabbitmq:
+                await self.rabbitmq.close()
             logger.info("Service resources cleaned up successfully.")
         except Exception as e:
             logger.error("Error during cleanup: %s", e)
 
     async def callback(self, message: aio_pika.IncomingMessage):
-        async with message.process():
+        self.in_flight += 1
+        try:
+            await self.handle_message(message)
+        finally:
+            self.in_flight -= 1
+
+    async def handle_message(self, message: aio_pika.IncomingMessage):
+        # A failure to schedule the retry requeues the message instead
+        async with message.process(requeue=True):
             try:
                 message_body = json.loads(message.body.decode("utf-8"))
                 await self.process_message_async(message_body)
+            except LeaseLost as e:
+                # Another worker owns the email now
+                logger.warning("%s; dropping the job", e)
             except Exception as e:
                 logger.error("Error during message processing: %s", e)
+                await retry_or_dead_letter(self.input_queue, message, e)
 
     async def process_message_async(self, message_body: dict):
         graph_message_id = message_body.get("graph_message_id")
@@ -122,106 +158,170 @@ class EmailParserServiceAsync:
                 if not log_entry:
                     raise Exception(f"Failed to find log entry for DB ID {db_log_id}")
 
-                try:
-                    log_entry.status = ProcessingStatus.PARSING
-                    db.commit()
-
-                    message = await graph_client.get_message_details(graph_message_id)
-                    if not message:
-                        raise Exception(f"Message not found for {graph_message_id}")
-
-                    log_entry.body = message.body.content if message.body else ""
+                if not claim_lease(
+                    db,
+                    db_log_id,
+                    (ProcessingStatus.RECEIVED, ProcessingStatus.FAILED_PARSING),
+                    ProcessingStatus.PARSING,
+                ):
+                    logger.info(
+                        "DB log ID %s is parsed or being parsed already. Skipping.",
+                        db_log_id,
+                    )
+                    return
 
-                    # Process attachments if present
-                    processed_attachments = []
-                    if message.has_attachments:
-                        logger.info("Processing attachments for email %s", db_log_id)
-                        attachments = await graph_client.get_attachments_metadata(
+                async with lease_heartbeat(db_log_id):
+                    try:
+                        message = await graph_client.get_message_details(
                             graph_message_id
                         )
+                        if not message:
+                            raise Exception(f"Message not found for {graph_message_id}")
 
-                        async with BlobStorageClient() as blob_client:
-                            for attachment in attachments:
-                                try:
-                                    # Check if attachment is allowed (PDF, Excel, DOCX only)
-                                    if not is_allowed_attachment(
-                                        attachment.name,
-                                        getattr(attachment, "content_type", None),
-                                    ):
-                                        logger.info(
-                                            "Skipping filtered attachment: %s",
-                                            attachment.name,
-                                        )
-                                        continue
-
-                                    # Get attachment content
-                                    content = await graph_client.get_attachment_content(
-                                        graph_message_id, attachment.id
-                                    )
-
-                                    if content:
-                                        # Upload to blob storage
-                                        blob_path = await blob_client.upload_attachment(
-                                            content,
-                                            attachment.name
-                                            or f"attachment_{attachment.id}",
-                                            str(db_log_id),
-                                        )
+                        log_entry.body = message.body.content if message.body else ""
 
-                                        processed_attachments.append(
-                                            {
-                                                "original_filename": attachment.name,
-                                                "storage_path": blob_path,
-                                                "size": len(content),
-                                                "content_type": getattr(
-                                                    attachment,
-                                                    "content_type",
-                                                    "unknown",
-                                                ),
-                                            }
+                        # Process attachments if present
+                        processed_attachments = []
+                        skip_attachments = ACTION_SKIP_ATTACHMENTS in (
+                            log_entry.policy_actions or []
+                        )
+                        if message.has_attachments and skip_attachments:
+                            logger.info(
+                                "Skipping attachments for email %s by policy rule '%s'",
+                                db_log_id,
+                                log_entry.policy_rule,
+                            )
+                        elif message.has_attachments:
+                            logger.info(
+                                "Processing attachments for email %s", db_log_id
+                            )
+                            attachments = await graph_client.get_attachments_metadata(
+                                graph_message_id
+                            )
+
+                            async with BlobStorageClient() as blob_client:
+                                for attachment in attachments:
+                                    try:
+                                        # Check if attachment is allowed (PDF, Excel, DOCX only)
+                                        if not is_allowed_attachment(
+                                            attachment.name,
+                                            getattr(attachment, "content_type", None),
+                                        ):
+                                            logger.info(
+                                                "Skipping filtered attachment: %s",
+                                                attachment.name,
+                                            )
+                                            continue
+
+                                        # Get attachment content
+                                        content = (
+                                            await graph_client.get_attachment_content(
+                                                graph_message_id, attachment.id
+                                            )
                                         )
 
-                                        logger.info(
-                                            "Processed attachment %s for email %s",
+                                        if content:
+                                            # Upload to blob storage
+                                            blob_path = (
+                                                await blob_client.upload_attachment(
+                                                    content,
+                                                    attachment.name
+                                                    or f"attachment_{attachment.id}",
+                                                    str(db_log_id),
+                                                )
+                                            )
+
+                                            processed_attachments.append(
+                                                {
+                                                    "original_filename": attachment.name,
+                                                    "storage_path": blob_path,
+                                                    "size": len(content),
+                                                    "content_type": getattr(
+                                                        attachment,
+                                                        "content_type",
+                                                        "unknown",
+                                                    ),
+                                                }
+                                            )
+
+                                            logger.info(
+                                                "Processed attachment %s for email %s",
+                                                attachment.name,
+                                                db_log_id,
+                                            )
+
+                                    except Exception as e:
+                                        logger.error(
+                                            "Failed to process attachment %s for email %s: %s",
                                             attachment.name,
                                             db_log_id,
+                                            e,
                                         )
 
-                                except Exception as e:
-                                    logger.error(
-                                        "Failed to process attachment %s for email %s: %s",
-                                        attachment.name,
-                                        db_log_id,
-                                        e,
-                                    )
-
-                    # Update database with processed data
-                    log_entry.status = ProcessingStatus.PARSED
-                    log_entry.parsed_attachments_json = processed_attachments
-                    db.merge(log_entry)
-                    db.commit()
-
-                    logger.info("Parsed email. DB log ID: %s", db_log_id)
-                    await self.send_to_output_queue({"db_log_id": db_log_id})
-
-                except Exception as e:
-                    logger.error("FAILED parsing for %s: %s", db_log_id, e)
-                    db.rollback()
-                    log_entry = (
-                        db.query(EmailProcessingLog).filter_by(id=db_log_id).first()
-                    )
-                    if log_entry:
-                        log_entry.status = ProcessingStatus.FAILED_PARSING
-                        log_entry.error_message = str(e)
+                        # Update database with processed data
+                        log_entry.status = ProcessingStatus.PARSED
+                        for field, value in RELEASED_LEASE.items():
+                            setattr(log_entry, field, value)
+                        log_entry.parsed_attachments_json = processed_attachments
+                        # Set again once the summarizer job is confirmed
+                        log_entry.queued_at = None
+                        # Captured before commit expires the instance
+                        payload = email_payload(log_entry)
+                        conversation_id = log_entry.conversation_id
+                        hold_lease(db, db_log_id, ProcessingStatus.PARSING)
+                        db.merge(log_entry)
                         db.commit()
-                    raise
+
+                        logger.info("Parsed email. DB log ID: %s", db_log_id)
+                        # The summarizer only sees the body; rank on its size
+                        priority = job_priority(
+                            payload["role_of_inbox"],
+                            bool(processed_attachments),
+                            len(payload["body"] or ""),
+                        )
+                        # The summarizer starts from the payload, not a DB read
+                        await self.send_to_output_queue(
+                            await self.claim_check.attach(
+                                {
+                                    "db_log_id": db_log_id,
+                                    "conversation_id": conversation_id,
+                                    "priority": priority,
+                                },
+                                payload,
+                            )
+                        )
+                        mark_queued(db, [db_log_id])
+
+                    except LeaseLost:
+                        raise
+                    except Exception as e:
+                        logger.error("FAILED parsing for %s: %s", db_log_id, e)
+                        db.rollback()
+                        failed = (
+                            db.query(EmailProcessingLog)
+                            .filter(owned_filter(db_log_id, ProcessingStatus.PARSING))
+                            .update(
+                                {
+                                    "status": ProcessingStatus.FAILED_PARSING,
+                                    "error_message": str(e),
+                                    **RELEASED_LEASE,
+                                },
+                                synchronize_session=False,
+                            )
+                        )
+                        db.commit()
+                        if not failed:
+                            # Reaped, or already PARSED (the reaper re-publishes it)
+                            raise LeaseLost(
+                                f"DB log ID {db_log_id} is not PARSING under this worker"
+                            ) from e
+                        raise
 
     async def send_to_output_queue(self, payload: dict):
-        await self.output_channel.default_exchange.publish(
-            aio_pika.Message(
-                body=json.dumps(payload).encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-            ),
-            routing_key=self.output_queue,
+        # Confirmed publish with nack retries on the shared publisher
+        await AsyncRabbitMQPublisher.publish_job(
+            route_job(self.output_queue, payload), payload
+        )
+        logger.info(
+            "Published message to output queue for DB log ID: %s", payload["db_log_id"]
         )
-        logger.info("Published message to output queue: %s", payload)
@@ -0,0 +1,116 @@
+# email_polling_service/backpressure.py
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from core.async_rabbitmq_client import AsyncRabbitMQPublisher
+from core.config import settings
+from core.models import EmailProcessingLog, ProcessingStatus
+from core.sharding import stage_queue_names
+
+logger = logging.getLogger(__name__)
+
+# Rows waiting for a downstream stage (in-progress rows are not a backlog)
+BACKLOG_STATUSES = (ProcessingStatus.RECEIVED, ProcessingStatus.PARSED)
+
+
+class BackpressureGate:
+    """
+    Decides once per polling cycle whether the poller may ingest, based on
+    the total depth of the parser and summarizer queues (and their shard
+    queues) and the age of the oldest email waiting for them.
+
+    Ingestion stops above the high watermark (or when the backlog is older
+    than BACKPRESSURE_MAX_BACKLOG_AGE_SECONDS) and only resumes below the low
+    watermark (and half that age), so the gate does not flap. Only rows
+    whose job is queued and younger than BACKPRESSURE_BACKLOG_HORIZON_SECONDS
+    count towards the age, so a dead-lettered or never-queued row cannot
+    keep the gate closed.
+    """
+
+    def __init__(self):
+        self.high_watermark = settings.BACKPRESSURE_HIGH_WATERMARK
+        self.low_watermark = settings.BACKPRESSURE_LOW_WATERMARK
+        self.max_backlog_age = settings.BACKPRESSURE_MAX_BACKLOG_AGE_SECONDS
+        self.backlog_horizon = settings.BACKPRESSURE_BACKLOG_HORIZON_SECONDS
+        self.queue_names = stage_queue_names(
+            settings.RABBITMQ_INPUT_QUEUE_NAME
+        ) + stage_queue_names(settings.RABBITMQ_OUTPUT_QUEUE_NAME)
+        self.throttled = False
+        self.changed_at = datetime.now(timezone.utc)
+        self.queue_depths: dict[str, int] = {}
+        self.backlog_age_seconds: float | None = None
+
+    async def read_queue_depths(self) -> dict[str, int]:
+        client = await AsyncRabbitMQPublisher.get_client()
+        depths = {}
+        for queue_name in self.queue_names:
+            try:
+                depths[queue_name] = await client.queue_depth(queue_name)
+            except Exception as e:
+                # Not declared yet: nothing is waiting in it
+                logger.debug("Could not read depth of '%s': %s", queue_name, e)
+                depths[queue_name] = 0
+                await AsyncRabbitMQPublisher.close()
+                client = await AsyncRabbitMQPublisher.get_client()
+        return depths
+
+    def read_backlog_age(self, db: Session) -> float | None:
+        now = datetime.now(timezone.utc)
+        oldest = (
+            db.query(func.min(EmailProcessingLog.created_at))
+            .filter(
+                EmailProcessingLog.status.in_(BACKLOG_STATUSES),
+                EmailProcessingLog.queued_at.is_not(None),
+                EmailProcessingLog.created_at
+                > now - timedelta(seconds=self.backlog_horizon),
+            )
+            .scalar()
+        )
+        if oldest is None:
+            return None
+        return (now - oldest).total_seconds()
+
+    async def allow_ingestion(self, db: Session) -> bool:
+        """Refresh the downstream readings and return whether to poll."""
+        self.queue_depths = await self.read_queue_depths()
+        self.backlog_age_seconds = self.read_backlog_age(db)
+        depth = sum(self.queue_depths.values())
+        age = self.backlog_age_seconds or 0.0
+
+        if not self.throttled:
+            too_old = self.max_backlog_age and age > self.max_backlog_age
+            if depth > self.high_watermark or too_old:
+                self.set_throttled(True)
+        else:
+            caught_up = not self.max_backlog_age or age <= self.max_backlog_age / 2
+            if depth < self.low_watermark and caught_up:
+                self.set_throttled(False)
+
+        return not self.throttled
+
+    def set_throttled(self, throttled: bool):
+        self.throttled = throttled
+        self.changed_at = datetime.now(timezone.utc)
+        if throttled:
+            logger.warning("Ingestion THROTTLED: %s", self.state())
+        else:
+            logger.info("Ingestion resumed: %s", self.state())
+
+    def state(self) -> dict:
+        """Throttle state for logs, the API and UI notifications."""
+        return {
+            "throttled": self.throttled,
+            "since": self.changed_at.isoformat(),
+            "queue_depths": self.queue_depths,
+            "backlog_age_seconds": (
+                round(self.backlog_age_seconds)
+                if self.backlog_age_seconds is not None
+                else None
+            ),
+            "high_watermark": self.high_watermark,
+            "low_watermark": self.low_watermark,
+        }
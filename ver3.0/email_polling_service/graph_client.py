@@ -38,24 +38,28 @@ class GraphClient:
     async def fetch_unread_messages(self) -> list[Message]:
         logger.info("Checking for unread messages...")
         try:
-            query_params = (
-                MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
-                    select=[
-                        "id",
-                        "receivedDateTime",
-                        "subject",
-                        "from",
-                        "isRead",
-                        "hasAttachments",
-                        "internetMessageId",
-                        "sender",
-                        "conversationId",
-                        "toRecipients",
-                        "ccRecipients",
-                    ],
-                    filter="isRead eq false",
-                    top=50,
-                )
+            query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
+                select=[
+                    "id",
+                    "receivedDateTime",
+                    "subject",
+                    "from",
+                    "isRead",
+                    "hasAttachments",
+                    "internetMessageId",
+                    "sender",
+                    "conversationId",
+                    "toRecipients",
+                    "ccRecipients",
+                    "bodyPreview",
+                    "internetMessageHeaders",
+                ],
+                # PR_MESSAGE_SIZE, used to rank jobs by size
+                expand=[
+                    "singleValueExtendedProperties($filter=id eq 'Integer 0x0E08')"
+                ],
+                filter="isRead eq false",
+                top=50,
             )
             request_config = (
                 MessagesRequestBuilder.MessagesRequestBuilderGetRequestConfiguration(
@@ -0,0 +1,130 @@
+# email_polling_service/policy.py
+
+import json
+import logging
+import re
+from collections import Counter
+
+from core.models import RecipientRole
+
+logger = logging.getLogger(__name__)
+
+# Policy actions, carried downstream in the queue message under "policy"
+ACTION_ARCHIVE = "archive"  # stop here, status ARCHIVED
+ACTION_SKIP_PARSING = "skip_parsing"  # use the Graph body preview, no parser
+ACTION_SKIP_ATTACHMENTS = "skip_attachments"  # parser skips attachment download
+ACTION_CHEAP_SUMMARY = "cheap_summary"  # summarizer uses the small deployment
+
+ACTIONS = {
+    ACTION_ARCHIVE,
+    ACTION_SKIP_PARSING,
+    ACTION_SKIP_ATTACHMENTS,
+    ACTION_CHEAP_SUMMARY,
+}
+
+
+class PolicyRule:
+    """
+    One declarative rule. All configured conditions must match:
+
+        {
+            "name": "cc-newsletters",
+            "role": ["CC"],
+            "sender": "regex",
+            "subject": "regex",
+            "headers": {"List-Unsubscribe": ".*"},
+            "actions": ["skip_attachments", "cheap_summary"]
+        }
+
+    Regexes are case-insensitive and use ``re.search``. A header condition
+    matches when the header is present and its value matches.
+    """
+
+    def __init__(self, config: dict):
+        self.name = config["name"]
+        self.roles = {RecipientRole(role) for role in config.get("role", [])}
+        self.sender = self._compile(config.get("sender"))
+        self.subject = self._compile(config.get("subject"))
+        self.headers = {
+            name.lower(): self._compile(pattern)
+            for name, pattern in config.get("headers", {}).items()
+        }
+        self.actions = set(config.get("actions", []))
+
+        unknown = self.actions - ACTIONS
+        if unknown:
+            raise ValueError(f"Rule '{self.name}' has unknown action(s): {unknown}")
+
+    @staticmethod
+    def _compile(pattern: str | None):
+        return re.compile(pattern, re.IGNORECASE) if pattern else None
+
+    def matches(
+        self, role: RecipientRole, sender: str, subject: str, headers: dict
+    ) -> bool:
+        if self.roles and role not in self.roles:
+            return False
+        if self.sender and not self.sender.search(sender or ""):
+            return False
+        if self.subject and not self.subject.search(subject or ""):
+            return False
+        for name, pattern in self.headers.items():
+            if name not in headers or not pattern.search(headers[name]):
+                return False
+        return True
+
+
+class RoutingPolicy:
+    """
+    Ordered list of rules evaluated right after ``determine_role``; the
+    first matching rule decides how much downstream work an email gets.
+    Emails matching no rule are processed in full.
+    """
+
+    def __init__(self, rules: list[PolicyRule]):
+        self.rules = rules
+        self.counts = Counter()
+
+    @classmethod
+    def from_file(cls, path: str | None) -> "RoutingPolicy":
+        """Load rules from a JSON file; an empty path disables the policy."""
+        if not path:
+            return cls([])
+        try:
+            with open(path) as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            logger.warning("Routing policy file %s not found; policy disabled", path)
+            return cls([])
+        rules = [PolicyRule(rule) for rule in config.get("rules", [])]
+        logger.info("Loaded %d routing policy rule(s) from %s", len(rules), path)
+        return cls(rules)
+
+    def evaluate(
+        self, role: RecipientRole, sender: str, subject: str, headers: dict
+    ) -> tuple[str | None, set[str]]:
+        """Return (matched rule name, actions) for one email."""
+        headers = {name.lower(): value or "" for name, value in headers.items()}
+        for rule in self.rules:
+            if rule.matches(role, sender, subject, headers):
+                self.counts[rule.name] += 1
+                return rule.name, set(rule.actions)
+        self.counts[None] += 1
+        return None, set()
+
+    def summary(self) -> str:
+        """Per-rule match counts since the last call, for the cycle log."""
+        text = ", ".join(
+            f"{name or 'default'}={count}" for name, count in self.counts.items()
+        )
+        self.counts.clear()
+        return text
+
+
+def message_headers(message) -> dict:
+    """Internet message headers of a Graph message as a dict."""
+    return {
+        header.name: header.value
+        for header in (getattr(message, "internet_message_headers", None) or [])
+        if header.name
+    }
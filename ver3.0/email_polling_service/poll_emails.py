@@ -1,20 +1,36 @@
 # email_polling_service/poll_emails.py
 
 import asyncio
-import json
 import logging
+from collections import defaultdict
 from contextlib import closing
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-import aio_pika
+from sqlalchemy.sql import func
 
+from core.async_rabbitmq_client import AsyncRabbitMQPublisher, PublishConfirmError
+from core.claim_check import ClaimCheckStore, email_payload
 from core.database import get_db
+from core.leases import mark_queued, requeued_job, unqueued_filter
 from core.models import EmailProcessingLog, ProcessingStatus, RecipientRole
+from core.priority import job_priority, message_size
+from core.sharding import route_job
 from core.config import settings
+from .backpressure import BackpressureGate
 from .graph_client import GraphClient
+from .policy import (
+    ACTION_ARCHIVE,
+    ACTION_SKIP_PARSING,
+    RoutingPolicy,
+    message_headers,
+)
 
 logger = logging.getLogger(__name__)
 
+routing_policy = RoutingPolicy.from_file(settings.ROUTING_POLICY_FILE)
+claim_check = ClaimCheckStore()
+backpressure = BackpressureGate()
+
 
 def determine_role(message, mailbox_address: str) -> RecipientRole:
     """Determines if the mailbox was in the TO or CC field."""
@@ -31,108 +47,189 @@ def determine_role(message, mailbox_address: str) -> RecipientRole:
     return RecipientRole.UNKNOWN
 
 
+async def publish_jobs(db: Session, jobs: dict[str, list[dict]]):
+    """
+    Hand off a cycle's jobs as one pipelined, confirmed batch per queue and
+    mark the confirmed rows as queued. Unconfirmed rows keep queued_at
+    unset: their job may still have been delivered, so they are not
+    removed, and the next cycle or the reaper re-publishes them once
+    UNQUEUED_GRACE_SECONDS have passed.
+    """
+    for queue_name, message_bodies in jobs.items():
+        try:
+            await AsyncRabbitMQPublisher.publish_many(queue_name, message_bodies)
+            unconfirmed = []
+        except PublishConfirmError as e:
+            unconfirmed = e.message_bodies
+        except Exception as e:
+            logger.error("Failed to publish jobs to queue '%s': %s", queue_name, e)
+            unconfirmed = message_bodies
+
+        unconfirmed_ids = {body["db_log_id"] for body in unconfirmed}
+        mark_queued(
+            db,
+            (
+                body["db_log_id"]
+                for body in message_bodies
+                if body["db_log_id"] not in unconfirmed_ids
+            ),
+        )
+        if unconfirmed_ids:
+            logger.warning(
+                "%d job(s) on queue '%s' were not confirmed; left for re-publishing.",
+                len(unconfirmed_ids),
+                queue_name,
+            )
+
+
+async def notify_throttle_state():
+    try:
+        await AsyncRabbitMQPublisher.publish_event(
+            exchange_name=settings.RABBITMQ_UI_NOTIFY_EXCHANGE,
+            event_body={"type": "INGESTION_THROTTLE", "payload": backpressure.state()},
+        )
+    except Exception as e:
+        logger.error("Failed to send UI notification: %s", e)
+
+
 async def run_polling_cycle():
-    """Polls emails and publishes tasks using the async aio-pika library."""
+    """Polls emails and publishes tasks on the shared confirmed publisher."""
     logger.info("Starting email polling cycle at %s", datetime.now().isoformat())
 
-    connection = None
-    # Use async with for GraphClient, and a try/finally for RabbitMQ connection
     async with GraphClient() as graph_client:
         try:
-            # Connect to RabbitMQ asynchronously
-            connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
-            async with connection.channel() as channel:
-                # Set QoS to ensure reliable publishing
-                await channel.set_qos(prefetch_count=1)
-
-                # Declare the queue to ensure it exists before publishing to it
-                await channel.declare_queue(
-                    settings.RABBITMQ_INPUT_QUEUE_NAME, durable=True
-                )
+            with closing(next(get_db())) as db:
+                was_throttled = backpressure.throttled
+                allowed = await backpressure.allow_ingestion(db)
+                if backpressure.throttled != was_throttled:
+                    await notify_throttle_state()
+                if not allowed:
+                    logger.warning(
+                        "Downstream backlog over the watermark; skipping ingestion."
+                    )
+                    return
 
-                with closing(next(get_db())) as db:
-                    unread_messages = await graph_client.fetch_unread_messages()
-                    if not unread_messages:
-                        logger.info("No new unread messages found.")
-                        return
+                unread_messages = await graph_client.fetch_unread_messages()
+                if not unread_messages:
+                    logger.info("No new unread messages found.")
+                    return
 
-                    logger.info(
-                        "Found %d unread email(s). Processing...", len(unread_messages)
+                logger.info(
+                    "Found %d unread email(s). Processing...", len(unread_messages)
+                )
+                jobs = defaultdict(list)
+                now = datetime.now(timezone.utc)
+                for msg in unread_messages:
+                    exists = (
+                        db.query(
+                            EmailProcessingLog.id,
+                            unqueued_filter(now).label("unqueued"),
+                        )
+                        .filter_by(internet_message_id=msg.internet_message_id)
+                        .first()
                     )
-                    for msg in unread_messages:
-                        exists = (
-                            db.query(EmailProcessingLog.id)
-                            .filter_by(internet_message_id=msg.internet_message_id)
-                            .first()
+                    if exists and exists.unqueued:
+                        # Committed by an earlier cycle that crashed before
+                        # its publish: hand the job off again
+                        queue_name, message_body = requeued_job(
+                            db.get(EmailProcessingLog, exists.id)
+                        )
+                        jobs[route_job(queue_name, message_body)].append(message_body)
+                        logger.warning(
+                            "Re-publishing the lost job of DB Log ID: %s", exists.id
+                        )
+                        continue
+                    if exists:
+                        logger.info(
+                            "Duplicate email detected (ID: %s). Skipping.",
+                            msg.internet_message_id,
+                        )
+                        # await graph_client.mark_message_as_read(msg.id)
+                        continue
+
+                    try:
+                        role = determine_role(msg, settings.MAILBOX_ADDRESS)
+                        sender_addr = (
+                            msg.sender.email_address.address
+                            if msg.sender and msg.sender.email_address
+                            else "N/A"
                         )
-                        if exists:
+                        rule_name, actions = routing_policy.evaluate(
+                            role, sender_addr, msg.subject, message_headers(msg)
+                        )
+                        new_log = EmailProcessingLog(
+                            internet_message_id=msg.internet_message_id,
+                            graph_message_id=msg.id,
+                            conversation_id=msg.conversation_id,
+                            sender_address=sender_addr,
+                            subject=msg.subject,
+                            received_at=msg.received_date_time,
+                            role_of_inbox=role,
+                            status=ProcessingStatus.RECEIVED,
+                            policy_rule=rule_name,
+                            policy_actions=sorted(actions) or None,
+                        )
+
+                        if ACTION_ARCHIVE in actions:
+                            new_log.status = ProcessingStatus.ARCHIVED
+                            db.add(new_log)
+                            db.commit()
                             logger.info(
-                                "Duplicate email detected (ID: %s). Skipping.",
-                                msg.internet_message_id,
+                                "Archived email by policy rule '%s'. DB Log ID: %s",
+                                rule_name,
+                                new_log.id,
                             )
-                            # await graph_client.mark_message_as_read(msg.id)
                             continue
 
-                        try:
-                            role = determine_role(msg, settings.MAILBOX_ADDRESS)
-                            sender_addr = (
-                                msg.sender.email_address.address
-                                if msg.sender and msg.sender.email_address
-                                else "N/A"
-                            )
-                            new_log = EmailProcessingLog(
-                                internet_message_id=msg.internet_message_id,
-                                graph_message_id=msg.id,
-                                conversation_id=msg.conversation_id,
-                                sender_address=sender_addr,
-                                subject=msg.subject,
-                                received_at=msg.received_date_time,
-                                role_of_inbox=role,
-                                status=ProcessingStatus.RECEIVED,
-                            )
-                            db.add(new_log)
-                            db.flush()
-
-                            # Prepare and publish the message asynchronously
-                            message_body = json.dumps(
-                                {"db_log_id": new_log.id, "graph_message_id": msg.id}
-                            ).encode()
-                            message = aio_pika.Message(
-                                body=message_body,
-                                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                        # Low-value mail goes straight to the summarizer
+                        # with the Graph body preview
+                        queue_name = settings.RABBITMQ_INPUT_QUEUE_NAME
+                        if ACTION_SKIP_PARSING in actions:
+                            new_log.body = msg.body_preview or ""
+                            new_log.parsed_attachments_json = []
+                            new_log.status = ProcessingStatus.PARSED
+                            queue_name = settings.RABBITMQ_OUTPUT_QUEUE_NAME
+
+                        db.add(new_log)
+                        db.flush()
+
+                        message_body = {
+                            "db_log_id": new_log.id,
+                            "graph_message_id": msg.id,
+                            "conversation_id": msg.conversation_id,
+                            "priority": job_priority(
+                                role, bool(msg.has_attachments), message_size(msg)
+                            ),
+                        }
+                        if ACTION_SKIP_PARSING in actions:
+                            message_body = await claim_check.attach(
+                                message_body, email_payload(new_log)
                             )
+                            # Re-stamp after the upload, just before the commit
+                            new_log.status_updated_at = func.clock_timestamp()
 
-                            await channel.default_exchange.publish(
-                                message, routing_key=settings.RABBITMQ_INPUT_QUEUE_NAME
-                            )
-                            logger.info(
-                                "Successfully published message for db_log_id: %s",
-                                new_log.id,
-                            )
+                        # await graph_client.mark_message_as_read(msg.id)
 
-                            # await graph_client.mark_message_as_read(msg.id)
+                        db.commit()
+                        jobs[route_job(queue_name, message_body)].append(message_body)
+                        logger.info(
+                            "Successfully processed and committed email. DB Log ID: %s",
+                            message_body["db_log_id"],
+                        )
 
-                            db.commit()
-                            logger.info(
-                                "Successfully processed and committed email. DB Log ID: %s",
-                                new_log.id,
-                            )
+                    except Exception as e:
+                        logger.error(
+                            "Error during transaction for email %s: %s. Rolling back...",
+                            msg.id,
+                            e,
+                        )
+                        db.rollback()
 
-                        except Exception as e:
-                            logger.error(
-                                "Error during transaction for email %s: %s. Rolling back...",
-                                msg.id,
-                                e,
-                            )
-                            db.rollback()
+                logger.info("Routing policy matches: %s", routing_policy.summary())
+                await publish_jobs(db, jobs)
 
         except Exception as e:
             logger.error("A critical error occurred during the polling cycle: %s", e)
-        finally:
-            # Ensure RabbitMQ connection is closed if it was opened
-            if connection:
-                await connection.close()
-                logger.info("RabbitMQ connection closed.")
 
     logger.info("Email polling cycle finished at %s", datetime.now().isoformat())
 
@@ -1,133 +1,641 @@
 import json
 import asyncio
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import closing
+from sqlalchemy import func, or_
+from sqlalchemy.orm import undefer_group
 from core.database import get_db
-from core.models import EmailProcessingLog, ProcessingStatus
+from core.models import CONTENT_GROUP, EmailProcessingLog, ProcessingStatus
 from core.config import settings
-from core.async_rabbitmq_client import AsyncRabbitMQPublisher
+from core.async_rabbitmq_client import AsyncRabbitMQPublisher, create_client
+from core.dead_letter import retry_or_dead_letter
+from core.claim_check import ClaimCheckStore, email_payload
+from core.leases import (
+    RELEASED_LEASE,
+    LeaseLost,
+    acquired_lease,
+    check_lease,
+    claim_lease,
+    lease_heartbeat,
+    owned_filter,
+    run_in_thread,
+    worker_identity,
+)
+from core.sharding import worker_queue_name
+from email_polling_service.policy import ACTION_CHEAP_SUMMARY
 
-from .openai_client import AzureOpenAIClient
+from .boilerplate import BoilerplateFilter
+from .extractive import extractive_summary
+from .openai_client import AzureOpenAIClient, PROMPT_VERSION
+from .near_duplicate import NearDuplicateIndex, signature_to_bytes
+from .router import (
+    ModelRouter,
+    RouteMetrics,
+    ROUTE_CACHE,
+    ROUTE_DERIVED,
+    ROUTE_EXTRACTIVE,
+    ROUTE_TEMPLATE,
+    may_contain_project_id,
+    template_summary,
+)
+from .summary_cache import SummaryCache
+from .tokenizer import count_tokens
 import aio_pika
 
 logger = logging.getLogger(__name__)
 
+# Columns generate_summary fills in on the (detached) email
+SUMMARY_RESULT_FIELDS = (
+    "email_summary",
+    "project_id",
+    "summary_source",
+    "derived_from_id",
+    "minhash_signature",
+    "boilerplate_tokens_removed",
+)
+
 
 class EmailSummarizerServiceAsync:
     """Async service for generating email summaries using Azure OpenAI."""
 
-    def __init__(self):
-        self.rabbitmq_url = settings.RABBITMQ_URL
-        self.input_queue = settings.RABBITMQ_OUTPUT_QUEUE_NAME
+    def __init__(self, shard: int | None = None):
+        self.input_queue = worker_queue_name(settings.RABBITMQ_OUTPUT_QUEUE_NAME, shard)
         self.ui_exchange = settings.RABBITMQ_UI_NOTIFY_EXCHANGE
-        self.connection = None
-        self.channel = None
+        self.rabbitmq = None
         self.shutdown_event = asyncio.Event()
+        self.in_flight = 0
         self.openai_client = AzureOpenAIClient()
+        # New emails fall back to an extractive summary instead of queuing
+        # behind throttling; upgrades use the patient client above
+        self.fail_fast_client = AzureOpenAIClient(
+            max_wait=settings.SUMMARY_FALLBACK_MAX_WAIT_SECONDS, max_retries=0
+        )
+        self.claim_check = ClaimCheckStore()
+        self.boilerplate_filter = BoilerplateFilter()
+        self.summary_cache = SummaryCache(PROMPT_VERSION)
+        self.near_duplicates = NearDuplicateIndex()
+        self.router = ModelRouter()
+        self.route_metrics = RouteMetrics()
+        self.extractive_pool = ProcessPoolExecutor(
+            max_workers=settings.EXTRACTIVE_POOL_WORKERS
+        )
+        self.llm_unavailable_until = 0.0
+        self.upgrade_task = None
 
     async def start(self):
         """Start the summarizer service."""
-        self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
-        self.channel = await self.connection.channel()
-        await self.channel.set_qos(prefetch_count=1)
+        self.rabbitmq = create_client()
+        await self.rabbitmq.connect()
 
-        input_queue = await self.channel.declare_queue(self.input_queue, durable=True)
+        with closing(next(get_db())) as db:
+            self.near_duplicates.rebuild(db)
 
         logger.info("ASYNC SUMMARIZER listening on queue: '%s'", self.input_queue)
-        await input_queue.consume(self.callback)
+        consumer_tag = await self.rabbitmq.consume_from_queue(
+            self.input_queue, self.callback
+        )
+        self.upgrade_task = asyncio.create_task(self.upgrade_extractive_summaries())
 
         # Wait for shutdown signal
         await self.shutdown_event.wait()
 
+        # Graceful drain: stop taking jobs, let the in-flight one finish
+        await self.rabbitmq.cancel_consumer(self.input_queue, consumer_tag)
+        await self.drain()
+
+    async def drain(self):
+        """Wait (bounded) until no message is being processed."""
+        deadline = time.monotonic() + settings.WORKER_DRAIN_TIMEOUT_SECONDS
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.in_flight:
+            logger.warning(
+                "Drain timed out with %d message(s) in flight", self.in_flight
+            )
+
     def shutdown(self):
         """Signal the service to shutdown gracefully."""
         self.shutdown_event.set()
 
     async def cleanup(self):
         """Clean up resources."""
+        if self.upgrade_task:
+            self.upgrade_task.cancel()
+        self.extractive_pool.shutdown(wait=False, cancel_futures=True)
+        await asyncio.to_thread(self.boilerplate_filter.flush)
         try:
-            if self.channel and not self.channel.is_closed:
-                await self.channel.close()
-            if self.connection and not self.connection.is_closed:
-                await self.connection.close()
+            await AsyncRabbitMQPublisher.close()
+            if self.rabbitmq:
+                await self.rabbitmq.close()
             logger.info("Summarizer service resources cleaned up " "successfully.")
         except Exception as e:
             logger.error("Error during cleanup: %s", e)
 
     async def callback(self, message: aio_pika.IncomingMessage):
         """Process incoming messages from the parser service."""
-        async with message.process():
+        self.in_flight += 1
+        try:
+            await self.handle_message(message)
+        finally:
+            self.in_flight -= 1
+
+    async def handle_message(self, message: aio_pika.IncomingMessage):
+        # A failure to schedule the retry requeues the message instead
+        async with message.process(requeue=True):
             try:
                 message_body = json.loads(message.body.decode("utf-8"))
                 await self.process_message_async(message_body)
+                await self.claim_check.discard(message_body)
+            except LeaseLost as e:
+                # Another worker owns the email now
+                logger.warning("%s; dropping the job", e)
             except Exception as e:
                 logger.error("Error during message processing: %s", e)
+                await retry_or_dead_letter(self.input_queue, message, e)
 
     async def process_message_async(self, message_body: dict):
-        """Process a single email for summarization."""
+        """
+        Process a single email for summarization. The email comes from the
+        message payload when the parser sent one; the row is only read back
+        for messages without it. Status and results are written with
+        targeted UPDATEs.
+        """
         db_log_id = message_body.get("db_log_id")
         logger.info("Processing summarization for DB log ID: %s", db_log_id)
 
+        payload = await self.claim_check.load(message_body)
+
         with closing(next(get_db())) as db:
-            log_entry = db.query(EmailProcessingLog).filter_by(id=db_log_id).first()
-            if not log_entry:
-                raise Exception(f"Failed to find log entry for DB ID {db_log_id}")
+            if payload is None:
+                stored = (
+                    db.query(EmailProcessingLog)
+                    .options(undefer_group(CONTENT_GROUP))
+                    .filter_by(id=db_log_id)
+                    .first()
+                )
+                if not stored:
+                    raise Exception(f"Failed to find log entry for DB ID {db_log_id}")
+                payload = email_payload(stored)
 
-            try:
-                log_entry.status = ProcessingStatus.ANALYZING
-                db.commit()
+            # Rows claimed by an offline batch job are left alone
+            if not claim_lease(
+                db,
+                db_log_id,
+                (ProcessingStatus.PARSED, ProcessingStatus.FAILED_ANALYSIS),
+                ProcessingStatus.ANALYZING,
+            ):
+                logger.info(
+                    "DB log ID %s is missing, summarized, being summarized or "
+                    "claimed by a batch job. Skipping.",
+                    db_log_id,
+                )
+                return
+            # Result UPDATEs only apply while this worker holds the lease
+            rows = db.query(EmailProcessingLog).filter(
+                owned_filter(db_log_id, ProcessingStatus.ANALYZING)
+            )
+
+            async with lease_heartbeat(db_log_id) as stop:
+                log_entry = EmailProcessingLog(id=db_log_id, **payload)
+
+                try:
+                    # Generate email summary
+                    if log_entry.body:
+                        # Runs in a worker thread with its own session: rate-limit
+                        # waits must not stall the event loop (and the RabbitMQ
+                        # heartbeats with it)
+                        on_delta = None
+                        if settings.SUMMARY_STREAMING_ENABLED:
+                            on_delta = self.partial_summary_publisher(db_log_id)
+                        await run_in_thread(
+                            stop, self.summarize_in_thread, log_entry, on_delta, stop
+                        )
 
-                # Generate email summary
-                if log_entry.body:
-                    summary = self.openai_client.summarize_email(
-                        email_body=log_entry.body,
-                        subject=log_entry.subject or "",
-                        sender=log_entry.sender_address or "",
+                    results = {
+                        field: getattr(log_entry, field)
+                        for field in SUMMARY_RESULT_FIELDS
+                    }
+                    completed = rows.update(
+                        {
+                            **results,
+                            "status": ProcessingStatus.COMPLETE,
+                            **RELEASED_LEASE,
+                        },
+                        synchronize_session=False,
                     )
-                    log_entry.email_summary = summary
+                    db.commit()
+                    if not completed:
+                        raise LeaseLost(f"Lease on DB log ID {db_log_id} was lost")
 
-                    # Extract project ID
-                    project_id = self.openai_client.extract_project_id(
-                        email_body=log_entry.body, subject=log_entry.subject or ""
+                    logger.info(
+                        "Successfully summarized email. DB log ID: %s", db_log_id
                     )
-                    if project_id:
-                        log_entry.project_id = project_id
 
-                log_entry.status = ProcessingStatus.COMPLETE
-                db.merge(log_entry)
-                db.commit()
+                    # Send UI notification
+                    await self.send_ui_notification(
+                        {
+                            "type": "EMAIL_SUMMARIZED",
+                            "payload": {
+                                "id": db_log_id,
+                                "status": "COMPLETE",
+                                "summary": log_entry.email_summary,
+                                "project_id": log_entry.project_id,
+                                "summary_source": log_entry.summary_source,
+                            },
+                        }
+                    )
 
-                logger.info("Successfully summarized email. DB log ID: %s", db_log_id)
+                except LeaseLost:
+                    raise
+                except Exception as e:
+                    logger.error("FAILED summarization for %s: %s", db_log_id, e)
+                    db.rollback()
+                    failed = rows.update(
+                        {
+                            "status": ProcessingStatus.FAILED_ANALYSIS,
+                            "error_message": str(e),
+                            **RELEASED_LEASE,
+                        },
+                        synchronize_session=False,
+                    )
+                    db.commit()
+                    if not failed:
+                        raise LeaseLost(
+                            f"Lease on DB log ID {db_log_id} was lost"
+                        ) from e
+                    raise
+
+    def summarize_in_thread(
+        self, log_entry: EmailProcessingLog, on_delta=None, stop=None
+    ):
+        """generate_summary on a session owned by the calling worker thread."""
+        with closing(next(get_db())) as db:
+            self.generate_summary(db, log_entry, on_delta, stop)
+
+    def generate_summary(
+        self, db, log_entry: EmailProcessingLog, on_delta=None, stop=None
+    ):
+        """
+        Fill in the summary and project ID. Trivial emails get a template
+        summary (and a project ID lookup when one is labelled); otherwise
+        prior results for exact duplicates (cache) and near-duplicates
+        (MinHash/LSH) are reused before calling the model deployment chosen
+        by the router. ``on_delta`` receives the partial summary while the
+        model streams it. Once ``stop`` is set (lease lost, shutdown) the
+        next model call or write raises LeaseLost instead.
+        """
+        db_log_id = log_entry.id
+        subject = log_entry.subject or ""
+        sender = log_entry.sender_address or ""
+        started = time.perf_counter()
+
+        body_tokens = count_tokens(log_entry.body)
+        route, deployment_name = self.router.route(
+            body_tokens,
+            len(log_entry.parsed_attachments_json or []),
+            log_entry.role_of_inbox,
+            sender,
+            cheap=ACTION_CHEAP_SUMMARY in (log_entry.policy_actions or []),
+        )
+        logger.info(
+            "Routing DB log ID %s (%d tokens) to '%s'", db_log_id, body_tokens, route
+        )
+
+        if route == ROUTE_TEMPLATE:
+            # Short emails still carry project IDs ("Re: Project #4711 - ok")
+            project_id, lookup_tokens = None, 0
+            if may_contain_project_id(subject, log_entry.body) and self.llm_available():
+                check_lease(stop, db_log_id)
+                project_id = self.openai_client.extract_project_id(
+                    email_body=log_entry.body,
+                    subject=subject,
+                    deployment_name=self.router.small_deployment,
+                )
+                lookup_tokens = body_tokens
+            log_entry.email_summary = template_summary(log_entry.body, sender)
+            log_entry.project_id = project_id
+            log_entry.summary_source = "template"
+            self.route_metrics.record(
+                route, time.perf_counter() - started, lookup_tokens
+            )
+            return
+
+        cache_key = self.summary_cache.make_key(
+            log_entry.body, subject, deployment_name
+        )
+        check_lease(stop, db_log_id)
+        cached = self.summary_cache.get(db, cache_key)
+        if cached:
+            logger.info("Summary cache hit for DB log ID: %s", db_log_id)
+            log_entry.email_summary = cached.email_summary
+            log_entry.project_id = cached.project_id
+            log_entry.summary_source = "cache"
+            self.route_metrics.record(ROUTE_CACHE, time.perf_counter() - started, 0)
+            return
 
-                # Send UI notification
-                await self.send_ui_notification(
+        signature = self.near_duplicates.signature_for(log_entry.body)
+        if signature is not None:
+            log_entry.minhash_signature = signature_to_bytes(signature)
+            if self.reuse_near_duplicate(db, log_entry, signature, stop):
+                self.route_metrics.record(
+                    ROUTE_DERIVED, time.perf_counter() - started, 0
+                )
+                return
+
+        # Strip learned disclaimers/footers before prompting
+        check_lease(stop, db_log_id)
+        email_body, tokens_removed = self.boilerplate_filter.clean(db, log_entry.body)
+        log_entry.boilerplate_tokens_removed = tokens_removed
+        logger.info(
+            "Removed ~%d boilerplate token(s) from DB log ID: %s",
+            tokens_removed,
+            db_log_id,
+        )
+
+        if not self.llm_available():
+            self.apply_extractive_summary(log_entry, email_body)
+            self.route_metrics.record(
+                ROUTE_EXTRACTIVE, time.perf_counter() - started, 0
+            )
+            return
+
+        stream_delta = on_delta
+        if on_delta is not None:
+
+            def stream_delta(partial_summary: str):
+                # Ends a streaming completion once the job is abandoned
+                check_lease(stop, db_log_id)
+                on_delta(partial_summary)
+
+        check_lease(stop, db_log_id)
+        try:
+            summary = self.fail_fast_client.summarize_email(
+                email_body=email_body,
+                subject=subject,
+                sender=sender,
+                deployment_name=deployment_name,
+                on_delta=stream_delta,
+            )
+        except LeaseLost:
+            raise
+        except Exception as e:
+            logger.warning(
+                "LLM unavailable for DB log ID %s, using extractive summary: %s",
+                db_log_id,
+                e,
+            )
+            self.mark_llm_unavailable()
+            self.apply_extractive_summary(log_entry, email_body)
+            self.route_metrics.record(
+                ROUTE_EXTRACTIVE, time.perf_counter() - started, 0
+            )
+            return
+
+        # Extract project ID
+        check_lease(stop, db_log_id)
+        project_id = self.openai_client.extract_project_id(
+            email_body=email_body,
+            subject=subject,
+            deployment_name=self.router.small_deployment,
+        )
+        self.route_metrics.record(
+            route, time.perf_counter() - started, body_tokens - tokens_removed
+        )
+
+        log_entry.email_summary = summary
+        log_entry.project_id = project_id
+        log_entry.summary_source = "llm"
+        check_lease(stop, db_log_id)
+        self.summary_cache.put(db, cache_key, summary, project_id, deployment_name)
+        if signature is not None:
+            self.near_duplicates.add(db_log_id, signature)
+
+    def partial_summary_publisher(self, db_log_id: int):
+        """
+        Build a streaming callback that publishes EMAIL_SUMMARY_PARTIAL
+        events at most every SUMMARY_STREAM_INTERVAL_MS. It is called from
+        the worker thread and hands events back to the event loop. The first
+        tokens go out immediately; an event still in flight makes later
+        deltas wait for the next interval, and the final EMAIL_SUMMARIZED
+        event always carries the complete text.
+        """
+        loop = asyncio.get_running_loop()
+        interval = settings.SUMMARY_STREAM_INTERVAL_MS / 1000.0
+        state = {"sent_at": None, "seq": 0, "pending": None}
+
+        def on_delta(partial_summary: str):
+            now = time.monotonic()
+            if state["sent_at"] is not None and now - state["sent_at"] < interval:
+                return
+            if state["pending"] is not None and not state["pending"].done():
+                return
+            state["sent_at"] = now
+            state["seq"] += 1
+            state["pending"] = asyncio.run_coroutine_threadsafe(
+                self.send_ui_notification(
                     {
-                        "type": "EMAIL_SUMMARIZED",
+                        "type": "EMAIL_SUMMARY_PARTIAL",
                         "payload": {
                             "id": db_log_id,
-                            "status": "COMPLETE",
-                            "summary": log_entry.email_summary,
-                            "project_id": log_entry.project_id,
+                            "partial_summary": partial_summary,
+                            "seq": state["seq"],
                         },
                     }
+                ),
+                loop,
+            )
+
+        return on_delta
+
+    def llm_available(self) -> bool:
+        return time.monotonic() >= self.llm_unavailable_until
+
+    def mark_llm_unavailable(self):
+        """Skip the LLM for a cooldown period after a failure."""
+        self.llm_unavailable_until = (
+            time.monotonic() + settings.LLM_FAILURE_COOLDOWN_SECONDS
+        )
+
+    def apply_extractive_summary(self, log_entry: EmailProcessingLog, email_body: str):
+        """
+        Interim CPU-only summary, computed in the process pool. Rows flagged
+        ``extractive`` are upgraded to an LLM summary once capacity returns.
+        """
+        log_entry.email_summary = self.extractive_pool.submit(
+            extractive_summary, email_body
+        ).result()
+        log_entry.summary_source = "extractive"
+
+    def reuse_near_duplicate(
+        self, db, log_entry: EmailProcessingLog, signature, stop=None
+    ):
+        """Copy the summary of a near-duplicate email, flagged as derived."""
+        self.near_duplicates.refresh(db)
+        for match_id, similarity in self.near_duplicates.query(signature):
+            match = (
+                db.query(
+                    EmailProcessingLog.email_summary, EmailProcessingLog.project_id
                 )
+                .filter_by(id=match_id, summary_source="llm")
+                .first()
+            )
+            if not match or not match.email_summary:
+                continue
+
+            # Reference numbers often differ between near-duplicates: only keep
+            # the project ID if it still appears, otherwise re-extract it.
+            project_id = match.project_id
+            if project_id and project_id not in (
+                f"{log_entry.subject or ''}\n{log_entry.body}"
+            ):
+                check_lease(stop, log_entry.id)
+                project_id = self.openai_client.extract_project_id(
+                    email_body=log_entry.body,
+                    subject=log_entry.subject or "",
+                    deployment_name=self.router.small_deployment,
+                )
+
+            log_entry.email_summary = match.email_summary
+            log_entry.project_id = project_id
+            log_entry.summary_source = "derived"
+            log_entry.derived_from_id = match_id
+            logger.info(
+                "Reused summary of DB log ID %s (similarity %.2f) for DB log ID: %s",
+                match_id,
+                similarity,
+                log_entry.id,
+            )
+            return True
+        return False
 
+    async def upgrade_extractive_summaries(self):
+        """Re-summarize extractive rows with the LLM while it is available."""
+        while True:
+            await asyncio.sleep(settings.EXTRACTIVE_UPGRADE_INTERVAL_SECONDS)
+            if not self.llm_available():
+                continue
+            try:
+                for _ in range(settings.EXTRACTIVE_UPGRADE_BATCH_SIZE):
+                    upgraded = await asyncio.to_thread(self.upgrade_one_summary)
+                    if not upgraded:
+                        break
+                    await self.send_ui_notification(
+                        {"type": "EMAIL_SUMMARIZED", "payload": upgraded}
+                    )
             except Exception as e:
-                logger.error("FAILED summarization for %s: %s", db_log_id, e)
-                db.rollback()
-                log_entry = db.query(EmailProcessingLog).filter_by(id=db_log_id).first()
-                if log_entry:
-                    log_entry.status = ProcessingStatus.FAILED_ANALYSIS
-                    log_entry.error_message = str(e)
-                    db.commit()
+                logger.warning("Extractive summary upgrade paused: %s", e)
+                self.mark_llm_unavailable()
+
+    def upgrade_one_summary(self) -> dict | None:
+        """
+        Upgrade the oldest extractive summary. The row is leased in a short
+        transaction, the model is called with no transaction open, and the
+        result only applies while the row is still extractive and ours.
+        """
+        with closing(next(get_db())) as db:
+            log_entry = (
+                db.query(EmailProcessingLog)
+                .options(undefer_group(CONTENT_GROUP))
+                .filter(
+                    EmailProcessingLog.summary_source == "extractive",
+                    EmailProcessingLog.status == ProcessingStatus.COMPLETE,
+                    or_(
+                        EmailProcessingLog.lease_expires_at.is_(None),
+                        EmailProcessingLog.lease_expires_at < func.now(),
+                    ),
+                )
+                .order_by(EmailProcessingLog.received_at)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if not log_entry:
+                return None
+
+            db_log_id = log_entry.id
+            subject = log_entry.subject or ""
+            sender = log_entry.sender_address or ""
+            _, deployment_name = self.router.route(
+                count_tokens(log_entry.body),
+                len(log_entry.parsed_attachments_json or []),
+                log_entry.role_of_inbox,
+                sender,
+                cheap=ACTION_CHEAP_SUMMARY in (log_entry.policy_actions or []),
+            )
+            email_body, _ = self.boilerplate_filter.clean(
+                db, log_entry.body, record=False
+            )
+            for field, value in acquired_lease().items():
+                setattr(log_entry, field, value)
+            # A lease is not a change the UI needs to resync
+            log_entry.status_updated_at = EmailProcessingLog.status_updated_at
+            db.commit()
+
+            owned = db.query(EmailProcessingLog).filter(
+                EmailProcessingLog.id == db_log_id,
+                EmailProcessingLog.summary_source == "extractive",
+                EmailProcessingLog.owner == worker_identity(),
+            )
+            try:
+                summary = self.openai_client.summarize_email(
+                    email_body=email_body,
+                    subject=subject,
+                    sender=sender,
+                    deployment_name=deployment_name,
+                )
+                project_id = self.openai_client.extract_project_id(
+                    email_body=email_body,
+                    subject=subject,
+                    deployment_name=self.router.small_deployment,
+                )
+            except Exception:
+                owned.update(
+                    {
+                        **RELEASED_LEASE,
+                        "status_updated_at": EmailProcessingLog.status_updated_at,
+                    },
+                    synchronize_session=False,
+                )
+                db.commit()
                 raise
 
+            upgraded = owned.update(
+                {
+                    "email_summary": summary,
+                    "project_id": project_id,
+                    "summary_source": "llm",
+                    **RELEASED_LEASE,
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+            if not upgraded:
+                logger.info(
+                    "DB log ID %s changed during its upgrade; skipped", db_log_id
+                )
+                return None
+            logger.info("Upgraded extractive summary for DB log ID: %s", db_log_id)
+
+            return {
+                "id": db_log_id,
+                "status": "COMPLETE",
+                "summary": summary,
+                "project_id": project_id,
+                "summary_source": "llm",
+            }
+
     async def send_ui_notification(self, payload: dict):
         """Send notification to UI via fanout exchange."""
         try:
             await AsyncRabbitMQPublisher.publish_event(
                 exchange_name=self.ui_exchange, event_body=payload
             )
-            logger.info("Sent UI notification: %s", payload["type"])
+            log = (
+                logger.debug
+                if payload["type"] == "EMAIL_SUMMARY_PARTIAL"
+                else logger.info
+            )
+            log("Sent UI notification: %s", payload["type"])
         except Exception as e:
             logger.error("Failed to send UI notification: %s", e)
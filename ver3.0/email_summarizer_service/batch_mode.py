@@ -0,0 +1,421 @@
+# Backlog mode for the summarizer: packs PARSED emails into Azure OpenAI
+# Batch API jobs instead of one synchronous completion per email.
+#
+#   python -m email_summarizer_service.batch_mode --limit 5000
+#   python -m email_summarizer_service.batch_mode --local   # file-based fake
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import uuid
+from collections import defaultdict
+from contextlib import closing
+
+from openai import AzureOpenAI
+from sqlalchemy.orm import undefer_group
+
+from core.async_rabbitmq_client import AsyncRabbitMQPublisher
+from core.config import settings
+from core.database import get_db
+from core.leases import (
+    RELEASED_LEASE,
+    acquired_lease,
+    mark_queued,
+    renew_leases,
+    requeued_job,
+    worker_identity,
+)
+from core.models import CONTENT_GROUP, EmailProcessingLog, ProcessingStatus
+from core.sharding import route_job
+
+from .boilerplate import BoilerplateFilter
+from .near_duplicate import NearDuplicateIndex, signature_to_bytes
+from .openai_client import (
+    parse_project_id,
+    parse_summary,
+    project_id_request,
+    summary_request,
+)
+from .tokenizer import truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class AzureBatchBackend:
+    """Azure OpenAI Batch API (requires a global-batch deployment)."""
+
+    def __init__(self):
+        self.client = AzureOpenAI(
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            api_version=settings.AZURE_OPENAI_BATCH_API_VERSION,
+            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+        )
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> list[dict]:
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = self.client.files.content(file_id).text
+                lines.extend(json.loads(line) for line in content.splitlines() if line)
+        return lines
+
+
+class LocalFileBatchBackend:
+    """
+    File-based stand-in for the Batch API, for local runs and tests.
+    Jobs complete immediately with canned responses written to disk in the
+    Batch API output format.
+    """
+
+    def __init__(self, directory: str | None = None):
+        self.directory = directory or os.path.join(settings.BATCH_LOCAL_DIR, "local")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def submit(self, input_path: str) -> str:
+        batch_id = f"local-{uuid.uuid4().hex}"
+        batch_dir = os.path.join(self.directory, batch_id)
+        os.makedirs(batch_dir)
+        shutil.copy(input_path, os.path.join(batch_dir, "input.jsonl"))
+
+        with open(os.path.join(batch_dir, "input.jsonl")) as src, open(
+            os.path.join(batch_dir, "output.jsonl"), "w"
+        ) as dst:
+            for line in src:
+                request = json.loads(line)
+                prompt = request["body"]["messages"][-1]["content"]
+                if request["custom_id"].startswith("project-"):
+                    content = "None"
+                else:
+                    content = f"[local batch] {prompt.strip()[:200]}"
+                dst.write(
+                    json.dumps(
+                        {
+                            "id": uuid.uuid4().hex,
+                            "custom_id": request["custom_id"],
+                            "response": {
+                                "status_code": 200,
+                                "body": {
+                                    "choices": [{"message": {"content": content}}]
+                                },
+                            },
+                            "error": None,
+                        }
+                    )
+                    + "\n"
+                )
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        output = os.path.join(self.directory, batch_id, "output.jsonl")
+        return "completed" if os.path.exists(output) else "in_progress"
+
+    def results(self, batch_id: str) -> list[dict]:
+        with open(os.path.join(self.directory, batch_id, "output.jsonl")) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class BatchSummarizer:
+    """Claims PARSED emails, summarizes them through batch jobs and bulk-writes results."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.deployment_name = settings.AZURE_OPENAI_BATCH_DEPLOYMENT_NAME
+        self.emails_per_job = settings.BATCH_MAX_EMAILS_PER_JOB
+        self.poll_interval = settings.BATCH_POLL_INTERVAL_SECONDS
+        self.input_token_budget = settings.SUMMARY_INPUT_TOKEN_BUDGET
+        self.boilerplate_filter = BoilerplateFilter()
+        self.near_duplicates = NearDuplicateIndex()
+
+    def claim_pending(self, db, batch_id: str, count: int) -> list[EmailProcessingLog]:
+        """
+        Move up to ``count`` PARSED emails to ANALYZING under ``batch_id``.
+        The real-time summarizer skips claimed rows. The rows are leased to
+        this process, which renews the leases until the job is collected.
+        """
+        rows = (
+            db.query(EmailProcessingLog)
+            .options(undefer_group(CONTENT_GROUP))
+            .filter(
+                EmailProcessingLog.status == ProcessingStatus.PARSED,
+                EmailProcessingLog.body.isnot(None),
+            )
+            .order_by(EmailProcessingLog.received_at)
+            .limit(count)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for row in rows:
+            row.status = ProcessingStatus.ANALYZING
+            row.batch_id = batch_id
+            for field, value in acquired_lease().items():
+                setattr(row, field, value)
+        db.commit()
+        return rows
+
+    def write_requests(self, db, rows: list[EmailProcessingLog], path: str):
+        """Write one summary and one project-ID request per email as JSONL."""
+        with open(path, "w") as f:
+            for row in rows:
+                email_body, tokens_removed = self.boilerplate_filter.clean(db, row.body)
+                row.boilerplate_tokens_removed = tokens_removed
+                # Map-reduce is not available offline; truncate to the budget
+                email_body = truncate_to_tokens(email_body, self.input_token_budget)
+
+                requests = (
+                    (
+                        f"summary-{row.id}",
+                        summary_request(
+                            self.deployment_name,
+                            email_body,
+                            row.subject or "",
+                            row.sender_address or "",
+                        ),
+                    ),
+                    (
+                        f"project-{row.id}",
+                        project_id_request(
+                            self.deployment_name, email_body, row.subject or ""
+                        ),
+                    ),
+                )
+                for custom_id, body in requests:
+                    f.write(
+                        json.dumps(
+                            {
+                                "custom_id": custom_id,
+                                "method": "POST",
+                                "url": "/chat/completions",
+                                "body": body,
+                            }
+                        )
+                        + "\n"
+                    )
+        db.commit()
+        self.boilerplate_filter.flush()
+
+    def apply_results(
+        self, db, rows: list[EmailProcessingLog], results: list[dict]
+    ) -> list[int]:
+        """Bulk-write batch results back to email_processing_log."""
+        contents = {}
+        for result in results:
+            response = result.get("response") or {}
+            if response.get("status_code") == 200:
+                choice = response["body"]["choices"][0]
+                contents[result["custom_id"]] = choice["message"].get("content")
+
+        mappings = []
+        completed_ids = []
+        for row in rows:
+            summary_key = f"summary-{row.id}"
+            if summary_key not in contents:
+                mappings.append(
+                    {
+                        "id": row.id,
+                        "status": ProcessingStatus.FAILED_ANALYSIS,
+                        "error_message": f"No batch result for {summary_key}",
+                        "batch_id": None,
+                        **RELEASED_LEASE,
+                    }
+                )
+                continue
+
+            mapping = {
+                "id": row.id,
+                "email_summary": parse_summary(contents[summary_key]),
+                "project_id": parse_project_id(contents.get(f"project-{row.id}")),
+                "summary_source": "llm",
+                "status": ProcessingStatus.COMPLETE,
+                "batch_id": None,
+                **RELEASED_LEASE,
+            }
+            signature = self.near_duplicates.signature_for(row.body)
+            if signature is not None:
+                mapping["minhash_signature"] = signature_to_bytes(signature)
+            mappings.append(mapping)
+            completed_ids.append(row.id)
+
+        db.bulk_update_mappings(EmailProcessingLog, mappings)
+        db.commit()
+        return completed_ids
+
+    async def run(self, limit: int | None = None, max_jobs: int | None = None):
+        """Submit jobs until the backlog (or ``limit``) is exhausted, then collect them."""
+        jobs = {}
+        claimed = 0
+
+        with closing(next(get_db())) as db:
+            while (limit is None or claimed < limit) and (
+                max_jobs is None or len(jobs) < max_jobs
+            ):
+                job_key = uuid.uuid4().hex
+                count = self.emails_per_job
+                if limit is not None:
+                    count = min(count, limit - claimed)
+                rows = self.claim_pending(db, job_key, count)
+                if not rows:
+                    break
+                claimed += len(rows)
+
+                input_path = os.path.join(settings.BATCH_LOCAL_DIR, f"{job_key}.jsonl")
+                os.makedirs(settings.BATCH_LOCAL_DIR, exist_ok=True)
+                self.write_requests(db, rows, input_path)
+
+                try:
+                    batch_id = self.backend.submit(input_path)
+                except Exception as e:
+                    logger.error("Failed to submit batch job: %s", e)
+                    await self.requeue(db, rows)
+                    break
+                jobs[batch_id] = [row.id for row in rows]
+                self.renew_leases(db, jobs)
+                logger.info("Submitted batch %s with %d email(s)", batch_id, len(rows))
+
+            while jobs:
+                self.renew_leases(db, jobs)
+                for batch_id in list(jobs):
+                    status = self.backend.status(batch_id)
+                    if status not in TERMINAL_STATUSES:
+                        continue
+
+                    # Rows reaped meanwhile belong to another worker now
+                    rows = (
+                        db.query(EmailProcessingLog)
+                        .options(undefer_group(CONTENT_GROUP))
+                        .filter(
+                            EmailProcessingLog.id.in_(jobs.pop(batch_id)),
+                            EmailProcessingLog.status == ProcessingStatus.ANALYZING,
+                            EmailProcessingLog.owner == worker_identity(),
+                        )
+                        .with_for_update()
+                        .all()
+                    )
+                    if status != "completed":
+                        # Nothing in the job ran; the emails are not at fault
+                        logger.warning(
+                            "Batch %s %s; requeuing %d email(s)",
+                            batch_id,
+                            status,
+                            len(rows),
+                        )
+                        await self.requeue(db, rows, count_attempt=True)
+                        continue
+
+                    results = self.backend.results(batch_id)
+                    completed_ids = self.apply_results(db, rows, results)
+                    logger.info(
+                        "Batch %s %s: %d/%d email(s) summarized",
+                        batch_id,
+                        status,
+                        len(completed_ids),
+                        len(rows),
+                    )
+                    await self.notify_ui(batch_id, completed_ids)
+
+                if jobs:
+                    await asyncio.sleep(self.poll_interval)
+
+        logger.info("Batch summarization finished: %d email(s) claimed", claimed)
+        await AsyncRabbitMQPublisher.close()
+
+    def renew_leases(self, db, jobs: dict[str, list[int]]):
+        """Keep the reaper off the rows of jobs that are still outstanding."""
+        renew_leases(db, [db_log_id for ids in jobs.values() for db_log_id in ids])
+
+    async def requeue(
+        self, db, rows: list[EmailProcessingLog], count_attempt: bool = False
+    ):
+        """
+        Hand claimed rows back to the real-time path: reset them to PARSED
+        and re-publish their summarizer jobs, whose messages were dropped
+        while the rows were in the batch. A failed publish leaves queued_at
+        unset for the reaper. With ``count_attempt`` the row's lease_attempts
+        is charged, and after LEASE_MAX_ATTEMPTS it is failed instead.
+        """
+        jobs = defaultdict(list)
+        requeued_ids = []
+        for row in rows:
+            for field, value in RELEASED_LEASE.items():
+                setattr(row, field, value)
+            row.batch_id = None
+            row.queued_at = None
+            if count_attempt:
+                row.lease_attempts = (row.lease_attempts or 0) + 1
+                if row.lease_attempts >= settings.LEASE_MAX_ATTEMPTS:
+                    row.status = ProcessingStatus.FAILED_ANALYSIS
+                    row.error_message = f"Batch jobs failed {row.lease_attempts} times"
+                    continue
+            queue_name, message_body = requeued_job(row)
+            jobs[route_job(queue_name, message_body)].append(message_body)
+            requeued_ids.append(row.id)
+        db.commit()
+
+        try:
+            for queue_name, message_bodies in jobs.items():
+                await AsyncRabbitMQPublisher.publish_many(queue_name, message_bodies)
+        except Exception as e:
+            logger.error(
+                "Failed to re-publish %d email(s); the reaper will retry: %s",
+                len(requeued_ids),
+                e,
+            )
+            return
+        mark_queued(db, requeued_ids)
+
+    async def notify_ui(self, batch_id: str, completed_ids: list[int]):
+        if not completed_ids:
+            return
+        try:
+            await AsyncRabbitMQPublisher.publish_event(
+                exchange_name=settings.RABBITMQ_UI_NOTIFY_EXCHANGE,
+                event_body={
+                    "type": "EMAILS_SUMMARIZED_BATCH",
+                    "payload": {"batch_id": batch_id, "ids": completed_ids},
+                },
+            )
+        except Exception as e:
+            logger.error("Failed to send UI notification: %s", e)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize the PARSED backlog in batch"
+    )
+    parser.add_argument("--limit", type=int, help="maximum number of emails to claim")
+    parser.add_argument("--max-jobs", type=int, help="maximum number of batch jobs")
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="use the local file-based fake batch endpoint",
+    )
+    args = parser.parse_args()
+
+    backend = LocalFileBatchBackend() if args.local else AzureBatchBackend()
+    asyncio.run(BatchSummarizer(backend).run(limit=args.limit, max_jobs=args.max_jobs))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    main()
@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from core.config import settings
+from core.database import SessionLocal
+from core.models import BoilerplateLineStat
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_DIGITS_RE = re.compile(r"\d+")
+
+# Prune stale lines from the frequency table every N observed emails
+PRUNE_EVERY = 500
+
+
+def normalize_line(line: str) -> str:
+    """
+    Normalize a body line so that repeated footers hash identically.
+    Case, whitespace and digit runs (dates, phone numbers) are ignored.
+    """
+    line = _WHITESPACE_RE.sub(" ", line.strip().lower())
+    return _DIGITS_RE.sub("#", line)
+
+
+def hash_line(normalized_line: str) -> str:
+    return hashlib.blake2b(normalized_line.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+class BoilerplateFilter:
+    """
+    Strips lines that recur across many emails (legal disclaimers,
+    confidentiality footers, signature blocks) before summarization.
+
+    Line frequencies are kept in the ``boilerplate_line_stats`` table and
+    updated incrementally (in small batches) with the emails seen, so all
+    summarizer processes learn from the same corpus. ``db`` is only read
+    from; statistics are written through separate short sessions.
+    """
+
+    def __init__(self):
+        self.min_occurrences = settings.BOILERPLATE_MIN_OCCURRENCES
+        self.min_line_chars = settings.BOILERPLATE_MIN_LINE_CHARS
+        self.max_age_days = settings.BOILERPLATE_MAX_AGE_DAYS
+        self.flush_every = max(settings.BOILERPLATE_FLUSH_EVERY, 1)
+        self._observed = 0
+        # clean() runs in worker threads, so the buffer is shared
+        self._lock = threading.Lock()
+        self._pending: Counter = Counter()
+        self._pending_emails = 0
+
+    def _line_hashes(self, lines: list[str]) -> list[str | None]:
+        """Hash each candidate line; short lines are never treated as boilerplate."""
+        hashes = []
+        for line in lines:
+            normalized = normalize_line(line)
+            if len(normalized) < self.min_line_chars:
+                hashes.append(None)
+            else:
+                hashes.append(hash_line(normalized))
+        return hashes
+
+    def clean(self, db: Session, body: str, record: bool = True) -> tuple[str, int]:
+        """
+        Remove boilerplate lines from ``body`` and, unless ``record`` is
+        False (re-processing an email already counted), record its lines in
+        the frequency table.
+
+        Returns:
+            The cleaned body and the estimated number of tokens removed
+        """
+        if not body:
+            return body, 0
+
+        lines = body.splitlines()
+        hashes = self._line_hashes(lines)
+        unique_hashes = {h for h in hashes if h}
+        if not unique_hashes:
+            return body, 0
+
+        # Look up frequencies before this email is counted
+        frequent = {
+            row.line_hash
+            for row in db.query(BoilerplateLineStat.line_hash).filter(
+                BoilerplateLineStat.line_hash.in_(unique_hashes),
+                BoilerplateLineStat.occurrences >= self.min_occurrences,
+            )
+        }
+
+        kept_lines = [
+            line for line, line_hash in zip(lines, hashes) if line_hash not in frequent
+        ]
+        cleaned = "\n".join(kept_lines).strip()
+
+        if record:
+            self._record(unique_hashes)
+
+        # Never hand an empty body to the summarizer
+        if not cleaned:
+            return body, 0
+
+        tokens_removed = max(estimate_tokens(body) - estimate_tokens(cleaned), 0)
+        return cleaned, tokens_removed
+
+    def _record(self, line_hashes: set[str]):
+        """
+        Count the lines of one email. Counts are buffered and upserted every
+        BOILERPLATE_FLUSH_EVERY emails, so the hot footer rows are written
+        once per batch instead of once per email.
+        """
+        with self._lock:
+            self._pending.update(line_hashes)
+            self._pending_emails += 1
+            if self._pending_emails < self.flush_every:
+                return
+        self.flush()
+
+    def flush(self):
+        """
+        Upsert the buffered line counts in a short session of their own; the
+        caller's session and transaction are never touched.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            emails, self._pending_emails = self._pending_emails, 0
+        if not pending:
+            return
+
+        stmt = insert(BoilerplateLineStat).values(
+            [
+                {"line_hash": h, "occurrences": pending[h]}
+                for h in sorted(pending)  # fixed lock order across workers
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BoilerplateLineStat.line_hash],
+            set_={
+                "occurrences": BoilerplateLineStat.occurrences
+                + stmt.excluded.occurrences,
+                "last_seen_at": func.now(),
+            },
+        )
+        try:
+            with SessionLocal() as db:
+                db.execute(stmt)
+                db.commit()
+        except Exception as e:
+            logger.error("Failed to update boilerplate line statistics: %s", e)
+            return
+
+        with self._lock:
+            before = self._observed
+            self._observed += emails
+            prune = before // PRUNE_EVERY != self._observed // PRUNE_EVERY
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drop lines not seen within the rolling window."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.max_age_days)
+        try:
+            with SessionLocal() as db:
+                deleted = (
+                    db.query(BoilerplateLineStat)
+                    .filter(BoilerplateLineStat.last_seen_at < cutoff)
+                    .delete(synchronize_session=False)
+                )
+                db.commit()
+            logger.info("Pruned %d stale boilerplate line(s)", deleted)
+            return deleted
+        except Exception as e:
+            logger.error("Failed to prune boilerplate line statistics: %s", e)
+            return 0
@@ -0,0 +1,59 @@
+import re
+
+import numpy as np
+
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+MAX_SENTENCES = 3
+MIN_SENTENCE_WORDS = 4
+MAX_INPUT_SENTENCES = 400
+
+
+def split_sentences(text: str) -> list[str]:
+    text = _HTML_TAG_RE.sub(" ", text or "")
+    sentences = []
+    for raw in _SENTENCE_RE.split(text):
+        sentence = " ".join(raw.split())
+        if len(sentence.split()) >= MIN_SENTENCE_WORDS:
+            sentences.append(sentence)
+    return sentences[:MAX_INPUT_SENTENCES]
+
+
+def extractive_summary(body: str, max_sentences: int = MAX_SENTENCES) -> str:
+    """
+    CPU-only summary: score sentences by the cosine similarity of their
+    TF-IDF vectors to the document centroid (vectorized with NumPy) and
+    return the best ones in original order.
+    Module-level so it can run in a process pool.
+    """
+    sentences = split_sentences(body)
+    if not sentences:
+        return " ".join((body or "").split())[:300]
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+
+    tokenized = [_WORD_RE.findall(sentence.lower()) for sentence in sentences]
+    vocabulary = {}
+    for words in tokenized:
+        for word in words:
+            vocabulary.setdefault(word, len(vocabulary))
+
+    term_counts = np.zeros((len(sentences), len(vocabulary)), dtype=np.float32)
+    for row, words in enumerate(tokenized):
+        np.add.at(term_counts[row], [vocabulary[w] for w in words], 1.0)
+
+    document_frequency = np.count_nonzero(term_counts, axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1.0
+    lengths = np.maximum(term_counts.sum(axis=1, keepdims=True), 1.0)
+    tfidf = (term_counts / lengths) * idf
+
+    # Cosine similarity to the document centroid, mild boost for early sentences
+    centroid = tfidf.sum(axis=0)
+    norms = np.linalg.norm(tfidf, axis=1) * max(np.linalg.norm(centroid), 1e-9)
+    scores = (tfidf @ centroid) / np.maximum(norms, 1e-9)
+    scores *= 1.0 + 0.2 / (1.0 + np.arange(len(sentences)))
+
+    best = np.sort(np.argsort(-scores)[:max_sentences])
+    return " ".join(sentences[i] for i in best)
@@ -0,0 +1,187 @@
+import hashlib
+import logging
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import EmailProcessingLog, ProcessingStatus
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed: signatures must be comparable across processes and restarts.
+# a, b < 2**32 keeps a * h + b inside uint64 for 32-bit shingle hashes.
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+")
+
+# Seconds between incremental index refreshes from the database
+REFRESH_INTERVAL = 30
+
+# Each refresh re-reads this many seconds before its watermark: a row is
+# stamped before its transaction commits, so it can become visible after a
+# refresh already saw a later timestamp
+REFRESH_OVERLAP_SECONDS = 60
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """32-bit hashes of the word 3-grams in ``text``."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {
+            " ".join(words[i : i + SHINGLE_SIZE])
+            for i in range(len(words) - SHINGLE_SIZE + 1)
+        }
+    return np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little"
+            )
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def compute_signature(hashes: np.ndarray) -> np.ndarray:
+    """MinHash signature over all permutations at once (NUM_PERM x shingles)."""
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return np.bitwise_and(permuted, _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype("<u4").tobytes()
+
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4").astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    In-process LSH index over MinHash signatures of LLM-summarized emails.
+
+    Signatures are persisted per email in ``minhash_signature``; the index
+    is rebuilt from the database on startup and topped up incrementally
+    with rows written by other summarizer processes.
+    """
+
+    def __init__(self):
+        self.threshold = settings.NEAR_DUPLICATE_THRESHOLD
+        self.min_shingles = settings.NEAR_DUPLICATE_MIN_SHINGLES
+        self.index_limit = settings.NEAR_DUPLICATE_INDEX_LIMIT
+        self._buckets = [defaultdict(list) for _ in range(BANDS)]
+        self._signatures: dict[int, np.ndarray] = {}
+        # status_updated_at of the newest loaded row; rows are picked up by
+        # completion time, not id, since lower ids can complete later
+        self._watermark: datetime | None = None
+        self._last_refresh = 0.0
+
+    def signature_for(self, text: str) -> np.ndarray | None:
+        """Signature for ``text``, or None when it is too short to compare."""
+        hashes = shingle_hashes(text)
+        if len(hashes) < self.min_shingles:
+            return None
+        return compute_signature(hashes)
+
+    def add(self, log_id: int, signature: np.ndarray):
+        if log_id in self._signatures:
+            return
+        self._signatures[log_id] = signature
+        for band in range(BANDS):
+            key = signature[band * ROWS : (band + 1) * ROWS].tobytes()
+            self._buckets[band][key].append(log_id)
+
+    def query(self, signature: np.ndarray) -> list[tuple[int, float]]:
+        """Indexed emails whose estimated Jaccard similarity meets the threshold."""
+        candidates = set()
+        for band in range(BANDS):
+            key = signature[band * ROWS : (band + 1) * ROWS].tobytes()
+            candidates.update(self._buckets[band].get(key, ()))
+        if not candidates:
+            return []
+
+        candidate_ids = list(candidates)
+        matrix = np.stack([self._signatures[i] for i in candidate_ids])
+        similarities = (matrix == signature).mean(axis=1)
+
+        order = np.argsort(-similarities)
+        return [
+            (candidate_ids[i], float(similarities[i]))
+            for i in order
+            if similarities[i] >= self.threshold
+        ]
+
+    def _completed_signatures(self, db: Session):
+        return db.query(
+            EmailProcessingLog.id,
+            EmailProcessingLog.minhash_signature,
+            EmailProcessingLog.status_updated_at,
+        ).filter(
+            EmailProcessingLog.minhash_signature.isnot(None),
+            EmailProcessingLog.summary_source == "llm",
+            EmailProcessingLog.status == ProcessingStatus.COMPLETE,
+        )
+
+    def _add_rows(self, rows) -> int:
+        for log_id, data, updated_at in rows:
+            self.add(log_id, signature_from_bytes(data))
+            if updated_at and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+        return len(rows)
+
+    def rebuild(self, db: Session):
+        """Rebuild the index from the most recent signatures in the database."""
+        self._buckets = [defaultdict(list) for _ in range(BANDS)]
+        self._signatures = {}
+        self._watermark = None
+        rows = (
+            self._completed_signatures(db)
+            .order_by(
+                EmailProcessingLog.status_updated_at.desc(),
+                EmailProcessingLog.id.desc(),
+            )
+            .limit(self.index_limit)
+            .all()
+        )
+        loaded = self._add_rows(rows)
+        self._last_refresh = time.monotonic()
+        logger.info("Near-duplicate index rebuilt with %d signature(s)", loaded)
+
+    def refresh(self, db: Session):
+        """Pick up signatures stored by other processes since the last refresh."""
+        if time.monotonic() - self._last_refresh < REFRESH_INTERVAL:
+            return
+        self._last_refresh = time.monotonic()
+        query = self._completed_signatures(db)
+        if self._watermark is not None:
+            since = self._watermark - timedelta(seconds=REFRESH_OVERLAP_SECONDS)
+            query = query.filter(EmailProcessingLog.status_updated_at >= since)
+        rows = (
+            query.order_by(EmailProcessingLog.status_updated_at, EmailProcessingLog.id)
+            .limit(self.index_limit)
+            .all()
+        )
+        # Rows from the overlap window are already indexed; add() skips them
+        before = len(self._signatures)
+        self._add_rows(rows)
+        loaded = len(self._signatures) - before
+        if loaded:
+            logger.info("Near-duplicate index refreshed with %d signature(s)", loaded)
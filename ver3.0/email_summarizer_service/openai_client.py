@@ -1,29 +1,28 @@
+import hashlib
 import logging
 import json
-from openai import AzureOpenAI
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from openai import AzureOpenAI, RateLimitError
 from core.config import settings
 
+from .rate_limiter import OpenAIRateLimiter, retry_after_seconds
+from .tokenizer import count_tokens, split_into_chunks, truncate_to_tokens
+
 logger = logging.getLogger(__name__)
 
+# --- Prompts ---
+# Any edit to these changes PROMPT_VERSION and invalidates cached summaries.
 
-class AzureOpenAIClient:
-    """Client for Azure OpenAI API to generate email summaries and analyze attachments."""
+SUMMARY_SYSTEM_PROMPT = (
+    "You are a helpful assistant that creates "
+    "concise, professional email summaries. "
+    "Focus on extracting main purpose, key "
+    "information, and action items from "
+    "emails."
+)
 
-    def __init__(self):
-        self.client = AzureOpenAI(
-            api_key=settings.AZURE_OPENAI_API_KEY,
-            api_version="2024-02-01",
-            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-        )
-        self.deployment_name = settings.AZURE_OPENAI_DEPLOYMENT_NAME
-
-    def summarize_email(
-        self, email_body: str, subject: str = "", sender: str = ""
-    ) -> str:
-        """Generate a concise summary of the email content."""
-        try:
-            # Create a comprehensive prompt for email summarization
-            prompt = f"""
+SUMMARY_PROMPT_TEMPLATE = """
 Please provide a concise, professional summary of the following email in
 2-3 sentences. Focus on the main purpose, key points, and any action items
 or important information.
@@ -36,42 +35,29 @@ Email Content:
 
 Summary:"""
 
-            response = self.client.chat.completions.create(
-                model=self.deployment_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a helpful assistant that creates "
-                            "concise, professional email summaries. "
-                            "Focus on extracting main purpose, key "
-                            "information, and action items from "
-                            "emails."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=300,
-                temperature=0.3,
-            )
+CHUNK_SYSTEM_PROMPT = (
+    "You are a helpful assistant that condenses "
+    "sections of long emails without losing action "
+    "items, dates or identifiers."
+)
 
-            summary = response.choices[0].message.content
-            if summary:
-                summary = summary.strip()
-            else:
-                summary = "No summary could be generated."
+CHUNK_PROMPT_TEMPLATE = """
+The following is part {index} of {total} of a long email. List its key
+points, requests and action items in a few short bullet points.
 
-            logger.info("Successfully generated email summary")
-            return summary
+Email Section:
+{chunk}
 
-        except Exception as e:
-            logger.error("Failed to generate email summary: %s", e)
-            return f"Error generating summary: {str(e)}"
+Key Points:"""
 
-    def extract_project_id(self, email_body: str, subject: str = "") -> str | None:
-        """Extract project ID from email content."""
-        try:
-            prompt = f"""
+PROJECT_ID_SYSTEM_PROMPT = (
+    "You are an assistant that extracts "
+    "project IDs from emails. "
+    "Return only the Project ID if found, or "
+    "'None' if not found."
+)
+
+PROJECT_ID_PROMPT_TEMPLATE = """
 Extract the project ID from the following email if present.
 Look for patterns like: Project ID, Project #, Project Number, Proj ID,
 Project Code, etc. Return only the identifier, or "None" if no project ID
@@ -83,34 +69,250 @@ Email Content:
 
 Project ID:"""
 
-            response = self.client.chat.completions.create(
-                model=self.deployment_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an assistant that extracts "
-                            "project IDs from emails. "
-                            "Return only the Project ID if found, or "
-                            "'None' if not found."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=50,
-                temperature=0.1,
-            )
+PROMPT_VERSION = hashlib.sha256(
+    "\x00".join(
+        [
+            SUMMARY_SYSTEM_PROMPT,
+            SUMMARY_PROMPT_TEMPLATE,
+            CHUNK_SYSTEM_PROMPT,
+            CHUNK_PROMPT_TEMPLATE,
+            PROJECT_ID_SYSTEM_PROMPT,
+            PROJECT_ID_PROMPT_TEMPLATE,
+        ]
+    ).encode("utf-8")
+).hexdigest()[:16]
 
-            project_id = response.choices[0].message.content
-            if project_id:
-                project_id = project_id.strip()
-                if project_id.lower() in ["none", "n/a", "not found", ""]:
-                    return None
 
-                logger.info("Extracted Project ID: %s", project_id)
-                return project_id
+def summary_request(
+    deployment_name: str, email_body: str, subject: str = "", sender: str = ""
+) -> dict:
+    """Chat completion parameters for an email summary."""
+    prompt = SUMMARY_PROMPT_TEMPLATE.format(
+        subject=subject, sender=sender, email_body=email_body
+    )
+    return {
+        "model": deployment_name,
+        "messages": [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "max_tokens": 300,
+        "temperature": 0.3,
+    }
+
+
+def project_id_request(
+    deployment_name: str, email_body: str, subject: str = ""
+) -> dict:
+    """Chat completion parameters for project ID extraction."""
+    prompt = PROJECT_ID_PROMPT_TEMPLATE.format(subject=subject, email_body=email_body)
+    return {
+        "model": deployment_name,
+        "messages": [
+            {"role": "system", "content": PROJECT_ID_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "max_tokens": 50,
+        "temperature": 0.1,
+    }
+
+
+def parse_summary(content: str | None) -> str:
+    if content:
+        return content.strip()
+    return "No summary could be generated."
 
+
+def parse_project_id(content: str | None) -> str | None:
+    if content:
+        project_id = content.strip()
+        if project_id.lower() in ["none", "n/a", "not found", ""]:
             return None
+        return project_id
+    return None
+
+
+class AzureOpenAIClient:
+    """Client for Azure OpenAI API to generate email summaries and analyze attachments."""
+
+    def __init__(self, max_wait: float | None = None, max_retries: int | None = None):
+        """
+        ``max_wait`` and ``max_retries`` override the rate-limit settings,
+        e.g. for callers that have a cheaper fallback than waiting.
+        """
+        self.client = AzureOpenAI(
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            api_version="2024-02-01",
+            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+            # Throttling is handled by the shared rate limiter below
+            max_retries=0,
+        )
+        self.deployment_name = settings.AZURE_OPENAI_DEPLOYMENT_NAME
+        self.rate_limiter = OpenAIRateLimiter(max_wait)
+        self.max_retries = (
+            settings.RATE_LIMIT_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.input_token_budget = settings.SUMMARY_INPUT_TOKEN_BUDGET
+        self.max_chunks = settings.SUMMARY_MAX_CHUNKS
+        self.chunk_concurrency = settings.SUMMARY_CHUNK_CONCURRENCY
+
+    def create_completion(self, **kwargs):
+        """
+        Call chat completions through the shared rate limiter. The token
+        cost is estimated locally before the call; 429 responses pause all
+        processes for the ``retry-after`` interval and the call is retried.
+        """
+        model = kwargs["model"]
+        estimated_tokens = kwargs.get("max_tokens", 0) + sum(
+            count_tokens(message["content"]) for message in kwargs["messages"]
+        )
+
+        for attempt in range(1, self.max_retries + 2):
+            self.rate_limiter.acquire(estimated_tokens, key=model)
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+            except RateLimitError as e:
+                # Pause the other callers even when this one gives up
+                delay = retry_after_seconds(e.response) or min(2**attempt, 60)
+                self.rate_limiter.block_for(delay, key=model)
+                if attempt > self.max_retries:
+                    raise
+                continue
+
+            # Streamed responses carry no usage; the estimate stands
+            if getattr(response, "usage", None):
+                self.rate_limiter.reconcile(
+                    estimated_tokens, response.usage.total_tokens, key=model
+                )
+            return response
+
+    def summarize_email(
+        self,
+        email_body: str,
+        subject: str = "",
+        sender: str = "",
+        deployment_name: str | None = None,
+        on_delta: Callable[[str], None] | None = None,
+    ) -> str:
+        """
+        Generate a concise summary of the email content. When ``on_delta``
+        is given the completion is streamed and it is called with the text
+        generated so far after every received chunk.
+        """
+        deployment_name = deployment_name or self.deployment_name
+        try:
+            # Keep oversized bodies within the per-call token budget
+            body_tokens = count_tokens(email_body)
+            if body_tokens > self.input_token_budget:
+                email_body = self._condense_body(
+                    email_body, body_tokens, deployment_name
+                )
+
+            request = summary_request(deployment_name, email_body, subject, sender)
+            if on_delta:
+                summary = parse_summary(self._stream_completion(request, on_delta))
+            else:
+                response = self.create_completion(**request)
+                summary = parse_summary(response.choices[0].message.content)
+
+            logger.info("Successfully generated email summary")
+            return summary
+
+        except Exception as e:
+            # Callers fall back to an extractive summary instead of storing
+            # the error text as the summary
+            logger.error("Failed to generate email summary: %s", e)
+            raise
+
+    def _stream_completion(self, request: dict, on_delta: Callable[[str], None]) -> str:
+        """Stream a completion, reporting the accumulated text as it grows."""
+        parts = []
+        for chunk in self.create_completion(**request, stream=True):
+            # Azure sends an initial chunk with only content-filter results
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                on_delta("".join(parts))
+        return "".join(parts)
+
+    def _condense_body(
+        self, email_body: str, body_tokens: int, deployment_name: str
+    ) -> str:
+        """
+        Map step for oversized bodies: split into budget-sized chunks and
+        summarize them concurrently. Chunks beyond ``max_chunks`` are dropped
+        so latency and cost stay bounded regardless of the input size.
+        """
+        chunks = split_into_chunks(email_body, self.input_token_budget)
+        if len(chunks) > self.max_chunks:
+            logger.warning(
+                "Email body has %d tokens; summarizing first %d of %d chunks",
+                body_tokens,
+                self.max_chunks,
+                len(chunks),
+            )
+            chunks = chunks[: self.max_chunks]
+
+        with ThreadPoolExecutor(max_workers=self.chunk_concurrency) as executor:
+            chunk_summaries = list(
+                executor.map(
+                    self._summarize_chunk,
+                    chunks,
+                    range(1, len(chunks) + 1),
+                    [len(chunks)] * len(chunks),
+                    [deployment_name] * len(chunks),
+                )
+            )
+
+        logger.info(
+            "Condensed %d-token email body into %d chunk summaries",
+            body_tokens,
+            len(chunks),
+        )
+        return "\n\n".join(
+            f"[Part {i}/{len(chunks)}] {summary}"
+            for i, summary in enumerate(chunk_summaries, 1)
+        )
+
+    def _summarize_chunk(
+        self, chunk: str, index: int, total: int, deployment_name: str
+    ) -> str:
+        """Summarize one section of a long email."""
+        prompt = CHUNK_PROMPT_TEMPLATE.format(index=index, total=total, chunk=chunk)
+
+        response = self.create_completion(
+            model=deployment_name,
+            messages=[
+                {"role": "system", "content": CHUNK_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=200,
+            temperature=0.2,
+        )
+        return (response.choices[0].message.content or "").strip()
+
+    def extract_project_id(
+        self,
+        email_body: str,
+        subject: str = "",
+        deployment_name: str | None = None,
+    ) -> str | None:
+        """Extract project ID from email content."""
+        deployment_name = deployment_name or self.deployment_name
+        try:
+            # Identifiers sit near the top; the head of the body is enough
+            email_body = truncate_to_tokens(email_body, self.input_token_budget)
+
+            response = self.create_completion(
+                **project_id_request(deployment_name, email_body, subject)
+            )
+
+            project_id = parse_project_id(response.choices[0].message.content)
+            if project_id:
+                logger.info("Extracted Project ID: %s", project_id)
+            return project_id
 
         except Exception as e:
             logger.error("Failed to extract Project ID: %s", e)
@@ -138,7 +340,7 @@ Please provide analysis in JSON format:
     "technical_details": {{"aspect1": "detail1", "aspect2": "detail2"}}
 }}"""
 
-            response = self.client.chat.completions.create(
+            response = self.create_completion(
                 model=self.deployment_name,
                 messages=[
                     {
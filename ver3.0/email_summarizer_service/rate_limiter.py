@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_thread_lock = threading.Lock()
+
+
+class RateLimitWaitExceeded(Exception):
+    """Raised when a call could not be admitted within the maximum wait."""
+
+
+class OpenAIRateLimiter:
+    """
+    Token-bucket limiter for Azure OpenAI tokens-per-minute and
+    requests-per-minute quotas.
+
+    Bucket state lives in a small JSON file guarded by an exclusive
+    ``flock``, so every summarizer process and the API on the host draw
+    from the same budget. Callers block (queue) until capacity is
+    available instead of failing, and a 429 ``retry-after`` pauses all
+    processes sharing the deployment.
+    """
+
+    def __init__(self, max_wait: float | None = None):
+        self.state_file = settings.RATE_LIMIT_STATE_FILE
+        self.tokens_per_minute = settings.AZURE_OPENAI_TOKENS_PER_MINUTE
+        self.requests_per_minute = settings.AZURE_OPENAI_REQUESTS_PER_MINUTE
+        self.max_wait = (
+            settings.RATE_LIMIT_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        )
+
+    @contextmanager
+    def _locked_state(self):
+        """Yield the shared state dict; changes are written back on exit."""
+        with _thread_lock if fcntl is None else nullcontext():
+            fd = os.open(self.state_file, os.O_RDWR | os.O_CREAT, 0o600)
+            with os.fdopen(fd, "r+") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    try:
+                        state = json.loads(f.read() or "{}")
+                    except json.JSONDecodeError:
+                        state = {}
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _bucket(self, state: dict, key: str, now: float) -> dict:
+        """Refill the bucket for ``key`` based on the time elapsed."""
+        bucket = state.setdefault(
+            key,
+            {
+                "tokens": float(self.tokens_per_minute),
+                "requests": float(self.requests_per_minute),
+                "updated_at": now,
+                "blocked_until": 0.0,
+            },
+        )
+        elapsed = max(now - bucket["updated_at"], 0.0)
+        bucket["tokens"] = min(
+            float(self.tokens_per_minute),
+            bucket["tokens"] + elapsed * self.tokens_per_minute / 60.0,
+        )
+        bucket["requests"] = min(
+            float(self.requests_per_minute),
+            bucket["requests"] + elapsed * self.requests_per_minute / 60.0,
+        )
+        bucket["updated_at"] = now
+        return bucket
+
+    def acquire(self, tokens: int, key: str = "default"):
+        """Block until ``tokens`` and one request fit within the shared quota."""
+        # A single call larger than the whole minute budget would never fit
+        tokens = min(tokens, self.tokens_per_minute)
+        deadline = time.monotonic() + self.max_wait
+
+        while True:
+            with self._locked_state() as state:
+                now = time.time()
+                bucket = self._bucket(state, key, now)
+                if bucket["blocked_until"] > now:
+                    wait = bucket["blocked_until"] - now
+                elif bucket["tokens"] >= tokens and bucket["requests"] >= 1:
+                    bucket["tokens"] -= tokens
+                    bucket["requests"] -= 1
+                    return
+                else:
+                    token_wait = (
+                        (tokens - bucket["tokens"]) * 60.0 / self.tokens_per_minute
+                    )
+                    request_wait = (
+                        (1 - bucket["requests"]) * 60.0 / self.requests_per_minute
+                    )
+                    wait = max(token_wait, request_wait, 0.0)
+
+            if time.monotonic() + wait > deadline:
+                raise RateLimitWaitExceeded(
+                    f"Azure OpenAI quota not available within {self.max_wait}s"
+                )
+            logger.debug("Rate limited; waiting %.2fs for quota", wait)
+            # Jitter avoids processes waking in lock-step
+            time.sleep(min(wait, 5.0) + random.uniform(0, 0.05))
+
+    def reconcile(
+        self, estimated_tokens: int, actual_tokens: int, key: str = "default"
+    ):
+        """Correct the bucket once the real token usage is known."""
+        if actual_tokens is None or actual_tokens == estimated_tokens:
+            return
+        with self._locked_state() as state:
+            bucket = self._bucket(state, key, time.time())
+            bucket["tokens"] = min(
+                float(self.tokens_per_minute),
+                bucket["tokens"] + estimated_tokens - actual_tokens,
+            )
+
+    def block_for(self, seconds: float, key: str = "default"):
+        """Pause all callers of ``key`` (e.g. after a 429 with retry-after)."""
+        with self._locked_state() as state:
+            now = time.time()
+            bucket = self._bucket(state, key, now)
+            bucket["blocked_until"] = max(bucket["blocked_until"], now + seconds)
+        logger.warning("Azure OpenAI throttled; pausing calls for %.2fs", seconds)
+
+
+def retry_after_seconds(response) -> float | None:
+    """Parse ``retry-after-ms`` / ``retry-after`` headers from a 429 response."""
+    if response is None:
+        return None
+    headers = response.headers
+    for header, scale in (("retry-after-ms", 1000.0), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) / scale
+            except ValueError:
+                continue
+    return None
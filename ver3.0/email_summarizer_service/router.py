@@ -0,0 +1,147 @@
+import logging
+import re
+import threading
+from collections import defaultdict, deque
+
+from core.config import settings
+from core.models import RecipientRole
+
+logger = logging.getLogger(__name__)
+
+_AUTOMATED_SENDER_RE = re.compile(
+    r"(no-?reply|do-?not-?reply|notifications?|mailer-daemon|postmaster|alerts?)@",
+    re.IGNORECASE,
+)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+# The identifier labels the project ID prompt looks for
+_PROJECT_ID_HINT_RE = re.compile(
+    r"\bproj(?:ect)?\.?\s*(?:id|#|no\b|num(?:ber)?|code|ref)", re.IGNORECASE
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+ROUTE_TEMPLATE = "template"
+ROUTE_SMALL = "small"
+ROUTE_LARGE = "large"
+# Emails answered without a summary call are recorded under their source
+ROUTE_CACHE = "cache"
+ROUTE_DERIVED = "derived"
+ROUTE_EXTRACTIVE = "extractive"
+
+# Log a metrics snapshot every N routed emails
+METRICS_LOG_EVERY = 100
+LATENCY_WINDOW = 500
+
+
+def template_summary(body: str, sender: str) -> str:
+    """Summary for trivial emails ("thanks", "received") without a model call."""
+    text = _WHITESPACE_RE.sub(" ", _HTML_TAG_RE.sub(" ", body or "")).strip()
+    if len(text) > 200:
+        text = text[:197] + "..."
+    return f'Brief message from {sender or "unknown sender"}: "{text}"'
+
+
+def may_contain_project_id(*texts: str) -> bool:
+    """Cheap check whether a project ID lookup could find anything."""
+    return any(_PROJECT_ID_HINT_RE.search(text or "") for text in texts)
+
+
+class ModelRouter:
+    """
+    Scores each email cheaply (body size, attachments, role, sender class)
+    and picks a route: a template summary for trivial emails, the small
+    deployment for simple ones and the large deployment for the rest.
+    """
+
+    def __init__(self):
+        self.large_deployment = settings.AZURE_OPENAI_DEPLOYMENT_NAME
+        # Without a small deployment everything non-trivial goes to the large one
+        self.small_deployment = (
+            settings.AZURE_OPENAI_SMALL_DEPLOYMENT_NAME or self.large_deployment
+        )
+        self.template_max_tokens = settings.SUMMARY_ROUTE_TEMPLATE_MAX_TOKENS
+        self.large_min_score = settings.SUMMARY_ROUTE_LARGE_MIN_SCORE
+
+    def score(
+        self,
+        body_tokens: int,
+        attachment_count: int,
+        role: RecipientRole | None,
+        sender: str,
+    ) -> float:
+        score = body_tokens / 500.0
+        score += min(attachment_count, 3)
+        if role == RecipientRole.TO:
+            score += 0.5
+        elif role == RecipientRole.CC:
+            score -= 0.5
+        if _AUTOMATED_SENDER_RE.search(sender or ""):
+            score -= 1.0
+        return score
+
+    def route(
+        self,
+        body_tokens: int,
+        attachment_count: int,
+        role: RecipientRole | None,
+        sender: str,
+        cheap: bool = False,
+    ) -> tuple[str, str | None]:
+        """
+        Return (route name, deployment name); the template route has no
+        deployment. ``cheap`` (routing policy) caps the route at small.
+        """
+        if body_tokens <= self.template_max_tokens and attachment_count == 0:
+            return ROUTE_TEMPLATE, None
+        if cheap:
+            return ROUTE_SMALL, self.small_deployment
+
+        score = self.score(body_tokens, attachment_count, role, sender)
+        if score >= self.large_min_score:
+            return ROUTE_LARGE, self.large_deployment
+        return ROUTE_SMALL, self.small_deployment
+
+
+class RouteMetrics:
+    """Per-route count, latency percentiles, tokens and estimated cost."""
+
+    def __init__(self):
+        # Template-route tokens are project ID lookups on the small deployment
+        self.cost_per_1k_tokens = {
+            ROUTE_TEMPLATE: settings.SUMMARY_COST_PER_1K_TOKENS_SMALL,
+            ROUTE_SMALL: settings.SUMMARY_COST_PER_1K_TOKENS_SMALL,
+            ROUTE_LARGE: settings.SUMMARY_COST_PER_1K_TOKENS_LARGE,
+        }
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._tokens = defaultdict(int)
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._total = 0
+
+    def record(self, route: str, latency: float, tokens: int):
+        with self._lock:
+            self._counts[route] += 1
+            self._tokens[route] += tokens
+            self._latencies[route].append(latency)
+            self._total += 1
+            log_now = self._total % METRICS_LOG_EVERY == 0
+        if log_now:
+            logger.info("Summary route metrics: %s", self.snapshot())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = {}
+            for route, count in self._counts.items():
+                latencies = sorted(self._latencies[route])
+                snapshot[route] = {
+                    "count": count,
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+                    "input_tokens": self._tokens[route],
+                    "estimated_cost": round(
+                        self._tokens[route]
+                        / 1000
+                        * self.cost_per_1k_tokens.get(route, 0.0),
+                        4,
+                    ),
+                }
+            return snapshot
@@ -0,0 +1,140 @@
+import hashlib
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import SummaryCacheEntry
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_SUBJECT_PREFIX_RE = re.compile(r"^\s*((re|fw|fwd)\s*:\s*)+", re.IGNORECASE)
+
+# Run TTL/LRU eviction every N cache writes
+EVICT_EVERY = 200
+
+
+def normalize_body(body: str) -> str:
+    return _WHITESPACE_RE.sub(" ", body or "").strip().lower()
+
+
+def normalize_subject(subject: str) -> str:
+    """Drop reply/forward prefixes so forwarded copies share a key."""
+    return _SUBJECT_PREFIX_RE.sub("", subject or "").strip().lower()
+
+
+class SummaryCache:
+    """
+    Persistent cache of summaries and project IDs for identical emails.
+
+    Keys combine the normalized body and subject with the prompt version and
+    deployment name, so editing the prompts in ``openai_client.py`` or
+    switching models never serves a stale summary.
+    """
+
+    def __init__(self, prompt_version: str):
+        self.prompt_version = prompt_version
+        self.ttl = timedelta(hours=settings.SUMMARY_CACHE_TTL_HOURS)
+        self.max_entries = settings.SUMMARY_CACHE_MAX_ENTRIES
+        self._writes = 0
+
+    def make_key(self, body: str, subject: str, deployment_name: str) -> str:
+        digest = hashlib.sha256()
+        for part in (
+            normalize_body(body),
+            normalize_subject(subject),
+            self.prompt_version,
+            deployment_name or "",
+        ):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, db: Session, cache_key: str) -> SummaryCacheEntry | None:
+        """Return a live cache entry and mark it as recently used."""
+        entry = db.query(SummaryCacheEntry).filter_by(cache_key=cache_key).first()
+        if not entry:
+            return None
+
+        now = datetime.now(timezone.utc)
+        if entry.prompt_version != self.prompt_version or (
+            entry.created_at and entry.created_at < now - self.ttl
+        ):
+            db.delete(entry)
+            db.commit()
+            return None
+
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_accessed_at = now
+        db.commit()
+        return entry
+
+    def put(
+        self,
+        db: Session,
+        cache_key: str,
+        email_summary: str,
+        project_id: str | None,
+        deployment_name: str,
+    ):
+        try:
+            db.merge(
+                SummaryCacheEntry(
+                    cache_key=cache_key,
+                    prompt_version=self.prompt_version,
+                    deployment_name=deployment_name,
+                    email_summary=email_summary,
+                    project_id=project_id,
+                    hit_count=0,
+                    created_at=datetime.now(timezone.utc),
+                    last_accessed_at=datetime.now(timezone.utc),
+                )
+            )
+            db.commit()
+        except Exception as e:
+            logger.error("Failed to write summary cache entry: %s", e)
+            db.rollback()
+            return
+
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self.evict(db)
+
+    def evict(self, db: Session) -> int:
+        """Drop expired and outdated-prompt entries, then trim to max_entries (LRU)."""
+        cutoff = datetime.now(timezone.utc) - self.ttl
+        try:
+            deleted = (
+                db.query(SummaryCacheEntry)
+                .filter(
+                    (SummaryCacheEntry.created_at < cutoff)
+                    | (SummaryCacheEntry.prompt_version != self.prompt_version)
+                )
+                .delete(synchronize_session=False)
+            )
+
+            # Everything older than the max_entries-th most recently used entry
+            boundary = (
+                db.query(SummaryCacheEntry.last_accessed_at)
+                .order_by(SummaryCacheEntry.last_accessed_at.desc())
+                .offset(self.max_entries)
+                .limit(1)
+                .scalar()
+            )
+            if boundary is not None:
+                deleted += (
+                    db.query(SummaryCacheEntry)
+                    .filter(SummaryCacheEntry.last_accessed_at <= boundary)
+                    .delete(synchronize_session=False)
+                )
+
+            db.commit()
+            logger.info("Evicted %d summary cache entries", deleted)
+            return deleted
+        except Exception as e:
+            logger.error("Failed to evict summary cache entries: %s", e)
+            db.rollback()
+            return 0
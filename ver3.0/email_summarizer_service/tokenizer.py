@@ -0,0 +1,100 @@
+import logging
+
+from core.config import settings
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is optional
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Fallback ratio used when tiktoken (or its encoding files) is unavailable
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once per process; None means heuristic mode."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding(settings.TOKENIZER_ENCODING)
+            except Exception as e:
+                logger.warning(
+                    "Could not load tokenizer '%s', estimating tokens instead: %s",
+                    settings.TOKENIZER_ENCODING,
+                    e,
+                )
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally without calling the API."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Return the longest prefix of ``text`` that fits in ``max_tokens``. The
+    prefix ends on a character boundary: a character whose bytes straddle
+    the cut is left out rather than decoded into U+FFFD.
+    """
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    # Offset of the character in which token ``max_tokens`` starts
+    _, offsets = encoding.decode_with_offsets(tokens)
+    return text[: offsets[max_tokens]]
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list[str]:
+    """
+    Split ``text`` into chunks of at most ``max_tokens`` tokens.
+    Paragraph boundaries are preferred; oversized paragraphs are cut hard.
+    """
+    if max_tokens <= 0:
+        raise ValueError(f"Chunk token budget must be positive, got {max_tokens}")
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+
+    for paragraph in text.split("\n\n"):
+        paragraph_tokens = count_tokens(paragraph)
+
+        while paragraph_tokens > max_tokens:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            # A single character can take more tokens than the budget
+            head = truncate_to_tokens(paragraph, max_tokens) or paragraph[0]
+            chunks.append(head)
+            paragraph = paragraph[len(head) :]
+            paragraph_tokens = count_tokens(paragraph)
+
+        if current and current_tokens + paragraph_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+
+        if paragraph:
+            current.append(paragraph)
+            current_tokens += paragraph_tokens
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
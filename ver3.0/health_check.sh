@@ -91,7 +91,7 @@ echo ""
 # Check logs
 echo "📊 Log Status:"
 if [ -d "logs" ]; then
-    for log in api parser summarizer react; do
+    for log in api supervisor parser-0 summarizer-0 react; do
         if [ -f "logs/$log.log" ]; then
             size=$(stat -f%z "logs/$log.log" 2>/dev/null || stat -c%s "logs/$log.log" 2>/dev/null || echo "0")
             if [ "$size" -gt 0 ]; then
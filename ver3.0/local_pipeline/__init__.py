@@ -0,0 +1 @@
+# local_pipeline/__init__.py
@@ -0,0 +1,140 @@
+# Single-process pipeline: the poller, parser and summarizer run in one event
+# loop, connected by the bounded in-memory queues of core.in_memory_broker
+# instead of RabbitMQ. Meant for local development and profiling the whole
+# pipeline in one process:
+#
+#   python -m local_pipeline.main --cycles 1 --profile pipeline.prof
+#
+# Only the event-loop thread is profiled; summaries generated in worker
+# threads and the extractive process pool show up as the awaits on them.
+
+import argparse
+import asyncio
+import cProfile
+import logging
+import pstats
+import signal
+import sys
+
+from core.async_rabbitmq_client import set_client_factory
+from core.config import settings
+from core.in_memory_broker import InMemoryBroker, InMemoryRabbitMQClient
+from core.sharding import sharding_enabled
+from email_parser_service.async_service import EmailParserServiceAsync
+from email_polling_service.poll_emails import run_polling_cycle
+from email_summarizer_service.async_service import EmailSummarizerServiceAsync
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def wait_for_consumers(broker: InMemoryBroker, queue_names: list[str]):
+    """Wait until every stage consumes, so the first cycle is not reported idle."""
+    while not all(
+        name in broker.queues and broker.queues[name].consumers for name in queue_names
+    ):
+        await asyncio.sleep(0.1)
+
+
+async def run_pipeline(args):
+    broker = InMemoryBroker(args.queue_size)
+    set_client_factory(lambda: InMemoryRabbitMQClient(broker))
+
+    if sharding_enabled():
+        # One parser and one summarizer own each shard
+        shards = range(settings.PIPELINE_SHARDS)
+        services = [EmailParserServiceAsync(shard) for shard in shards] + [
+            EmailSummarizerServiceAsync(shard) for shard in shards
+        ]
+    else:
+        services = [EmailParserServiceAsync() for _ in range(args.parsers)] + [
+            EmailSummarizerServiceAsync() for _ in range(args.summarizers)
+        ]
+    tasks = [asyncio.create_task(service.start()) for service in services]
+    stop_event = asyncio.Event()
+
+    # Set up signal handlers for graceful shutdown
+    def signal_handler():
+        logger.info("Received shutdown signal. Stopping pipeline...")
+        stop_event.set()
+
+    # Register signal handlers
+    if sys.platform != "win32":
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGINT, signal_handler)
+        loop.add_signal_handler(signal.SIGTERM, signal_handler)
+
+    try:
+        await wait_for_consumers(
+            broker, sorted({service.input_queue for service in services})
+        )
+        cycle = 0
+        while not stop_event.is_set() and (not args.cycles or cycle < args.cycles):
+            if cycle:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=args.interval)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+            cycle += 1
+            logger.info("Polling cycle %d", cycle)
+            await run_polling_cycle()
+            await broker.wait_idle()
+            logger.info("Cycle %d done: %s", cycle, broker.stats())
+    finally:
+        for service in services:
+            service.shutdown()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for service in services:
+            await service.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the whole email pipeline in one process"
+    )
+    parser.add_argument(
+        "--cycles", type=int, default=1, help="polling cycles to run (0: forever)"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=60, help="seconds between polling cycles"
+    )
+    parser.add_argument(
+        "--parsers", type=int, default=1, help="parser consumers (unsharded)"
+    )
+    parser.add_argument(
+        "--summarizers", type=int, default=1, help="summarizer consumers (unsharded)"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=settings.IN_MEMORY_QUEUE_MAXSIZE,
+        help="capacity of each in-memory queue",
+    )
+    parser.add_argument("--profile", help="write cProfile stats to this file")
+    args = parser.parse_args()
+
+    if not args.profile:
+        asyncio.run(run_pipeline(args))
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        asyncio.run(run_pipeline(args))
+    finally:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        logger.info("Profile written to %s", args.profile)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    try:
+        logger.info("Starting single-process pipeline...")
+        main()
+    except KeyboardInterrupt:
+        logger.info("Pipeline stopped by user.")
@@ -117,6 +117,51 @@ if [ -f "migrate_po_to_project_id.py" ]; then
     echo "y" | python migrate_po_to_project_id.py > /dev/null 2>&1 || true
 fi
 
+if [ -f "add_boilerplate_filter_migration.py" ]; then
+    echo "   Running boilerplate filter migration..."
+    python add_boilerplate_filter_migration.py > /dev/null 2>&1 || true
+fi
+
+if [ -f "add_near_duplicate_migration.py" ]; then
+    echo "   Running near-duplicate detection migration..."
+    python add_near_duplicate_migration.py > /dev/null 2>&1 || true
+fi
+
+if [ -f "add_batch_mode_migration.py" ]; then
+    echo "   Running batch summarization migration..."
+    python add_batch_mode_migration.py > /dev/null 2>&1 || true
+fi
+
+if [ -f "add_routing_policy_migration.py" ]; then
+    echo "   Running routing policy migration..."
+    python add_routing_policy_migration.py > /dev/null 2>&1 || true
+fi
+
+if [ -f "add_lease_migration.py" ]; then
+    echo "   Running lease migration..."
+    python add_lease_migration.py > /dev/null 2>&1 || true
+fi
+
+if [ -f "add_log_pagination_migration.py" ]; then
+    echo "   Running log pagination migration..."
+    python add_log_pagination_migration.py > /dev/null 2>&1 || true
+fi
+
+if [ -f "add_log_changes_migration.py" ]; then
+    echo "   Running log changes migration..."
+    python add_log_changes_migration.py > /dev/null 2>&1 || true
+fi
+
+if [ -f "add_archived_status_migration.py" ]; then
+    echo "   Running archived status migration..."
+    python add_archived_status_migration.py > /dev/null 2>&1 || true
+fi
+
+if [ -f "add_queued_at_migration.py" ]; then
+    echo "   Running queued-at migration..."
+    python add_queued_at_migration.py > /dev/null 2>&1 || true
+fi
+
 echo "✅ Database setup complete!"
 echo ""
 
@@ -130,6 +175,7 @@ export $(grep -v '^#' .env | xargs) 2>/dev/null || true
 echo "🧹 Cleaning up existing processes..."
 pkill -f "python.*email_parser_service" 2>/dev/null || true
 pkill -f "python.*email_summarizer_service" 2>/dev/null || true
+pkill -f "python.*worker_supervisor" 2>/dev/null || true
 pkill -f "uvicorn.*api.main" 2>/dev/null || true
 pkill -f "npm.*start" 2>/dev/null || true
 
@@ -176,16 +222,10 @@ if ! wait_for_service "API Server" 8000; then
     exit 1
 fi
 
-# Start Email Parser Service
-echo "   Starting Email Parser Service..."
-(source venv/bin/activate && python -m email_parser_service.main > logs/parser.log 2>&1) &
-PARSER_PID=$!
-sleep 3
-
-# Start Email Summarizer Service
-echo "   Starting Email Summarizer Service..."
-(source venv/bin/activate && python -m email_summarizer_service.main > logs/summarizer.log 2>&1) &
-SUMMARIZER_PID=$!
+# Start Worker Supervisor (scales parser and summarizer workers with queue depth)
+echo "   Starting Worker Supervisor..."
+(source venv/bin/activate && python -m worker_supervisor.main > logs/supervisor.log 2>&1) &
+SUPERVISOR_PID=$!
 sleep 3
 
 # Start React UI
@@ -200,7 +240,7 @@ if ! wait_for_service "React UI" 3000; then
 fi
 
 # Save PIDs
-echo "$API_PID $PARSER_PID $SUMMARIZER_PID $REACT_PID" > .email_agent_react_pids
+echo "$API_PID $SUPERVISOR_PID $REACT_PID" > .email_agent_react_pids
 
 echo ""
 echo "🎉 Email Agent is now running!"
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
     Typography,
     Button,
@@ -64,12 +64,17 @@ function App() {
         isNewEnquiry: '',
         confirmed: false
     });
+    // Delta-sync position of the loaded list (/api/logs/changes)
+    const changesCursor = useRef(null);
 
     // Fetch all email logs
     const fetchEmails = async () => {
         setLoading(true);
         try {
+            // Taken before the list so no change falls between the two
+            const head = await axios.get(`${API_BASE_URL}/api/logs/changes`);
             const response = await axios.get(`${API_BASE_URL}/api/logs`);
+            changesCursor.current = head.data.cursor;
             setEmails(response.data);
             setLastUpdated(new Date());
         } catch (error) {
@@ -83,6 +88,39 @@ function App() {
         }
     };
 
+    // Apply only the emails created or changed since the last sync
+    const syncChanges = async () => {
+        if (!changesCursor.current) {
+            fetchEmails();
+            return;
+        }
+        try {
+            let hasMore = true;
+            while (hasMore) {
+                const { data } = await axios.get(`${API_BASE_URL}/api/logs/changes`, {
+                    params: { since: changesCursor.current }
+                });
+                changesCursor.current = data.cursor;
+                hasMore = data.has_more;
+                if (data.items.length) {
+                    setEmails(prev => {
+                        const byId = new Map(prev.map(email => [email.id, email]));
+                        data.items.forEach(item => byId.set(item.id, { ...byId.get(item.id), ...item }));
+                        return [...byId.values()].sort((a, b) =>
+                            dayjs(b.received_at).valueOf() - dayjs(a.received_at).valueOf() || b.id - a.id);
+                    });
+                }
+            }
+            setLastUpdated(new Date());
+        } catch (error) {
+            setSnackbar({
+                open: true,
+                message: `Error syncing emails: ${error.message}`,
+                severity: 'error'
+            });
+        }
+    };
+
     // Fetch email details
     const fetchEmailDetails = async (emailId) => {
         try {
@@ -242,6 +280,68 @@ function App() {
         fetchEmails();
     }, []);
 
+    // Live summary updates: partial text while the model streams, then the final summary.
+    // The socket reconnects on its own and catches up through the changes feed.
+    useEffect(() => {
+        const lastSeq = {};
+        let socket;
+        let retryTimer;
+        let closed = false;
+        let reconnecting = false;
+
+        const connect = () => {
+            socket = new WebSocket(API_BASE_URL.replace(/^http/, 'ws') + '/ws');
+
+            socket.onopen = () => {
+                if (reconnecting) syncChanges();
+            };
+
+            socket.onmessage = (event) => {
+                let message;
+                try {
+                    message = JSON.parse(event.data);
+                } catch {
+                    return;
+                }
+                const payload = message.payload || {};
+
+                if (message.type === 'EMAIL_SUMMARY_PARTIAL') {
+                    // Events can arrive out of order; keep the newest partial only
+                    if ((lastSeq[payload.id] || 0) >= payload.seq) return;
+                    lastSeq[payload.id] = payload.seq;
+                    setSelectedEmail(prev => (prev && prev.id === payload.id
+                        ? { ...prev, email_summary: payload.partial_summary }
+                        : prev));
+                } else if (message.type === 'RESYNC') {
+                    // The server dropped events for this client while it lagged
+                    syncChanges();
+                } else if (message.type === 'EMAIL_SUMMARIZED') {
+                    lastSeq[payload.id] = Infinity;
+                    const update = {
+                        status: payload.status,
+                        email_summary: payload.summary,
+                        project_id: payload.project_id,
+                    };
+                    setEmails(prev => prev.map(email => (email.id === payload.id ? { ...email, ...update } : email)));
+                    setSelectedEmail(prev => (prev && prev.id === payload.id ? { ...prev, ...update } : prev));
+                }
+            };
+
+            socket.onclose = () => {
+                if (closed) return;
+                reconnecting = true;
+                retryTimer = setTimeout(connect, 3000);
+            };
+        };
+        connect();
+
+        return () => {
+            closed = true;
+            clearTimeout(retryTimer);
+            socket.close();
+        };
+    }, []);
+
     return (
         <Box sx={{ height: '100vh', display: 'flex', flexDirection: 'column', overflow: 'hidden' }}>
             {/* Compact Header Bar */}
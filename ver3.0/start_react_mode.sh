@@ -35,6 +35,7 @@ source venv/bin/activate
 echo "🧹 Cleaning up any existing services..."
 pkill -f "python.*email_parser_service" 2>/dev/null || true
 pkill -f "python.*email_summarizer_service" 2>/dev/null || true
+pkill -f "python.*worker_supervisor" 2>/dev/null || true
 pkill -f "uvicorn.*api.main" 2>/dev/null || true
 pkill -f "npm.*start" 2>/dev/null || true
 sleep 2
@@ -76,22 +77,13 @@ if ! wait_for_service "API Server" 8000; then
     exit 1
 fi
 
-# Start Email Parser Service
-echo "▶️  Starting Email Parser Service..."
-(source venv/bin/activate && python -m email_parser_service.main > logs/parser.log 2>&1) &
-PARSER_PID=$!
-echo "   PID: $PARSER_PID (logs: logs/parser.log)"
+# Start Worker Supervisor (scales parser and summarizer workers with queue depth)
+echo "▶️  Starting Worker Supervisor..."
+(source venv/bin/activate && python -m worker_supervisor.main > logs/supervisor.log 2>&1) &
+SUPERVISOR_PID=$!
+echo "   PID: $SUPERVISOR_PID (logs: logs/supervisor.log, workers: logs/parser-N.log, logs/summarizer-N.log)"
 
-# Wait a bit for parser to initialize
-sleep 3
-
-# Start Email Summarizer Service
-echo "▶️  Starting Email Summarizer Service..."
-(source venv/bin/activate && python -m email_summarizer_service.main > logs/summarizer.log 2>&1) &
-SUMMARIZER_PID=$!
-echo "   PID: $SUMMARIZER_PID (logs: logs/summarizer.log)"
-
-# Wait a bit for summarizer service to initialize
+# Wait a bit for the first workers to initialize
 sleep 3
 
 # Start React UI
@@ -107,7 +99,7 @@ if ! wait_for_service "React UI" 3000; then
 fi
 
 # Save PIDs for cleanup
-echo "$API_PID $PARSER_PID $SUMMARIZER_PID $REACT_PID" > .email_agent_react_pids
+echo "$API_PID $SUPERVISOR_PID $REACT_PID" > .email_agent_react_pids
 
 echo ""
 echo "✅ All services started!"
@@ -135,4 +127,4 @@ echo "📊 Watch logs: tail -f logs/api.log"
 echo ""
 echo "=== SHUTDOWN ==="
 echo "To stop services: ./stop_react_services.sh"
-echo "Or manually: kill $API_PID $PARSER_PID $SUMMARIZER_PID $REACT_PID"
\ No newline at end of file
+echo "Or manually: kill $API_PID $SUPERVISOR_PID $REACT_PID"
\ No newline at end of file
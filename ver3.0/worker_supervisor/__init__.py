@@ -0,0 +1 @@
+# worker_supervisor/__init__.py
@@ -0,0 +1,43 @@
+# Entry point for the worker supervisor, which replaces starting one fixed
+# parser and one fixed summarizer process from the shell scripts:
+#
+#   python -m worker_supervisor.main
+
+import asyncio
+import logging
+import signal
+import sys
+from .supervisor import WorkerSupervisor, default_pools
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    supervisor = WorkerSupervisor(default_pools())
+
+    # Set up signal handlers for graceful shutdown
+    def signal_handler():
+        logger.info("Received shutdown signal. Draining workers...")
+        supervisor.shutdown()
+
+    # Register signal handlers
+    if sys.platform != "win32":
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGINT, signal_handler)
+        loop.add_signal_handler(signal.SIGTERM, signal_handler)
+
+    await supervisor.run()
+
+
+if __name__ == "__main__":
+    try:
+        logger.info("Starting Worker Supervisor...")
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Supervisor stopped by user.")
+    except Exception as e:
+        logger.error("A critical error occurred: %s", e)
@@ -0,0 +1,243 @@
+# worker_supervisor/supervisor.py
+
+import asyncio
+import logging
+import math
+import os
+import signal
+import sys
+import time
+
+from core.async_rabbitmq_client import AsyncRabbitMQClient, AsyncRabbitMQPublisher
+from core.config import settings
+from core.leases import reap_expired_leases
+from core.sharding import sharding_enabled, shard_queue_name
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """
+    Worker processes of one pipeline stage (``python -m <module>``).
+    Workers are retired with SIGTERM, which makes them cancel their consumer
+    and finish the in-flight message before exiting.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        module: str,
+        queue_name: str,
+        min_workers: int,
+        max_workers: int,
+        log_dir: str = "logs",
+        env: dict[str, str] | None = None,
+    ):
+        self.name = name
+        self.module = module
+        self.queue_name = queue_name
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.log_dir = log_dir
+        self.env = env or {}
+        self.workers: dict[int, asyncio.subprocess.Process] = {}  # slot -> process
+        self.draining: set[asyncio.Task] = set()
+        self.last_scale_up = 0.0
+
+    def reap(self):
+        """Forget workers that exited on their own (crash, OOM kill)."""
+        for slot, process in list(self.workers.items()):
+            if process.returncode is not None:
+                logger.warning(
+                    "%s worker %d (PID %s) exited with code %s",
+                    self.name,
+                    slot,
+                    process.pid,
+                    process.returncode,
+                )
+                del self.workers[slot]
+
+    async def spawn(self):
+        slot = next(i for i in range(len(self.workers) + 1) if i not in self.workers)
+        os.makedirs(self.log_dir, exist_ok=True)
+        with open(os.path.join(self.log_dir, f"{self.name}-{slot}.log"), "ab") as log:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                self.module,
+                stdout=log,
+                stderr=asyncio.subprocess.STDOUT,
+                env={**os.environ, **self.env},
+            )
+        self.workers[slot] = process
+        logger.info("Started %s worker %d (PID %s)", self.name, slot, process.pid)
+
+    def retire(self):
+        """Drain the newest worker in the background."""
+        slot = max(self.workers)
+        process = self.workers.pop(slot)
+        task = asyncio.create_task(self._drain(slot, process))
+        self.draining.add(task)
+        task.add_done_callback(self.draining.discard)
+
+    async def _drain(self, slot: int, process: asyncio.subprocess.Process):
+        logger.info("Draining %s worker %d (PID %s)", self.name, slot, process.pid)
+        if process.returncode is None:
+            process.send_signal(signal.SIGTERM)
+        try:
+            # Workers bound their own drain; allow for shutdown on top of it
+            await asyncio.wait_for(
+                process.wait(), timeout=settings.WORKER_DRAIN_TIMEOUT_SECONDS + 30
+            )
+        except asyncio.TimeoutError:
+            logger.warning("%s worker %d did not drain; killing", self.name, slot)
+            process.kill()
+            await process.wait()
+        logger.info("Retired %s worker %d", self.name, slot)
+
+    def desired_workers(self, depth: int) -> int:
+        wanted = math.ceil(depth / settings.SUPERVISOR_MESSAGES_PER_WORKER)
+        return min(max(wanted, self.min_workers), self.max_workers)
+
+    async def scale(self, depth: int):
+        """
+        Scale towards the queue depth: up at once, down one worker per
+        cooldown period so short lulls do not cause churn.
+        """
+        self.reap()
+        desired = self.desired_workers(depth)
+        current = len(self.workers)
+
+        if current < desired:
+            logger.info(
+                "Scaling %s up %d -> %d (queue depth %d)",
+                self.name,
+                current,
+                desired,
+                depth,
+            )
+            for _ in range(desired - current):
+                await self.spawn()
+            self.last_scale_up = time.monotonic()
+        elif current > desired and (
+            time.monotonic() - self.last_scale_up
+            >= settings.SUPERVISOR_SCALE_DOWN_COOLDOWN_SECONDS
+        ):
+            logger.info(
+                "Scaling %s down %d -> %d (queue depth %d)",
+                self.name,
+                current,
+                current - 1,
+                depth,
+            )
+            self.retire()
+            self.last_scale_up = time.monotonic()
+
+    async def stop(self):
+        while self.workers:
+            self.retire()
+        if self.draining:
+            await asyncio.gather(*self.draining)
+
+
+class WorkerSupervisor:
+    """
+    Keeps the parser and summarizer worker counts in line with their queue
+    depths, read with passive queue declares, and runs the reaper for jobs
+    whose worker died with the lease.
+    """
+
+    def __init__(self, pools: list[WorkerPool]):
+        self.pools = pools
+        self.interval = settings.SUPERVISOR_INTERVAL_SECONDS
+        self.shutdown_event = asyncio.Event()
+        self.last_reap = 0.0
+
+    async def reap(self):
+        if time.monotonic() - self.last_reap < settings.REAPER_INTERVAL_SECONDS:
+            return
+        self.last_reap = time.monotonic()
+        try:
+            await reap_expired_leases()
+        except Exception as e:
+            logger.error("Lease reaper failed: %s", e)
+
+    async def run(self):
+        for pool in self.pools:
+            for _ in range(pool.min_workers):
+                await pool.spawn()
+
+        async with AsyncRabbitMQClient() as client:
+            while not self.shutdown_event.is_set():
+                for pool in self.pools:
+                    try:
+                        depth = await client.queue_depth(pool.queue_name)
+                    except Exception as e:
+                        # The queue may not exist until the first worker declares it
+                        logger.warning(
+                            "Could not read depth of '%s': %s", pool.queue_name, e
+                        )
+                        await client.close()
+                        await client.connect()
+                        depth = 0
+                    await pool.scale(depth)
+                await self.reap()
+
+                try:
+                    await asyncio.wait_for(
+                        self.shutdown_event.wait(), timeout=self.interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+        logger.info("Stopping all workers...")
+        await asyncio.gather(*(pool.stop() for pool in self.pools))
+        await AsyncRabbitMQPublisher.close()
+
+    def shutdown(self):
+        self.shutdown_event.set()
+
+
+def shard_pools() -> list[WorkerPool]:
+    """One worker per shard queue and stage; shards are the unit of scaling."""
+    stages = [
+        ("parser", "email_parser_service.main", settings.RABBITMQ_INPUT_QUEUE_NAME),
+        (
+            "summarizer",
+            "email_summarizer_service.main",
+            settings.RABBITMQ_OUTPUT_QUEUE_NAME,
+        ),
+    ]
+    return [
+        WorkerPool(
+            f"{name}-shard{shard}",
+            module,
+            shard_queue_name(queue_name, shard),
+            1,
+            1,
+            env={"WORKER_SHARD": str(shard)},
+        )
+        for name, module, queue_name in stages
+        for shard in range(settings.PIPELINE_SHARDS)
+    ]
+
+
+def default_pools() -> list[WorkerPool]:
+    if sharding_enabled():
+        return shard_pools()
+    return [
+        WorkerPool(
+            "parser",
+            "email_parser_service.main",
+            settings.RABBITMQ_INPUT_QUEUE_NAME,
+            settings.PARSER_MIN_WORKERS,
+            settings.PARSER_MAX_WORKERS,
+        ),
+        WorkerPool(
+            "summarizer",
+            "email_summarizer_service.main",
+            settings.RABBITMQ_OUTPUT_QUEUE_NAME,
+            settings.SUMMARIZER_MIN_WORKERS,
+            settings.SUMMARIZER_MAX_WORKERS,
+        ),
+    ]